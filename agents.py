@@ -1,4 +1,3 @@
-import audio
 import numpy as np
 
 # Agent types
@@ -22,66 +21,215 @@ STATIC_AGENTS = {
 }
 
 
+DEFAULT_TONE = {'pitch': 440.0, 'duration': 0.5, 'velocity': 100}
+
+# Row layout of audio.play_tones; harmonics is an audio.register_harmonics id
+# (0 is the plain [1.0] bell).
+TONE_DTYPE = np.dtype([
+    ('pitch', '<f8'), ('duration', '<f8'), ('velocity', '<i4'), ('harmonics', '<i4')
+])
+
+
+def tone_attributes(r, c, cell_attributes):
+    """Return (pitch, duration, velocity) for a robot landing on (r, c)."""
+    return cell_attributes.tone(r, c)
+
+
+def play_tones(tones, sample_time=0):
+    """Send (pitch, duration, velocity) tones to the synth in one call.
+
+    With ``sample_time`` they start together at that ``audio.sample_time()``
+    position, otherwise as soon as possible.
+    """
+    if not tones:
+        return
+    # Imported here so the simulation can run headless without the
+    # audio extension (and without starting its synth thread).
+    import audio
+    rows = np.zeros(len(tones), dtype=TONE_DTYPE)
+    rows['pitch'], rows['duration'], rows['velocity'] = np.array(tones, dtype=float).T
+    audio.play_tones(rows, sample_time)
+
+
 class BaseAgent:
     def apply_rules(self, static_grid, dynamic_grid):
         raise NotImplementedError
 
 
+class RobotState:
+    """Robot state held in parallel arrays, one row per robot.
+
+    ``positions`` is sorted in row-major order, matching the order in which
+    ``np.argwhere`` visits the dynamic grid, so the rules always process robots
+    in the same order as the original per-cell loop.
+    """
+
+    def __init__(self, positions, directions, speeds, counters):
+        self.positions = np.asarray(positions, dtype=np.int64)
+        self.directions = np.asarray(directions, dtype=np.int64).reshape(-1, 2)
+        self.speeds = np.asarray(speeds, dtype=np.int64)
+        self.counters = np.asarray(counters, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.positions)
+
+    @classmethod
+    def empty(cls, ndim=2):
+        return cls(np.zeros((0, ndim)), np.zeros((0, 2)), [], [])
+
+    @classmethod
+    def from_dicts(cls, directions, speeds, counters):
+        keys = sorted(set(directions) | set(speeds) | set(counters))
+        if not keys:
+            return cls.empty()
+        return cls(
+            keys,
+            [directions.get(k, DIRECTIONS["RIGHT"]) for k in keys],
+            [speeds.get(k, 1) for k in keys],
+            [counters.get(k, 0) for k in keys],
+        )
+
+    def to_dicts(self):
+        keys = [tuple(p) for p in self.positions.tolist()]
+        directions = dict(zip(keys, map(tuple, self.directions.tolist())))
+        return directions, dict(zip(keys, self.speeds.tolist())), dict(zip(keys, self.counters.tolist()))
+
+    def aligned(self, positions, shape):
+        """Return the state of the robots at ``positions``, with defaults for unknown ones."""
+        if len(positions) == len(self) and np.array_equal(positions, self.positions):
+            return self
+
+        directions = np.tile(DIRECTIONS["RIGHT"], (len(positions), 1))
+        speeds = np.ones(len(positions), dtype=np.int64)
+        counters = np.zeros(len(positions), dtype=np.int64)
+
+        known = self.positions
+        if len(known) and known.shape[1] == len(shape):
+            in_bounds = np.all((known >= 0) & (known < shape), axis=1)
+            slots = np.full(int(np.prod(shape)), -1)
+            slots[np.ravel_multi_index(tuple(known[in_bounds].T), shape)] = np.flatnonzero(in_bounds)
+            idx = slots[np.ravel_multi_index(tuple(positions.T), shape)]
+            found = idx >= 0
+            directions[found] = self.directions[idx[found]]
+            speeds[found] = self.speeds[idx[found]]
+            counters[found] = self.counters[idx[found]]
+
+        return RobotState(positions, directions, speeds, counters)
+
+
+def step_robots(static_grid, dynamic_grid, state):
+    """Advance every robot on ``dynamic_grid`` by one tick.
+
+    Accepts a single (rows, cols) grid or a stack of grids shaped
+    (..., rows, cols); robots only ever move along the last two axes.
+    Returns the new dynamic grid, the new ``RobotState``, the positions of
+    the robots that landed on a static agent (in the order their tones play)
+    and the positions of every cell whose dynamic value changed.
+    """
+    positions = np.argwhere(dynamic_grid == ROBOT)
+    state = state.aligned(positions, dynamic_grid.shape)
+    board = np.array(static_grid.shape[-2:])
+
+    dirs = state.directions
+    moving = state.counters >= state.speeds - 1
+
+    ahead = positions.copy()
+    ahead[:, -2:] = (positions[:, -2:] + dirs) % board
+    cell = static_grid[tuple(ahead.T)]
+
+    dr, dc = dirs[:, 0], dirs[:, 1]
+    turns = [
+        cell == VERTICAL_REFLECT,
+        cell == HORIZONTAL_REFLECT,
+        cell == CLOCKWISE_ROTATOR,
+        cell == COUNTERCLOCKWISE_ROTATOR,
+    ]
+    turned = np.stack([
+        np.select(turns, [dr, -dr, -dc, dc], dr),
+        np.select(turns, [-dc, dc, dr, -dr], dc),
+    ], axis=1)
+
+    targets = positions.copy()
+    targets[moving, -2:] = (positions[moving, -2:] + turned[moving]) % board
+    new_dirs = np.where(moving[:, None], turned, dirs)
+    new_counters = np.where(moving, 0, state.counters + 1)
+
+    # When two robots end up on the same cell the one processed last wins,
+    # exactly as with the old dict-based loop.
+    flat = np.ravel_multi_index(tuple(targets.T), dynamic_grid.shape)
+    _, last = np.unique(flat[::-1], return_index=True)
+    keep = len(flat) - 1 - last
+
+    new_state = RobotState(targets[keep], new_dirs[keep], state.speeds[keep], new_counters[keep])
+    new_dynamic = np.zeros_like(dynamic_grid)
+    new_dynamic[tuple(new_state.positions.T)] = ROBOT
+
+    landed = moving & (static_grid[tuple(targets.T)] != EMPTY)
+    changed = np.argwhere(new_dynamic != dynamic_grid)
+    return new_dynamic, new_state, targets[landed], changed
+
+
 class MovingAgent(BaseAgent):
     def __init__(self, agent_type):
         self.agent_type = agent_type
-        self.directions = {}
-        self.speeds = {}
-        self.counters = {}
+        self.state = RobotState.empty()
+
+    @property
+    def directions(self):
+        return self.state.to_dicts()[0]
+
+    @directions.setter
+    def directions(self, value):
+        self._replace_dict(0, value)
+
+    @property
+    def speeds(self):
+        return self.state.to_dicts()[1]
+
+    @speeds.setter
+    def speeds(self, value):
+        self._replace_dict(1, value)
+
+    @property
+    def counters(self):
+        return self.state.to_dicts()[2]
+
+    @counters.setter
+    def counters(self, value):
+        self._replace_dict(2, value)
+
+    def _replace_dict(self, which, value):
+        """Set one of the three dicts; robots it has no key for are removed."""
+        dicts = [{k: v for k, v in d.items() if k in value} for d in self.state.to_dicts()]
+        dicts[which] = value
+        self.set_state(*dicts)
+
+    def set_state(self, directions, speeds, counters):
+        """Replace every robot with the ones keyed in the three dicts (not merged into the current ones)."""
+        self.state = RobotState.from_dicts(directions, speeds, counters)
+
+    def place(self, r, c, speed=1, direction=None):
+        directions, speeds, counters = self.state.to_dicts()
+        if direction is not None:
+            directions[(r, c)] = direction
+        speeds[(r, c)] = speed
+        counters[(r, c)] = 0
+        self.state = RobotState.from_dicts(directions, speeds, counters)
+
+    def remove(self, r, c):
+        keep = ~np.all(self.state.positions == (r, c), axis=1)
+        self.state = RobotState(
+            self.state.positions[keep], self.state.directions[keep],
+            self.state.speeds[keep], self.state.counters[keep]
+        )
 
     def apply_rules(self, static_grid, dynamic_grid, cell_attributes):
-        rows, cols = static_grid.shape
-        new_dynamic = np.zeros_like(dynamic_grid)
-        new_dirs, new_speeds, new_counters = {}, {}, {}
-
-        for r, c in np.argwhere(dynamic_grid == ROBOT):
-            speed = self.speeds.get((r, c), 1)
-            counter = self.counters.get((r, c), 0)
-
-            if counter < speed - 1:
-                new_dynamic[r, c] = ROBOT
-                new_dirs[(r, c)] = self.directions.get((r, c), DIRECTIONS["RIGHT"])
-                new_speeds[(r, c)] = speed
-                new_counters[(r, c)] = counter + 1
-                continue
-
-            new_counters[(r, c)] = 0
-
-            dir = self.directions.get((r, c), DIRECTIONS["RIGHT"])  # <-- Fix here
-            nr, nc = (r + dir[0]) % rows, (c + dir[1]) % cols
-            cell = static_grid[nr, nc]
-
-            if cell == VERTICAL_REFLECT:
-                dir = (dir[0], -dir[1])
-            elif cell == HORIZONTAL_REFLECT:
-                dir = (-dir[0], dir[1])
-            elif cell == CLOCKWISE_ROTATOR:
-                dir = (-dir[1], dir[0])
-            elif cell == COUNTERCLOCKWISE_ROTATOR:
-                dir = (dir[1], -dir[0])
-
-            final_r, final_c = (r + dir[0]) % rows, (c + dir[1]) % cols
-            final_cell = static_grid[final_r, final_c]
-
-            new_dynamic[final_r, final_c] = ROBOT
-            new_dirs[(final_r, final_c)] = dir
-            new_speeds[(final_r, final_c)] = speed
-            new_counters[(final_r, final_c)] = 0
-
-            if final_cell:
-                self.play_tone(final_r, final_c, cell_attributes)
-
-        self.directions, self.speeds, self.counters = new_dirs, new_speeds, new_counters
+        new_dynamic, self.state, landed, _ = step_robots(static_grid, dynamic_grid, self.state)
+        play_tones(cell_attributes.tones(landed))
         return new_dynamic
 
     def play_tone(self, r, c, cell_attributes):
-        attr = cell_attributes.get((r, c), {'pitch': 440.0, 'duration': 0.5, 'velocity': 100})
-        audio.play_tone(attr['pitch'], attr['duration'], attr.get('velocity', 100), [1.0])
+        play_tones([tone_attributes(r, c, cell_attributes)])
 
 
 class RobotAgent(MovingAgent):
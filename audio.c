@@ -1,5 +1,7 @@
 #include <Python.h>
+#ifdef __APPLE__
 #include <AudioToolbox/AudioToolbox.h>
+#endif
 #include <pthread.h>
 #include <unistd.h>
 #include <math.h>
@@ -7,14 +9,51 @@
 #include <stdio.h>
 #include <stdint.h>
 #include <string.h>
+#include <time.h>
+#include <stdatomic.h>
 
 #define SAMPLE_RATE 44100
 #define PI 3.14159265358979323846
 #define MAX_VOLUME 32767
-#define MAX_POLYPHONY 16
+#define MAX_POLYPHONY 16       // default voice pool size, and the mix headroom per voice
+#define MAX_VOICES 256         // largest pool set_polyphony() allows
 #define NUM_BUFFERS 3
 #define BUFFER_SIZE 1024
 #define MAX_HARMONICS 100
+#define RING_FRAMES (8 * BUFFER_SIZE)
+#define WAVETABLE_SIZE 8192   // samples per cycle, a power of two
+#define WAVETABLE_CACHE 32
+#define NOTE_QUEUE_SIZE 256   // pending note-ons, a power of two
+#define MAX_SCHEDULED 1024    // note-ons waiting for their start sample
+#define MAX_HARMONIC_SETS 256
+#define RECORD_RING_FRAMES (1 << 18)  // ~6 s of float samples between callback and writer
+#define RECORD_CHUNK_FRAMES 16384     // frames per write to disk
+#define RECORD_SYNC_SECONDS 1         // how often the WAV header is patched
+
+#define OSC_SINE 0
+#define OSC_WAVETABLE 1
+
+// What to do with a note-on when every voice is busy.
+#define STEAL_NONE 0        // drop the new note
+#define STEAL_OLDEST 1      // cut the longest-running voice
+#define STEAL_QUIETEST 2    // cut the voice with the lowest envelope level
+#define STEAL_RETRIGGER 3   // restart a voice already playing that pitch, else the oldest
+
+static const char *steal_policy_names[] = {"none", "oldest", "quietest", "retrigger"};
+
+#define MIXER_FLOAT 0    // float bus, envelope ramps, one clip on the master
+#define MIXER_LEGACY 1   // int16 bus clipped after every voice, kept for benchmarks
+
+#define WAVE_FORMAT_PCM 1
+#define WAVE_FORMAT_IEEE_FLOAT 3
+
+// Sample formats start_recording() can write.
+#define RECORD_INT16 0
+#define RECORD_INT24 1
+#define RECORD_FLOAT32 2
+
+static const char *record_format_names[] = {"int16", "int24", "float32"};
+static const int record_format_bytes[] = {2, 3, 4};
 
 #define ATTACK_TIME 0.001
 #define DECAY_TIME  0.04
@@ -22,6 +61,16 @@
 #define RELEASE_TIME 0.2
 #define CLIP_THRESHOLD 0.95
 
+// One cycle of a harmonic-weight set, summed once and shared by every voice
+// that uses the same weights. Entries stay cached after their last user ends
+// and are only rebuilt when the slot is needed for another weight set.
+typedef struct {
+    atomic_int refcount;
+    int num_harmonics;
+    double weights[MAX_HARMONICS];
+    float samples[WAVETABLE_SIZE + 1];  // extra guard sample for interpolation
+} Wavetable;
+
 typedef struct {
     int active;
     double frequency;
@@ -31,28 +80,178 @@ typedef struct {
     double elapsedTime;
     int num_harmonics;
     double harmonic_weights[MAX_HARMONICS];
+    Wavetable *table;  // NULL: sum sin() per harmonic
+    double gain;
+    uint64_t order;    // start sequence number, for stealing the oldest
 } Voice;
 
+// The first `size` voices plus a stack of the free ones. Voices go back on
+// the stack the moment they end, so starting a note never scans the pool.
+typedef struct {
+    Voice voices[MAX_VOICES];
+    int size;
+    int free_slots[MAX_VOICES];
+    int num_free;
+    uint64_t started;
+    uint64_t stolen;
+} VoicePool;
+
+typedef struct {
+    double time;
+    double frequency;
+    double duration;
+    int velocity;
+    int num_harmonics;
+    double harmonic_weights[MAX_HARMONICS];
+} NoteEvent;
+
+// A note-on waiting for the audio thread, with its table already acquired.
+// start_frame is the absolute sample time to start at; 0 means "as soon as
+// possible".
+typedef struct {
+    NoteEvent note;
+    uint64_t start_frame;
+    double phase;
+    Wavetable *table;
+} QueuedNote;
+
+// Single-producer/single-consumer ring of note-ons. Producers (play_tone,
+// play_tones) take producer_mutex among themselves, once per batch;
+// synth_render_block is the only consumer and never takes a lock. A full
+// queue drops notes rather than waiting.
+typedef struct {
+    QueuedNote notes[NOTE_QUEUE_SIZE];
+    atomic_size_t head;  // next slot to fill, advanced by the producer
+    atomic_size_t tail;  // next slot to drain, advanced by the consumer
+    pthread_mutex_t producer_mutex;
+} NoteQueue;
+
+// One row of the array passed to audio.play_tones; the NumPy dtype is
+// agents.TONE_DTYPE.
+typedef struct {
+    double pitch;
+    double duration;
+    int32_t velocity;
+    int32_t harmonics;  // id from audio.register_harmonics (0 is [1.0])
+} ToneRow;
+
+typedef struct {
+    int num_harmonics;
+    double weights[MAX_HARMONICS];
+} HarmonicSet;
+
+// Block timing, so throughput and latency can be measured with any backend.
+// Written by the audio thread and read from Python without locking.
+typedef struct {
+    atomic_uint_fast64_t blocks;
+    atomic_uint_fast64_t frames;
+    atomic_uint_fast64_t render_ns;
+    atomic_uint_fast64_t max_render_ns;
+    atomic_uint_fast64_t underruns;
+    atomic_uint_fast64_t dropped_notes;
+    atomic_uint_fast64_t late_notes;
+    atomic_uint_fast64_t stolen_voices;
+    atomic_int active_voices;
+    atomic_int scheduled_notes;
+    // Over the last whole second of output, for sizing the pool.
+    atomic_int dropped_per_second;
+    atomic_int stolen_per_second;
+    atomic_int peak_voices;
+} SynthStats;
+
+// Pull-mode output: a producer thread keeps the ring topped up and
+// audio.pull() drains it.
+typedef struct {
+    int16_t samples[RING_FRAMES];
+    size_t read_pos;
+    size_t fill;
+    pthread_mutex_t mutex;
+    pthread_cond_t space;
+} RingBuffer;
+
+// Recording: the audio thread pushes each mixed block into a lock-free
+// single-producer/single-consumer ring, and a writer thread drains it to disk
+// in large chunks, so a slow disk can never stall the callback. If the
+// writer falls ~6 s behind, blocks are dropped and counted as overruns.
 typedef struct {
+    float samples[RECORD_RING_FRAMES];
+    atomic_size_t head;
+    atomic_size_t tail;
+    atomic_int active;   // the audio thread pushes while set
+    atomic_int stopping; // the writer drains what is left and exits
+    pthread_t writer;
+    char path[4096];
+    int format;
+    uint64_t rotate_frames;  // start a new file after this many frames (always under 4 GB)
+    FILE *file;
+    int file_index;
+    uint32_t file_frames;
+    void *chunk;  // page-aligned conversion buffer
+    atomic_uint_fast64_t frames_written;
+    atomic_uint_fast64_t overruns;
+} Recording;
+
+typedef struct Synth Synth;
+
+// An output sink. start() spawns whatever drives synth_render_block() and
+// returns 0, or returns -1 if the device can't be opened.
+typedef struct {
+    const char *name;
+    int (*start)(Synth *s);
+} AudioBackend;
+
+struct Synth {
+#ifdef __APPLE__
     AudioQueueRef queue;
     AudioQueueBufferRef buffers[NUM_BUFFERS];
-    Voice voices[MAX_POLYPHONY];
-    pthread_mutex_t voice_mutex;
-    FILE *wav_file;
-    uint32_t total_samples_written;
-    int recording;
-} Synth;
+#endif
+    const AudioBackend *backend;
+    VoicePool pool;  // owned by the audio thread
+    atomic_int requested_voices;
+    atomic_int steal_policy;
+    atomic_int mixer;
+    uint64_t window_start;  // per-second counters: frame, totals and peak at window start
+    uint64_t window_dropped;
+    uint64_t window_stolen;
+    int window_peak;
+    NoteQueue note_queue;
+    QueuedNote scheduled[MAX_SCHEDULED];  // min-heap on start_frame, audio thread only
+    int num_scheduled;
+    atomic_uint_fast64_t sample_clock;   // frames rendered since the backend started
+    HarmonicSet harmonic_sets[MAX_HARMONIC_SETS];  // never modified once published
+    atomic_int num_harmonic_sets;
+    int oscillator;
+    Wavetable *wavetables[WAVETABLE_CACHE];
+    pthread_mutex_t wavetable_mutex;
+    Recording recording;
+    FILE *sink_file;
+    uint32_t sink_samples_written;
+    RingBuffer ring;
+    SynthStats stats;
+};
 
 Synth synth;
 
-void write_wav_header(FILE *file, uint32_t sample_rate, uint16_t bits_per_sample, uint16_t channels);
-void finalize_wav_file(FILE *file, uint32_t total_samples);
-void* synth_thread(void* args);
-void audio_callback_synth(void* userData, AudioQueueRef queue, AudioQueueBufferRef buffer);
+void write_wav_header(FILE *file, uint32_t sample_rate, uint16_t bits_per_sample, uint16_t channels, uint16_t audio_format);
+void finalize_wav_file(FILE *file, uint32_t total_samples, uint16_t bytes_per_sample);
+void synth_render_block(Synth *s, int16_t *samples, int frames);
 double adsr_envelope(Voice *voice);
 double soft_clip(double sample);
+Wavetable* wavetable_acquire(double freq, double* harmonics, int num_harmonics);
+void wavetable_release(Wavetable *table);
+void start_voice(Voice *voice, double freq, double duration, double* harmonics, int num_harmonics, int velocity, double phase, Wavetable *table);
+void pool_resize(VoicePool *pool, int size);
+Voice* pool_allocate(VoicePool *pool, double freq, int policy);
+void pool_release(VoicePool *pool, Voice *voice);
+void mix_voices(VoicePool *pool, int16_t *samples, float *clipped, int frames);
+void mix_voices_legacy(VoicePool *pool, int16_t *samples, int frames);
+int note_queue_push(NoteQueue *queue, const QueuedNote *note);
+int note_queue_pop(NoteQueue *queue, QueuedNote *note);
+int queue_tone(uint64_t start_frame, double freq, double duration, double* harmonics, int num_harmonics, int velocity);
+size_t queue_tones(uint64_t start_frame, const ToneRow *rows, size_t count);
 void play_tone(double freq, double duration, double* harmonics, int num_harmonics, int velocity);
-void start_recording(const char *filename);
+int16_t* render_events(NoteEvent *events, int num_events, int64_t *num_frames);
+int start_recording(const char *filename, int format, double rotate_seconds);
 void stop_recording(void);
 
 double adsr_envelope(Voice *voice) {
@@ -78,82 +277,436 @@ double soft_clip(double sample) {
     return sample;
 }
 
-void* synth_thread(void* args) {
-    AudioStreamBasicDescription format = {
-        .mSampleRate = SAMPLE_RATE,
-        .mFormatID = kAudioFormatLinearPCM,
-        .mFormatFlags = kLinearPCMFormatFlagIsSignedInteger | kLinearPCMFormatFlagIsPacked,
-        .mFramesPerPacket = 1,
-        .mChannelsPerFrame = 1,
-        .mBitsPerChannel = 16,
-        .mBytesPerPacket = 2,
-        .mBytesPerFrame = 2
-    };
+static double sine_table[WAVETABLE_SIZE];
 
-    OSStatus status = AudioQueueNewOutput(&format, audio_callback_synth, &synth, NULL, NULL, 0, &synth.queue);
-    if (status != noErr) {
-        printf("AudioQueueNewOutput error: %d\n", (int)status);
-        return NULL;
+// Return a table for the harmonics of freq that lie below Nyquist, building
+// it if needed, with a reference the caller must wavetable_release(). Returns
+// NULL if every cache slot is in use, in which case the voice falls back to
+// per-sample sin(). Never called from the audio thread.
+static Wavetable* wavetable_acquire_locked(double freq, double* harmonics, int num_harmonics) {
+    if (num_harmonics > MAX_HARMONICS) num_harmonics = MAX_HARMONICS;
+    int band_limit = (int)(SAMPLE_RATE / 2.0 / freq);
+    if (num_harmonics > band_limit) num_harmonics = band_limit;
+    if (num_harmonics < 1) return NULL;
+
+    Wavetable *table = NULL;
+    int spare = -1;
+    for (int i = 0; i < WAVETABLE_CACHE; i++) {
+        Wavetable *entry = synth.wavetables[i];
+        if (!entry) {
+            if (spare < 0) spare = i;
+            continue;
+        }
+        if (entry->num_harmonics == num_harmonics &&
+            memcmp(entry->weights, harmonics, num_harmonics * sizeof(double)) == 0) {
+            table = entry;
+            break;
+        }
+        if (atomic_load(&entry->refcount) == 0 && (spare < 0 || synth.wavetables[spare])) spare = i;
     }
 
-    for (int i = 0; i < NUM_BUFFERS; i++) {
-        AudioQueueAllocateBuffer(synth.queue, BUFFER_SIZE * sizeof(int16_t), &synth.buffers[i]);
-        audio_callback_synth(&synth, synth.queue, synth.buffers[i]);
+    if (!table && spare >= 0) {
+        table = synth.wavetables[spare];
+        if (!table) table = synth.wavetables[spare] = malloc(sizeof(Wavetable));
+        if (table) {
+            atomic_store(&table->refcount, 0);
+            table->num_harmonics = num_harmonics;
+            memcpy(table->weights, harmonics, num_harmonics * sizeof(double));
+            // Harmonic h of sample i is sin(2*pi*h*i/N), i.e. the base sine at
+            // index h*i mod N, so building a table costs no sin() calls.
+            for (int i = 0; i < WAVETABLE_SIZE; i++) {
+                double val = 0.0;
+                for (int h = 0; h < num_harmonics; h++)
+                    val += harmonics[h] * sine_table[((size_t)(h + 1) * i) & (WAVETABLE_SIZE - 1)];
+                table->samples[i] = (float)val;
+            }
+            table->samples[WAVETABLE_SIZE] = table->samples[0];
+        }
     }
 
-    AudioQueueStart(synth.queue, NULL);
-    while (1) sleep(1);
-    return NULL;
+    if (table) atomic_fetch_add(&table->refcount, 1);
+    return table;
 }
 
-void play_tone(double freq, double duration, double* harmonics, int num_harmonics, int velocity) {
+Wavetable* wavetable_acquire(double freq, double* harmonics, int num_harmonics) {
+    pthread_mutex_lock(&synth.wavetable_mutex);
+    Wavetable *table = wavetable_acquire_locked(freq, harmonics, num_harmonics);
+    pthread_mutex_unlock(&synth.wavetable_mutex);
+    return table;
+}
+
+// Lock-free, so the audio thread can drop references. A table is only
+// rebuilt once its count reaches zero, i.e. when nothing can still read it.
+void wavetable_release(Wavetable *table) {
+    if (table) atomic_fetch_sub(&table->refcount, 1);
+}
+
+// Voices keep their table reference after they finish; it is dropped here
+// when the slot is reused.
+void start_voice(Voice *voice, double freq, double duration, double* harmonics, int num_harmonics, int velocity, double phase, Wavetable *table) {
     if (num_harmonics > MAX_HARMONICS) num_harmonics = MAX_HARMONICS;
+    wavetable_release(voice->table);
+    voice->table = table;
+    voice->active = 1;
+    voice->frequency = freq;
+    voice->duration = duration;
+    voice->phase = phase;
+    voice->phase_increment = 2.0 * PI * freq / SAMPLE_RATE;
+    voice->elapsedTime = 0.0;
+    voice->num_harmonics = num_harmonics;
+    double velocity_scale = fmin(fmax(velocity / 127.0, 0.0), 1.0);
+    voice->gain = velocity_scale;
+    for (int i = 0; i < num_harmonics; i++)
+        voice->harmonic_weights[i] = harmonics[i] * velocity_scale;
+}
 
-    pthread_mutex_lock(&synth.voice_mutex);
-    for (int v = 0; v < MAX_POLYPHONY; v++) {
-        if (!synth.voices[v].active) {
-            Voice *voice = &synth.voices[v];
-            voice->active = 1;
-            voice->frequency = freq;
-            voice->duration = duration;
-            voice->phase = ((double)rand() / RAND_MAX) * 2.0 * PI;  // Random phase for realism
-            voice->phase_increment = 2.0 * PI * freq / SAMPLE_RATE;
-            voice->elapsedTime = 0.0;
-            voice->num_harmonics = num_harmonics;
-            double velocity_scale = fmin(fmax(velocity / 127.0, 0.0), 1.0);
-            for (int i = 0; i < num_harmonics; i++)
-                voice->harmonic_weights[i] = harmonics[i] * velocity_scale;
-            printf("Playing tone %.2f Hz with %d harmonics\n", freq, num_harmonics);
-            break;
+int note_queue_push(NoteQueue *queue, const QueuedNote *note) {
+    size_t head = atomic_load_explicit(&queue->head, memory_order_relaxed);
+    size_t tail = atomic_load_explicit(&queue->tail, memory_order_acquire);
+    if (head - tail == NOTE_QUEUE_SIZE) return 0;
+    queue->notes[head & (NOTE_QUEUE_SIZE - 1)] = *note;
+    atomic_store_explicit(&queue->head, head + 1, memory_order_release);
+    return 1;
+}
+
+int note_queue_pop(NoteQueue *queue, QueuedNote *note) {
+    size_t tail = atomic_load_explicit(&queue->tail, memory_order_relaxed);
+    size_t head = atomic_load_explicit(&queue->head, memory_order_acquire);
+    if (tail == head) return 0;
+    *note = queue->notes[tail & (NOTE_QUEUE_SIZE - 1)];
+    atomic_store_explicit(&queue->tail, tail + 1, memory_order_release);
+    return 1;
+}
+
+// Fill in a note-on; the caller holds the wavetable lock.
+static void prepare_note(QueuedNote *queued, uint64_t start_frame, double freq, double duration,
+                         double* harmonics, int num_harmonics, int velocity) {
+    if (num_harmonics > MAX_HARMONICS) num_harmonics = MAX_HARMONICS;
+    queued->start_frame = start_frame;
+    queued->note.time = start_frame / (double)SAMPLE_RATE;
+    queued->note.frequency = freq;
+    queued->note.duration = duration;
+    queued->note.velocity = velocity;
+    queued->note.num_harmonics = num_harmonics;
+    memcpy(queued->note.harmonic_weights, harmonics, num_harmonics * sizeof(double));
+    // Random phase for realism, in [0, 2*PI): a phase of exactly 2*PI would
+    // index one past the end of the wavetable.
+    queued->phase = ((double)rand() / ((double)RAND_MAX + 1.0)) * 2.0 * PI;
+    queued->table = synth.oscillator == OSC_WAVETABLE ? wavetable_acquire_locked(freq, harmonics, num_harmonics) : NULL;
+}
+
+// Queue a note-on for the audio thread; never blocks on it. The wavetable is
+// looked up (or built) here so a new timbre never holds up the callback.
+// Returns 0 if the queue was full and the note was dropped.
+int queue_tone(uint64_t start_frame, double freq, double duration, double* harmonics, int num_harmonics, int velocity) {
+    QueuedNote queued;
+    pthread_mutex_lock(&synth.note_queue.producer_mutex);
+    pthread_mutex_lock(&synth.wavetable_mutex);
+    prepare_note(&queued, start_frame, freq, duration, harmonics, num_harmonics, velocity);
+    pthread_mutex_unlock(&synth.wavetable_mutex);
+    int queued_ok = note_queue_push(&synth.note_queue, &queued);
+    pthread_mutex_unlock(&synth.note_queue.producer_mutex);
+
+    if (!queued_ok) {
+        wavetable_release(queued.table);
+        synth.stats.dropped_notes++;
+    }
+    return queued_ok;
+}
+
+// Queue a batch of note-ons, all starting at start_frame, with one
+// acquisition of each producer-side lock and a single publish of the queue
+// head. Rows that don't fit in the queue are dropped. Returns the number
+// queued. Harmonic ids must already be validated.
+size_t queue_tones(uint64_t start_frame, const ToneRow *rows, size_t count) {
+    NoteQueue *queue = &synth.note_queue;
+    pthread_mutex_lock(&queue->producer_mutex);
+    size_t head = atomic_load_explicit(&queue->head, memory_order_relaxed);
+    size_t tail = atomic_load_explicit(&queue->tail, memory_order_acquire);
+    size_t space = NOTE_QUEUE_SIZE - (head - tail);
+    size_t n = count < space ? count : space;
+
+    pthread_mutex_lock(&synth.wavetable_mutex);
+    for (size_t i = 0; i < n; i++) {
+        const ToneRow *row = &rows[i];
+        HarmonicSet *set = &synth.harmonic_sets[row->harmonics];
+        prepare_note(&queue->notes[(head + i) & (NOTE_QUEUE_SIZE - 1)], start_frame, row->pitch,
+                     row->duration, set->weights, set->num_harmonics, row->velocity);
+    }
+    pthread_mutex_unlock(&synth.wavetable_mutex);
+
+    atomic_store_explicit(&queue->head, head + n, memory_order_release);
+    pthread_mutex_unlock(&queue->producer_mutex);
+    synth.stats.dropped_notes += count - n;
+    return n;
+}
+
+void play_tone(double freq, double duration, double* harmonics, int num_harmonics, int velocity) {
+    if (queue_tone(0, freq, duration, harmonics, num_harmonics, velocity))
+        printf("Playing tone %.2f Hz with %d harmonics\n", freq, num_harmonics);
+}
+
+// Use the first `size` slots, ending any voice beyond them, and rebuild the
+// free stack so the lowest free slot is handed out first.
+void pool_resize(VoicePool *pool, int size) {
+    for (int v = size; v < MAX_VOICES; v++) {
+        wavetable_release(pool->voices[v].table);
+        pool->voices[v].table = NULL;
+        pool->voices[v].active = 0;
+    }
+    pool->size = size;
+    pool->num_free = 0;
+    for (int v = size - 1; v >= 0; v--) {
+        if (!pool->voices[v].active) pool->free_slots[pool->num_free++] = v;
+    }
+}
+
+// Pick a voice for a new note: a free one, or one stolen by policy. Returns
+// NULL when the pool is full and the policy is STEAL_NONE.
+Voice* pool_allocate(VoicePool *pool, double freq, int policy) {
+    Voice *victim = NULL;
+
+    if (policy == STEAL_RETRIGGER) {
+        for (int v = 0; v < pool->size; v++) {
+            if (pool->voices[v].active && pool->voices[v].frequency == freq) {
+                victim = &pool->voices[v];
+                break;
+            }
+        }
+    }
+
+    if (!victim && pool->num_free > 0) {
+        Voice *voice = &pool->voices[pool->free_slots[--pool->num_free]];
+        voice->order = pool->started++;
+        return voice;
+    }
+
+    if (!victim && policy != STEAL_NONE) {
+        double quietest = INFINITY;
+        for (int v = 0; v < pool->size; v++) {
+            Voice *voice = &pool->voices[v];
+            if (policy == STEAL_QUIETEST) {
+                double level = adsr_envelope(voice) * voice->gain;
+                if (level < quietest) {
+                    quietest = level;
+                    victim = voice;
+                }
+            } else if (!victim || voice->order < victim->order) {
+                victim = voice;
+            }
         }
     }
-    pthread_mutex_unlock(&synth.voice_mutex);
+
+    if (victim) {
+        victim->order = pool->started++;
+        pool->stolen++;
+    }
+    return victim;
 }
 
-void audio_callback_synth(void* userData, AudioQueueRef queue, AudioQueueBufferRef buffer) {
-    Synth *s = (Synth*)userData;
-    int16_t* samples = (int16_t*)buffer->mAudioData;
-    int frames = buffer->mAudioDataBytesCapacity / 2;
+void pool_release(VoicePool *pool, Voice *voice) {
+    voice->active = 0;
+    pool->free_slots[pool->num_free++] = (int)(voice - pool->voices);
+}
 
-    memset(samples, 0, frames * sizeof(int16_t));
-    pthread_mutex_lock(&s->voice_mutex);
+static void start_queued_note(Synth *s, QueuedNote *queued) {
+    NoteEvent *note = &queued->note;
+    Voice *voice = pool_allocate(&s->pool, note->frequency, s->steal_policy);
+    if (!voice) {
+        wavetable_release(queued->table);
+        s->stats.dropped_notes++;
+        return;
+    }
+    start_voice(voice, note->frequency, note->duration, note->harmonic_weights,
+                note->num_harmonics, note->velocity, queued->phase, queued->table);
+}
+
+// Binary min-heap of scheduled notes keyed on start_frame.
+static void schedule_push(Synth *s, const QueuedNote *queued) {
+    int i = s->num_scheduled++;
+    while (i > 0) {
+        int parent = (i - 1) / 2;
+        if (s->scheduled[parent].start_frame <= queued->start_frame) break;
+        s->scheduled[i] = s->scheduled[parent];
+        i = parent;
+    }
+    s->scheduled[i] = *queued;
+}
+
+static void schedule_pop(Synth *s, QueuedNote *queued) {
+    *queued = s->scheduled[0];
+    QueuedNote last = s->scheduled[--s->num_scheduled];
+    int i = 0;
+    while (1) {
+        int child = 2 * i + 1;
+        if (child >= s->num_scheduled) break;
+        if (child + 1 < s->num_scheduled && s->scheduled[child + 1].start_frame < s->scheduled[child].start_frame)
+            child++;
+        if (last.start_frame <= s->scheduled[child].start_frame) break;
+        s->scheduled[i] = s->scheduled[child];
+        i = child;
+    }
+    if (s->num_scheduled > 0) s->scheduled[i] = last;
+}
+
+// Move every queued note-on into the schedule. Runs on the audio thread.
+static void drain_note_queue(Synth *s) {
+    QueuedNote queued;
+    while (note_queue_pop(&s->note_queue, &queued)) {
+        if (s->num_scheduled == MAX_SCHEDULED) {
+            wavetable_release(queued.table);
+            s->stats.dropped_notes++;
+            continue;
+        }
+        schedule_push(s, &queued);
+    }
+}
+
+// Render up to frames samples of one voice into out, already scaled by its
+// velocity and share of the mix, and return how many it produced before
+// the note ended. The ADSR envelope is piecewise linear, so it is applied as
+// a linear ramp over each stretch between breakpoints instead of being
+// re-evaluated per sample.
+static int render_voice_block(Voice *voice, float *out, int frames) {
+    const double level = 1.0 / MAX_POLYPHONY;
+    const double dt = 1.0 / SAMPLE_RATE;
+    int i = 0;
+
+    while (i < frames && voice->elapsedTime < voice->duration) {
+        double t = voice->elapsedTime;
+        double end, slope;  // segment end time and envelope slope per second
+        if (t < ATTACK_TIME) {
+            end = ATTACK_TIME;
+            slope = 1.0 / ATTACK_TIME;
+        } else if (t < ATTACK_TIME + DECAY_TIME) {
+            end = ATTACK_TIME + DECAY_TIME;
+            slope = -(1.0 - SUSTAIN_LEVEL) / DECAY_TIME;
+        } else if (t < voice->duration - RELEASE_TIME) {
+            end = voice->duration - RELEASE_TIME;
+            slope = 0.0;
+        } else {
+            end = voice->duration;
+            slope = -SUSTAIN_LEVEL / RELEASE_TIME;
+        }
+        if (end > voice->duration) end = voice->duration;
+
+        int len = (int)ceil((end - t) * SAMPLE_RATE);
+        if (len < 1) len = 1;
+        if (len > frames - i) len = frames - i;
+
+        double env = adsr_envelope(voice);
+        double env_step = slope * dt;
+        double phase = voice->phase;
+
+        if (voice->table) {
+            const float *table = voice->table->samples;
+            const double scale = WAVETABLE_SIZE / (2.0 * PI);
+            double gain = voice->gain * level;
+            for (int k = 0; k < len; k++) {
+                double pos = phase * scale;
+                int index = (int)pos;
+                double frac = pos - index;
+                index &= WAVETABLE_SIZE - 1;  // a phase just under 2*PI can round pos up to the size
+                out[i + k] = (float)(gain * env * (table[index] + frac * (table[index + 1] - table[index])));
+                env += env_step;
+                phase += voice->phase_increment;
+                if (phase >= 2.0 * PI) phase -= 2.0 * PI;
+            }
+        } else {
+            for (int k = 0; k < len; k++) {
+                double val = 0.0;
+                for (int h = 0; h < voice->num_harmonics; h++)
+                    val += voice->harmonic_weights[h] * sin((h + 1) * phase);
+                out[i + k] = (float)(level * env * val);
+                env += env_step;
+                phase += voice->phase_increment;
+                if (phase >= 2.0 * PI) phase -= 2.0 * PI;
+            }
+        }
 
-    // Generate all voices into samples
-    for (int v = 0; v < MAX_POLYPHONY; v++) {
-        Voice *voice = &s->voices[v];
+        voice->phase = phase;
+        voice->elapsedTime += len * dt;
+        i += len;
+    }
+    return i;
+}
+
+// Soft-clip the float bus once into int16 output (and, if clipped is not
+// NULL, the clipped float samples too). Same curve as soft_clip(), written
+// without branches or pow() so the compiler can vectorize it.
+static void master_clip(const float *bus, int16_t *out, float *clipped, int frames) {
+    const float threshold = CLIP_THRESHOLD;
+    const float knee = 1.0f - CLIP_THRESHOLD;
+    for (int i = 0; i < frames; i++) {
+        float x = bus[i];
+        float magnitude = fabsf(x);
+        float over = fmaxf(magnitude - threshold, 0.0f);
+        float r = over / knee;
+        float y = copysignf(fminf(magnitude, threshold) + over / (1.0f + r * r), x);
+        out[i] = (int16_t)(y * MAX_VOLUME);
+        if (clipped) clipped[i] = y;
+    }
+}
+
+// Mix every active voice into samples (overwriting them), returning voices to
+// the free stack as they end. Each voice renders a float block that is
+// summed on a float bus, and the bus is clipped once. clipped, if not NULL,
+// also gets the output as floats. Shared by the live callback and the
+// offline renderer.
+void mix_voices(VoicePool *pool, int16_t *samples, float *clipped, int frames) {
+    if (synth.mixer == MIXER_LEGACY) {
+        mix_voices_legacy(pool, samples, frames);
+        if (clipped) {
+            for (int i = 0; i < frames; i++) clipped[i] = samples[i] / (float)MAX_VOLUME;
+        }
+        return;
+    }
+
+    float bus[BUFFER_SIZE];
+    float block[BUFFER_SIZE];
+    while (frames > 0) {
+        int n = frames < BUFFER_SIZE ? frames : BUFFER_SIZE;
+        memset(bus, 0, n * sizeof(float));
+        for (int v = 0; v < pool->size; v++) {
+            Voice *voice = &pool->voices[v];
+            if (!voice->active) continue;
+            int produced = render_voice_block(voice, block, n);
+            for (int i = 0; i < produced; i++) bus[i] += block[i];
+            if (voice->elapsedTime >= voice->duration) pool_release(pool, voice);
+        }
+        master_clip(bus, samples, clipped, n);
+        samples += n;
+        if (clipped) clipped += n;
+        frames -= n;
+    }
+}
+
+// The original mixer: each voice is added straight into the int16 buffer and
+// the running sum is soft-clipped after every voice. Selected with
+// audio.set_mixer('legacy') to compare against mix_voices.
+void mix_voices_legacy(VoicePool *pool, int16_t *samples, int frames) {
+    for (int v = 0; v < pool->size; v++) {
+        Voice *voice = &pool->voices[v];
         if (!voice->active) continue;
 
         for (int i = 0; i < frames; i++) {
-            if (voice->elapsedTime >= voice->duration) {
-                voice->active = 0;
-                break;
-            }
+            if (voice->elapsedTime >= voice->duration) break;
 
             double env = adsr_envelope(voice);
             double val = 0.0;
 
-            for (int h = 0; h < voice->num_harmonics; h++) {
-                val += voice->harmonic_weights[h] * sin((h + 1) * voice->phase);
+            if (voice->table) {
+                // Same phase accumulator as the sin() path, read as a table position.
+                double pos = voice->phase * (WAVETABLE_SIZE / (2.0 * PI));
+                int index = (int)pos;
+                double frac = pos - index;
+                index &= WAVETABLE_SIZE - 1;  // a phase just under 2*PI can round pos up to the size
+                const float *t = voice->table->samples;
+                val = voice->gain * (t[index] + frac * (t[index + 1] - t[index]));
+            } else {
+                for (int h = 0; h < voice->num_harmonics; h++) {
+                    val += voice->harmonic_weights[h] * sin((h + 1) * voice->phase);
+                }
             }
 
             val *= env;
@@ -166,38 +719,481 @@ void audio_callback_synth(void* userData, AudioQueueRef queue, AudioQueueBufferR
             if (voice->phase >= 2.0 * PI) voice->phase -= 2.0 * PI;
             voice->elapsedTime += 1.0 / SAMPLE_RATE;
         }
+        if (voice->elapsedTime >= voice->duration) pool_release(pool, voice);
+    }
+}
+
+static uint64_t now_ns(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (uint64_t)ts.tv_sec * 1000000000ull + ts.tv_nsec;
+}
+
+// Hand a mixed block to the writer thread; never waits.
+static void record_block(Recording *rec, const float *samples, int frames) {
+    size_t head = atomic_load_explicit(&rec->head, memory_order_relaxed);
+    size_t tail = atomic_load_explicit(&rec->tail, memory_order_acquire);
+    if (RECORD_RING_FRAMES - (head - tail) < (size_t)frames) {
+        rec->overruns++;
+        return;
+    }
+    for (int i = 0; i < frames; i++)
+        rec->samples[(head + i) & (RECORD_RING_FRAMES - 1)] = samples[i];
+    atomic_store_explicit(&rec->head, head + frames, memory_order_release);
+}
+
+// Mix one block of output from the live voices, whatever the backend.
+void synth_render_block(Synth *s, int16_t *samples, int frames) {
+    uint64_t started = now_ns();
+    float clipped[frames];
+    int recording = s->recording.active;
+
+    memset(samples, 0, frames * sizeof(int16_t));
+    if (s->requested_voices != s->pool.size) pool_resize(&s->pool, s->requested_voices);
+    drain_note_queue(s);
+
+    // Split the block at each scheduled start so notes begin on their exact
+    // sample; anything due before this block starts at its first sample.
+    uint64_t block_start = s->sample_clock;
+    int done = 0;
+    while (s->num_scheduled > 0 && s->scheduled[0].start_frame < block_start + frames) {
+        QueuedNote queued;
+        schedule_pop(s, &queued);
+        int offset = 0;
+        if (queued.start_frame > block_start)
+            offset = (int)(queued.start_frame - block_start);
+        else if (queued.start_frame > 0 && queued.start_frame < block_start)
+            s->stats.late_notes++;
+        if (offset > done) {
+            mix_voices(&s->pool, samples + done, recording ? clipped + done : NULL, offset - done);
+            done = offset;
+        }
+        start_queued_note(s, &queued);
     }
+    mix_voices(&s->pool, samples + done, recording ? clipped + done : NULL, frames - done);
+    s->sample_clock += frames;
+    if (recording) record_block(&s->recording, clipped, frames);
+
+    int active = s->pool.size - s->pool.num_free;
+    if (active > s->window_peak) s->window_peak = active;
+    if (s->sample_clock - s->window_start >= SAMPLE_RATE) {
+        s->stats.dropped_per_second = (int)(s->stats.dropped_notes - s->window_dropped);
+        s->stats.stolen_per_second = (int)(s->pool.stolen - s->window_stolen);
+        s->stats.peak_voices = s->window_peak;
+        s->window_start = s->sample_clock;
+        s->window_dropped = s->stats.dropped_notes;
+        s->window_stolen = s->pool.stolen;
+        s->window_peak = active;
+    }
+
+    uint64_t elapsed = now_ns() - started;
+    s->stats.blocks++;
+    s->stats.frames += frames;
+    s->stats.render_ns += elapsed;
+    if (elapsed > s->stats.max_render_ns) s->stats.max_render_ns = elapsed;
+    s->stats.active_voices = active;
+    s->stats.stolen_voices = s->pool.stolen;
+    s->stats.scheduled_notes = s->num_scheduled;
+}
+
+// ---- Backends ----
 
-    pthread_mutex_unlock(&s->voice_mutex);
+#ifdef __APPLE__
+void audio_callback_synth(void* userData, AudioQueueRef queue, AudioQueueBufferRef buffer) {
+    Synth *s = (Synth*)userData;
+    int16_t* samples = (int16_t*)buffer->mAudioData;
+    int frames = buffer->mAudioDataBytesCapacity / 2;
+
+    synth_render_block(s, samples, frames);
 
     buffer->mAudioDataByteSize = frames * sizeof(int16_t);
     AudioQueueEnqueueBuffer(queue, buffer, 0, NULL);
+}
 
-    // ✅ Now write entire buffer to WAV file after mixing all voices
-    if (s->recording && s->wav_file) {
-        fwrite(samples, sizeof(int16_t), frames, s->wav_file);
-        s->total_samples_written += frames;
+static int coreaudio_start(Synth *s) {
+    AudioStreamBasicDescription format = {
+        .mSampleRate = SAMPLE_RATE,
+        .mFormatID = kAudioFormatLinearPCM,
+        .mFormatFlags = kLinearPCMFormatFlagIsSignedInteger | kLinearPCMFormatFlagIsPacked,
+        .mFramesPerPacket = 1,
+        .mChannelsPerFrame = 1,
+        .mBitsPerChannel = 16,
+        .mBytesPerPacket = 2,
+        .mBytesPerFrame = 2
+    };
+
+    OSStatus status = AudioQueueNewOutput(&format, audio_callback_synth, s, NULL, NULL, 0, &s->queue);
+    if (status != noErr) {
+        printf("AudioQueueNewOutput error: %d\n", (int)status);
+        return -1;
+    }
+
+    for (int i = 0; i < NUM_BUFFERS; i++) {
+        AudioQueueAllocateBuffer(s->queue, BUFFER_SIZE * sizeof(int16_t), &s->buffers[i]);
+        audio_callback_synth(s, s->queue, s->buffers[i]);
     }
+
+    AudioQueueStart(s->queue, NULL);
+    return 0;
 }
+#endif
+
+// Render blocks at the pace a sound card would pull them, handing each one to
+// write_block (which may be NULL to discard it).
+static void run_clocked(Synth *s, void (*write_block)(Synth *s, int16_t *samples, int frames)) {
+    int16_t samples[BUFFER_SIZE];
+    uint64_t block_ns = (uint64_t)BUFFER_SIZE * 1000000000ull / SAMPLE_RATE;
+    uint64_t deadline = now_ns();
+
+    while (1) {
+        synth_render_block(s, samples, BUFFER_SIZE);
+        if (write_block) write_block(s, samples, BUFFER_SIZE);
 
-void start_recording(const char *filename) {
-    if (synth.recording) return;
-    synth.wav_file = fopen(filename, "wb");
-    if (!synth.wav_file) return;
-    synth.total_samples_written = 0;
-    synth.recording = 1;
-    write_wav_header(synth.wav_file, SAMPLE_RATE, 16, 1);
+        deadline += block_ns;
+        uint64_t now = now_ns();
+        if (now < deadline) {
+            struct timespec wait = {
+                .tv_sec = (deadline - now) / 1000000000ull,
+                .tv_nsec = (deadline - now) % 1000000000ull
+            };
+            nanosleep(&wait, NULL);
+        } else {
+            s->stats.underruns++;  // rendering fell behind real time
+            deadline = now;
+        }
+    }
 }
 
+static void* null_thread(void* args) {
+    run_clocked((Synth*)args, NULL);
+    return NULL;
+}
+
+static int null_start(Synth *s) {
+    pthread_t thread;
+    if (pthread_create(&thread, NULL, null_thread, s) != 0) return -1;
+    pthread_detach(thread);
+    return 0;
+}
+
+// Patch the WAV sizes to cover everything written so far, so the file is
+// readable while it grows and after the process exits.
+static void file_sink_sync(Synth *s) {
+    flockfile(s->sink_file);
+    long pos = ftell(s->sink_file);
+    finalize_wav_file(s->sink_file, s->sink_samples_written, sizeof(int16_t));
+    fseek(s->sink_file, pos, SEEK_SET);
+    fflush(s->sink_file);
+    funlockfile(s->sink_file);
+}
+
+static void file_write_block(Synth *s, int16_t *samples, int frames) {
+    flockfile(s->sink_file);
+    fwrite(samples, sizeof(int16_t), frames, s->sink_file);
+    s->sink_samples_written += frames;
+    funlockfile(s->sink_file);
+    if (s->stats.blocks % 16 == 0) file_sink_sync(s);
+}
+
+static void file_sink_atexit(void) {
+    file_sink_sync(&synth);
+}
+
+static void* file_thread(void* args) {
+    run_clocked((Synth*)args, file_write_block);
+    return NULL;
+}
+
+static int file_start(Synth *s) {
+    const char *filename = getenv("CELLBEAT_AUDIO_FILE");
+    if (!filename || !*filename) filename = "cellbeat_output.wav";
+    s->sink_file = fopen(filename, "wb");
+    if (!s->sink_file) {
+        printf("Could not open audio output file %s\n", filename);
+        return -1;
+    }
+    s->sink_samples_written = 0;
+    write_wav_header(s->sink_file, SAMPLE_RATE, 16, 1, WAVE_FORMAT_PCM);
+    fflush(s->sink_file);
+    Py_AtExit(file_sink_atexit);
+
+    pthread_t thread;
+    if (pthread_create(&thread, NULL, file_thread, s) != 0) return -1;
+    pthread_detach(thread);
+    return 0;
+}
+
+static void* ring_thread(void* args) {
+    Synth *s = (Synth*)args;
+    RingBuffer *ring = &s->ring;
+    int16_t samples[BUFFER_SIZE];
+
+    while (1) {
+        pthread_mutex_lock(&ring->mutex);
+        while (RING_FRAMES - ring->fill < BUFFER_SIZE)
+            pthread_cond_wait(&ring->space, &ring->mutex);
+        pthread_mutex_unlock(&ring->mutex);
+
+        synth_render_block(s, samples, BUFFER_SIZE);
+
+        pthread_mutex_lock(&ring->mutex);
+        size_t write_pos = (ring->read_pos + ring->fill) % RING_FRAMES;
+        for (int i = 0; i < BUFFER_SIZE; i++)
+            ring->samples[(write_pos + i) % RING_FRAMES] = samples[i];
+        ring->fill += BUFFER_SIZE;
+        pthread_mutex_unlock(&ring->mutex);
+    }
+    return NULL;
+}
+
+static int ring_start(Synth *s) {
+    pthread_mutex_init(&s->ring.mutex, NULL);
+    pthread_cond_init(&s->ring.space, NULL);
+    s->ring.read_pos = 0;
+    s->ring.fill = 0;
+
+    pthread_t thread;
+    if (pthread_create(&thread, NULL, ring_thread, s) != 0) return -1;
+    pthread_detach(thread);
+    return 0;
+}
+
+// Copy up to frames samples out of the ring, padding with silence (and
+// counting an underrun) if the producer hasn't kept up.
+static size_t ring_pull(Synth *s, int16_t *out, size_t frames) {
+    RingBuffer *ring = &s->ring;
+    pthread_mutex_lock(&ring->mutex);
+    size_t n = frames < ring->fill ? frames : ring->fill;
+    for (size_t i = 0; i < n; i++)
+        out[i] = ring->samples[(ring->read_pos + i) % RING_FRAMES];
+    ring->read_pos = (ring->read_pos + n) % RING_FRAMES;
+    ring->fill -= n;
+    if (n < frames) {
+        memset(out + n, 0, (frames - n) * sizeof(int16_t));
+        s->stats.underruns++;
+    }
+    pthread_cond_signal(&ring->space);
+    pthread_mutex_unlock(&ring->mutex);
+    return n;
+}
+
+static const AudioBackend backends[] = {
+#ifdef __APPLE__
+    {"coreaudio", coreaudio_start},
+#endif
+    {"null", null_start},
+    {"file", file_start},
+    {"ring", ring_start},
+};
+
+// Pick the backend named by CELLBEAT_AUDIO_BACKEND, defaulting to the first
+// (the sound card where there is one, else the null sink).
+static const AudioBackend* select_backend(void) {
+    const char *name = getenv("CELLBEAT_AUDIO_BACKEND");
+    size_t count = sizeof(backends) / sizeof(backends[0]);
+    if (!name || !*name) return &backends[0];
+    for (size_t i = 0; i < count; i++) {
+        if (strcmp(backends[i].name, name) == 0) return &backends[i];
+    }
+    printf("Unknown audio backend %s, using %s\n", name, backends[0].name);
+    return &backends[0];
+}
+
+// Render time-sorted note events offline, sample-accurately and faster than
+// real time. Uses a private voice pool with the live pool size, stealing
+// policy and mixing; phases start at 0 so output is repeatable.
+// Returns a malloc'ed mono int16 buffer (caller frees), or NULL.
+int16_t* render_events(NoteEvent *events, int num_events, int64_t *num_frames) {
+    VoicePool *pool = calloc(1, sizeof(VoicePool));
+    if (!pool) return NULL;
+    pool_resize(pool, synth.requested_voices);
+    int policy = synth.steal_policy;
+
+    int64_t total = 0;
+    for (int e = 0; e < num_events; e++) {
+        int64_t end = llround(events[e].time * SAMPLE_RATE) + (int64_t)ceil(events[e].duration * SAMPLE_RATE);
+        if (end > total) total = end;
+    }
+    *num_frames = total;
+    int16_t *out = calloc(total > 0 ? total : 1, sizeof(int16_t));
+    if (!out) {
+        free(pool);
+        return NULL;
+    }
+
+    int64_t cursor = 0;
+    for (int e = 0; e <= num_events; e++) {
+        int64_t start = e < num_events ? llround(events[e].time * SAMPLE_RATE) : total;
+        if (start > total) start = total;
+        while (cursor < start) {
+            int frames = (start - cursor) > BUFFER_SIZE ? BUFFER_SIZE : (int)(start - cursor);
+            mix_voices(pool, out + cursor, NULL, frames);
+            cursor += frames;
+        }
+        if (e == num_events) break;
+
+        NoteEvent *ev = &events[e];
+        Voice *voice = pool_allocate(pool, ev->frequency, policy);
+        if (voice) {
+            Wavetable *table = synth.oscillator == OSC_WAVETABLE
+                ? wavetable_acquire(ev->frequency, ev->harmonic_weights, ev->num_harmonics) : NULL;
+            start_voice(voice, ev->frequency, ev->duration, ev->harmonic_weights,
+                        ev->num_harmonics, ev->velocity, 0.0, table);
+        }
+    }
+    for (int v = 0; v < MAX_VOICES; v++) wavetable_release(pool->voices[v].table);
+    free(pool);
+    return out;
+}
+
+// Patch the header of the current file to cover everything written so far.
+static void recording_sync(Recording *rec) {
+    long pos = ftell(rec->file);
+    finalize_wav_file(rec->file, rec->file_frames, record_format_bytes[rec->format]);
+    fseek(rec->file, pos, SEEK_SET);
+    fflush(rec->file);
+}
+
+// Open the next file: the requested path first, then name_001.wav and so on
+// once rotation kicks in.
+static int recording_open(Recording *rec) {
+    char path[sizeof(rec->path) + 16];
+    if (rec->file_index == 0) {
+        snprintf(path, sizeof(path), "%s", rec->path);
+    } else {
+        const char *dot = strrchr(rec->path, '.');
+        const char *slash = strrchr(rec->path, '/');
+        int stem = (dot && (!slash || dot > slash)) ? (int)(dot - rec->path) : (int)strlen(rec->path);
+        snprintf(path, sizeof(path), "%.*s_%03d%s", stem, rec->path, rec->file_index, rec->path + stem);
+    }
+    rec->file = fopen(path, "wb");
+    if (!rec->file) return -1;
+    setvbuf(rec->file, NULL, _IONBF, 0);  // chunks are already large; write them straight through
+    rec->file_frames = 0;
+    int bytes = record_format_bytes[rec->format];
+    write_wav_header(rec->file, SAMPLE_RATE, bytes * 8, 1,
+                     rec->format == RECORD_FLOAT32 ? WAVE_FORMAT_IEEE_FLOAT : WAVE_FORMAT_PCM);
+    return 0;
+}
+
+static void recording_close(Recording *rec) {
+    if (!rec->file) return;
+    recording_sync(rec);
+    fclose(rec->file);
+    rec->file = NULL;
+}
+
+// Convert n ring samples starting at tail into the chunk buffer.
+static void recording_convert(Recording *rec, size_t tail, size_t n) {
+    for (size_t i = 0; i < n; i++) {
+        float x = rec->samples[(tail + i) & (RECORD_RING_FRAMES - 1)];
+        if (rec->format == RECORD_INT16) {
+            ((int16_t*)rec->chunk)[i] = (int16_t)(x * MAX_VOLUME);
+        } else if (rec->format == RECORD_INT24) {
+            int32_t v = (int32_t)(x * 8388607.0f);
+            uint8_t *out = (uint8_t*)rec->chunk + 3 * i;
+            out[0] = v & 0xff;
+            out[1] = (v >> 8) & 0xff;
+            out[2] = (v >> 16) & 0xff;
+        } else {
+            ((float*)rec->chunk)[i] = x;
+        }
+    }
+}
+
+static void* recording_writer(void* args) {
+    Recording *rec = (Recording*)args;
+    uint64_t last_sync = now_ns();
+
+    while (1) {
+        size_t tail = atomic_load_explicit(&rec->tail, memory_order_relaxed);
+        size_t head = atomic_load_explicit(&rec->head, memory_order_acquire);
+        size_t n = head - tail;
+
+        if (n == 0) {
+            if (rec->stopping) break;
+            struct timespec wait = {0, 10000000};  // 10 ms, well under the ring's depth
+            nanosleep(&wait, NULL);
+        } else if (!rec->file) {
+            // No file to write to (the next one failed to open): discard
+            // whatever was pushed before the audio thread saw active drop.
+            atomic_store_explicit(&rec->tail, head, memory_order_release);
+        } else {
+            if (n > RECORD_CHUNK_FRAMES) n = RECORD_CHUNK_FRAMES;
+            if (n > rec->rotate_frames - rec->file_frames) n = rec->rotate_frames - rec->file_frames;
+            recording_convert(rec, tail, n);
+            atomic_store_explicit(&rec->tail, tail + n, memory_order_release);
+
+            fwrite(rec->chunk, record_format_bytes[rec->format], n, rec->file);
+            rec->file_frames += n;
+            rec->frames_written += n;
+            if (rec->file_frames >= rec->rotate_frames) {
+                recording_close(rec);
+                rec->file_index++;
+                if (recording_open(rec) != 0) {
+                    rec->active = 0;
+                    printf("Recording stopped: could not open the next file after %s\n", rec->path);
+                }
+            }
+        }
+
+        if (rec->file && now_ns() - last_sync >= RECORD_SYNC_SECONDS * 1000000000ull) {
+            recording_sync(rec);
+            last_sync = now_ns();
+        }
+    }
+
+    recording_close(rec);
+    return NULL;
+}
+
+// Start recording the live output to a WAV file in the given RECORD_*
+// format, starting a new numbered file every rotate_seconds (0: only when a
+// file nears the 4 GB WAV limit). Returns 0, or -1 with errno set.
+int start_recording(const char *filename, int format, double rotate_seconds) {
+    Recording *rec = &synth.recording;
+    if (rec->active || rec->chunk) return 0;
+
+    snprintf(rec->path, sizeof(rec->path), "%s", filename);
+    rec->format = format;
+    rec->file_index = 0;
+    uint64_t limit = (UINT32_MAX - 36) / record_format_bytes[format];
+    rec->rotate_frames = rotate_seconds > 0 ? (uint64_t)(rotate_seconds * SAMPLE_RATE) : limit;
+    if (rec->rotate_frames > limit || rec->rotate_frames == 0) rec->rotate_frames = limit;
+
+    if (posix_memalign(&rec->chunk, 4096, RECORD_CHUNK_FRAMES * sizeof(float)) != 0) return -1;
+    if (recording_open(rec) != 0) {
+        free(rec->chunk);
+        rec->chunk = NULL;
+        return -1;
+    }
+
+    atomic_store(&rec->tail, atomic_load(&rec->head));
+    rec->frames_written = 0;
+    rec->overruns = 0;
+    rec->stopping = 0;
+    if (pthread_create(&rec->writer, NULL, recording_writer, rec) != 0) {
+        recording_close(rec);
+        free(rec->chunk);
+        rec->chunk = NULL;
+        return -1;
+    }
+    rec->active = 1;
+    return 0;
+}
+
+// Stop feeding the writer, let it drain the ring and finish the file.
 void stop_recording() {
-    if (!synth.recording) return;
-    synth.recording = 0;
-    finalize_wav_file(synth.wav_file, synth.total_samples_written);
-    fclose(synth.wav_file);
-    synth.wav_file = NULL;
+    Recording *rec = &synth.recording;
+    if (!rec->chunk) return;
+    rec->active = 0;
+    rec->stopping = 1;
+    pthread_join(rec->writer, NULL);
+    free(rec->chunk);
+    rec->chunk = NULL;
 }
 
-void write_wav_header(FILE *file, uint32_t sample_rate, uint16_t bits_per_sample, uint16_t channels) {
+void write_wav_header(FILE *file, uint32_t sample_rate, uint16_t bits_per_sample, uint16_t channels, uint16_t audio_format) {
     uint32_t byte_rate = sample_rate * channels * bits_per_sample / 8;
     uint16_t block_align = channels * bits_per_sample / 8;
     fwrite("RIFF", 1, 4, file);
@@ -207,7 +1203,6 @@ void write_wav_header(FILE *file, uint32_t sample_rate, uint16_t bits_per_sample
     fwrite("fmt ", 1, 4, file);
     uint32_t subchunk1_size = 16;
     fwrite(&subchunk1_size, 4, 1, file);
-    uint16_t audio_format = 1;
     fwrite(&audio_format, 2, 1, file);
     fwrite(&channels, 2, 1, file);
     fwrite(&sample_rate, 4, 1, file);
@@ -219,8 +1214,8 @@ void write_wav_header(FILE *file, uint32_t sample_rate, uint16_t bits_per_sample
     fwrite(&data_chunk_size, 4, 1, file);
 }
 
-void finalize_wav_file(FILE *file, uint32_t total_samples) {
-    uint32_t data_chunk_size = total_samples * sizeof(int16_t);
+void finalize_wav_file(FILE *file, uint32_t total_samples, uint16_t bytes_per_sample) {
+    uint32_t data_chunk_size = total_samples * bytes_per_sample;
     uint32_t chunk_size = 36 + data_chunk_size;
     fseek(file, 4, SEEK_SET);
     fwrite(&chunk_size, 4, 1, file);
@@ -228,45 +1223,370 @@ void finalize_wav_file(FILE *file, uint32_t total_samples) {
     fwrite(&data_chunk_size, 4, 1, file);
 }
 
-static PyObject* py_play_tone(PyObject* self, PyObject* args) {
+// Copy up to MAX_HARMONICS weights from a Python list; returns the count or -1.
+static int parse_harmonics(PyObject* harmonic_list, double* weights) {
+    if (!PyList_Check(harmonic_list)) {
+        PyErr_SetString(PyExc_TypeError, "harmonics must be a list of floats");
+        return -1;
+    }
+
+    int count = PyList_Size(harmonic_list);
+    if (count > MAX_HARMONICS) count = MAX_HARMONICS;
+
+    for (int i = 0; i < count; i++) {
+        PyObject* item = PyList_GetItem(harmonic_list, i);
+        weights[i] = PyFloat_AsDouble(item);
+    }
+    if (PyErr_Occurred()) return -1;
+    return count;
+}
+
+static PyObject* py_schedule_tone(PyObject* self, PyObject* args) {
+    unsigned long long start_frame;
     double freq, duration;
     int velocity;
     PyObject* harmonic_list;
 
-    if (!PyArg_ParseTuple(args, "ddiO", &freq, &duration, &velocity, &harmonic_list))
+    if (!PyArg_ParseTuple(args, "KddiO", &start_frame, &freq, &duration, &velocity, &harmonic_list))
         return NULL;
 
-    if (!PyList_Check(harmonic_list)) return NULL;
+    double weights[MAX_HARMONICS];
+    int count = parse_harmonics(harmonic_list, weights);
+    if (count < 0) return NULL;
 
-    int count = PyList_Size(harmonic_list);
-    if (count > MAX_HARMONICS) count = MAX_HARMONICS;
+    return PyBool_FromLong(queue_tone(start_frame, freq, duration, weights, count, velocity));
+}
 
-    double weights[MAX_HARMONICS];
+static PyObject* py_register_harmonics(PyObject* self, PyObject* args) {
+    PyObject* harmonic_list;
+    if (!PyArg_ParseTuple(args, "O", &harmonic_list)) return NULL;
+
+    HarmonicSet set;
+    set.num_harmonics = parse_harmonics(harmonic_list, set.weights);
+    if (set.num_harmonics < 0) return NULL;
+
+    // Registration happens with the GIL held, so only play_tones (reading
+    // already-published sets) can run concurrently.
+    int count = atomic_load(&synth.num_harmonic_sets);
     for (int i = 0; i < count; i++) {
-        PyObject* item = PyList_GetItem(harmonic_list, i);
-        weights[i] = PyFloat_AsDouble(item);
+        HarmonicSet *known = &synth.harmonic_sets[i];
+        if (known->num_harmonics == set.num_harmonics &&
+            memcmp(known->weights, set.weights, set.num_harmonics * sizeof(double)) == 0)
+            return PyLong_FromLong(i);
+    }
+    if (count == MAX_HARMONIC_SETS) {
+        PyErr_SetString(PyExc_RuntimeError, "too many harmonic sets registered");
+        return NULL;
+    }
+    synth.harmonic_sets[count] = set;
+    atomic_store(&synth.num_harmonic_sets, count + 1);
+    return PyLong_FromLong(count);
+}
+
+static PyObject* py_play_tones(PyObject* self, PyObject* args) {
+    PyObject* rows_obj;
+    unsigned long long start_frame = 0;
+    if (!PyArg_ParseTuple(args, "O|K", &rows_obj, &start_frame)) return NULL;
+
+    Py_buffer view;
+    if (PyObject_GetBuffer(rows_obj, &view, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) < 0) return NULL;
+    if ((view.itemsize != sizeof(ToneRow) && view.itemsize != 1) || view.len % sizeof(ToneRow) != 0) {
+        PyBuffer_Release(&view);
+        PyErr_Format(PyExc_ValueError,
+                     "play_tones expects rows of %d bytes (pitch f8, duration f8, velocity i4, harmonics i4)",
+                     (int)sizeof(ToneRow));
+        return NULL;
     }
 
+    const ToneRow* rows = (const ToneRow*)view.buf;
+    size_t count = view.len / sizeof(ToneRow);
+    int num_sets = atomic_load(&synth.num_harmonic_sets);
+    for (size_t i = 0; i < count; i++) {
+        if (rows[i].harmonics < 0 || rows[i].harmonics >= num_sets) {
+            PyBuffer_Release(&view);
+            PyErr_Format(PyExc_ValueError, "unregistered harmonic set %d", (int)rows[i].harmonics);
+            return NULL;
+        }
+    }
+
+    size_t queued;
+    Py_BEGIN_ALLOW_THREADS
+    queued = queue_tones(start_frame, rows, count);
+    Py_END_ALLOW_THREADS
+    PyBuffer_Release(&view);
+    return PyLong_FromSize_t(queued);
+}
+
+static PyObject* py_sample_time(PyObject* self, PyObject* args) {
+    return PyLong_FromUnsignedLongLong(synth.sample_clock);
+}
+
+static PyObject* py_play_tone(PyObject* self, PyObject* args) {
+    double freq, duration;
+    int velocity;
+    PyObject* harmonic_list;
+
+    if (!PyArg_ParseTuple(args, "ddiO", &freq, &duration, &velocity, &harmonic_list))
+        return NULL;
+
+    double weights[MAX_HARMONICS];
+    int count = parse_harmonics(harmonic_list, weights);
+    if (count < 0) return NULL;
+
     play_tone(freq, duration, weights, count, velocity);
     Py_RETURN_NONE;
 }
 
-static PyObject* py_start_recording(PyObject* self, PyObject* args) {
+static int compare_events(const void* a, const void* b) {
+    double ta = ((const NoteEvent*)a)->time, tb = ((const NoteEvent*)b)->time;
+    return (ta > tb) - (ta < tb);
+}
+
+static PyObject* py_render(PyObject* self, PyObject* args) {
+    PyObject* event_seq;
+    const char* filename = NULL;
+
+    if (!PyArg_ParseTuple(args, "O|z", &event_seq, &filename)) return NULL;
+
+    PyObject* fast = PySequence_Fast(event_seq, "events must be a sequence of (time, pitch, duration, velocity[, harmonics])");
+    if (!fast) return NULL;
+
+    Py_ssize_t num_events = PySequence_Fast_GET_SIZE(fast);
+    NoteEvent* events = calloc(num_events > 0 ? num_events : 1, sizeof(NoteEvent));
+    if (!events) {
+        Py_DECREF(fast);
+        return PyErr_NoMemory();
+    }
+
+    for (Py_ssize_t e = 0; e < num_events; e++) {
+        NoteEvent* ev = &events[e];
+        PyObject* harmonic_list = NULL;
+        if (!PyArg_ParseTuple(PySequence_Fast_GET_ITEM(fast, e), "dddi|O", &ev->time, &ev->frequency,
+                              &ev->duration, &ev->velocity, &harmonic_list)) {
+            free(events);
+            Py_DECREF(fast);
+            return NULL;
+        }
+        if (harmonic_list) {
+            ev->num_harmonics = parse_harmonics(harmonic_list, ev->harmonic_weights);
+            if (ev->num_harmonics < 0) {
+                free(events);
+                Py_DECREF(fast);
+                return NULL;
+            }
+        } else {
+            ev->num_harmonics = 1;
+            ev->harmonic_weights[0] = 1.0;
+        }
+    }
+    Py_DECREF(fast);
+
+    int16_t* pcm;
+    int64_t num_frames;
+    Py_BEGIN_ALLOW_THREADS
+    qsort(events, num_events, sizeof(NoteEvent), compare_events);
+    pcm = render_events(events, (int)num_events, &num_frames);
+    Py_END_ALLOW_THREADS
+    free(events);
+    if (!pcm) return PyErr_NoMemory();
+
+    if (!filename) {
+        PyObject* result = PyBytes_FromStringAndSize((const char*)pcm, num_frames * sizeof(int16_t));
+        free(pcm);
+        return result;
+    }
+
+    FILE* file = fopen(filename, "wb");
+    if (!file) {
+        free(pcm);
+        return PyErr_SetFromErrnoWithFilename(PyExc_OSError, filename);
+    }
+    write_wav_header(file, SAMPLE_RATE, 16, 1, WAVE_FORMAT_PCM);
+    fwrite(pcm, sizeof(int16_t), num_frames, file);
+    finalize_wav_file(file, (uint32_t)num_frames, sizeof(int16_t));
+    fclose(file);
+    free(pcm);
+    return PyLong_FromLongLong(num_frames);
+}
+
+static PyObject* py_start_recording(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char* keywords[] = {"filename", "format", "rotate_seconds", NULL};
     const char* filename;
-    if (!PyArg_ParseTuple(args, "s", &filename)) return NULL;
-    start_recording(filename);
+    const char* format_name = "int16";
+    double rotate_seconds = 0.0;
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "s|sd", keywords, &filename, &format_name, &rotate_seconds))
+        return NULL;
+
+    int format;
+    for (format = RECORD_INT16; format <= RECORD_FLOAT32; format++) {
+        if (strcmp(format_name, record_format_names[format]) == 0) break;
+    }
+    if (format > RECORD_FLOAT32) {
+        PyErr_Format(PyExc_ValueError, "unknown recording format %s (expected 'int16', 'int24' or 'float32')",
+                     format_name);
+        return NULL;
+    }
+    if (start_recording(filename, format, rotate_seconds) != 0)
+        return PyErr_SetFromErrnoWithFilename(PyExc_OSError, filename);
     Py_RETURN_NONE;
 }
 
 static PyObject* py_stop_recording(PyObject* self, PyObject* args) {
+    Py_BEGIN_ALLOW_THREADS
     stop_recording();
+    Py_END_ALLOW_THREADS
+    Py_RETURN_NONE;
+}
+
+static PyObject* py_set_oscillator(PyObject* self, PyObject* args) {
+    const char* name;
+    if (!PyArg_ParseTuple(args, "s", &name)) return NULL;
+    if (strcmp(name, "sine") == 0) synth.oscillator = OSC_SINE;
+    else if (strcmp(name, "wavetable") == 0) synth.oscillator = OSC_WAVETABLE;
+    else {
+        PyErr_Format(PyExc_ValueError, "unknown oscillator %s (expected 'sine' or 'wavetable')", name);
+        return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
+static PyObject* py_set_polyphony(PyObject* self, PyObject* args) {
+    int voices;
+    if (!PyArg_ParseTuple(args, "i", &voices)) return NULL;
+    if (voices < 1 || voices > MAX_VOICES) {
+        PyErr_Format(PyExc_ValueError, "polyphony must be between 1 and %d", MAX_VOICES);
+        return NULL;
+    }
+    synth.requested_voices = voices;  // applied by the audio thread at its next block
     Py_RETURN_NONE;
 }
 
+static PyObject* py_set_voice_stealing(PyObject* self, PyObject* args) {
+    const char* name;
+    if (!PyArg_ParseTuple(args, "s", &name)) return NULL;
+    for (int policy = STEAL_NONE; policy <= STEAL_RETRIGGER; policy++) {
+        if (strcmp(name, steal_policy_names[policy]) == 0) {
+            synth.steal_policy = policy;
+            Py_RETURN_NONE;
+        }
+    }
+    PyErr_Format(PyExc_ValueError, "unknown voice stealing policy %s "
+                 "(expected 'none', 'oldest', 'quietest' or 'retrigger')", name);
+    return NULL;
+}
+
+static PyObject* py_set_mixer(PyObject* self, PyObject* args) {
+    const char* name;
+    if (!PyArg_ParseTuple(args, "s", &name)) return NULL;
+    if (strcmp(name, "float") == 0) synth.mixer = MIXER_FLOAT;
+    else if (strcmp(name, "legacy") == 0) synth.mixer = MIXER_LEGACY;
+    else {
+        PyErr_Format(PyExc_ValueError, "unknown mixer %s (expected 'float' or 'legacy')", name);
+        return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
+static PyObject* py_backend(PyObject* self, PyObject* args) {
+    return PyUnicode_FromString(synth.backend ? synth.backend->name : "none");
+}
+
+static PyObject* py_pull(PyObject* self, PyObject* args) {
+    Py_ssize_t frames;
+    if (!PyArg_ParseTuple(args, "n", &frames)) return NULL;
+    if (!synth.backend || synth.backend->start != ring_start) {
+        PyErr_SetString(PyExc_RuntimeError, "pull() needs CELLBEAT_AUDIO_BACKEND=ring");
+        return NULL;
+    }
+    if (frames < 0) frames = 0;
+
+    PyObject* result = PyBytes_FromStringAndSize(NULL, frames * sizeof(int16_t));
+    if (!result) return NULL;
+    int16_t* out = (int16_t*)PyBytes_AS_STRING(result);
+    Py_BEGIN_ALLOW_THREADS
+    ring_pull(&synth, out, frames);
+    Py_END_ALLOW_THREADS
+    return result;
+}
+
+static PyObject* py_stats(PyObject* self, PyObject* args) {
+    SynthStats *stats = &synth.stats;
+    size_t buffered = 0;
+    if (synth.backend && synth.backend->start == ring_start) {
+        pthread_mutex_lock(&synth.ring.mutex);
+        buffered = synth.ring.fill;
+        pthread_mutex_unlock(&synth.ring.mutex);
+    }
+
+    int wavetables = 0;
+    pthread_mutex_lock(&synth.wavetable_mutex);
+    for (int i = 0; i < WAVETABLE_CACHE; i++) wavetables += synth.wavetables[i] != NULL;
+    pthread_mutex_unlock(&synth.wavetable_mutex);
+
+    double audio_seconds = stats->frames / (double)SAMPLE_RATE;
+    double render_seconds = stats->render_ns / 1e9;
+    return Py_BuildValue(
+        "{s:s,s:O,s:K,s:K,s:s,s:s,s:i,s:i,s:s,s:K,s:K,s:K,s:K,s:K,s:K,s:i,s:i,s:i,s:i,s:d,s:d,s:d,s:i,s:n,s:d}",
+        "backend", synth.backend ? synth.backend->name : "none",
+        "recording", synth.recording.active ? Py_True : Py_False,
+        "recorded_frames", (unsigned long long)synth.recording.frames_written,
+        "record_overruns", (unsigned long long)synth.recording.overruns,
+        "oscillator", synth.oscillator == OSC_WAVETABLE ? "wavetable" : "sine",
+        "mixer", synth.mixer == MIXER_LEGACY ? "legacy" : "float",
+        "wavetables", wavetables,
+        "voices", (int)synth.requested_voices,
+        "voice_stealing", steal_policy_names[synth.steal_policy],
+        "blocks", (unsigned long long)stats->blocks,
+        "frames", (unsigned long long)stats->frames,
+        "underruns", (unsigned long long)stats->underruns,
+        "dropped_notes", (unsigned long long)stats->dropped_notes,
+        "late_notes", (unsigned long long)stats->late_notes,
+        "stolen_voices", (unsigned long long)stats->stolen_voices,
+        "dropped_per_second", (int)stats->dropped_per_second,
+        "stolen_per_second", (int)stats->stolen_per_second,
+        "peak_voices", (int)stats->peak_voices,
+        "scheduled_notes", (int)stats->scheduled_notes,
+        "render_seconds", render_seconds,
+        "max_block_ms", stats->max_render_ns / 1e6,
+        "realtime_factor", render_seconds > 0 ? audio_seconds / render_seconds : 0.0,
+        "active_voices", (int)stats->active_voices,
+        "buffered_frames", (Py_ssize_t)buffered,
+        "latency_ms", 1000.0 * (buffered + BUFFER_SIZE) / SAMPLE_RATE
+    );
+}
+
 static PyMethodDef AudioMethods[] = {
     {"play_tone", py_play_tone, METH_VARARGS, "Play tone with harmonic weights."},
-    {"start_recording", py_start_recording, METH_VARARGS, "Start recording to WAV file."},
+    {"schedule_tone", py_schedule_tone, METH_VARARGS,
+     "schedule_tone(sample_time, pitch, duration, velocity, harmonics): start a tone at an absolute\n"
+     "sample_time() position. Late notes start at once. Returns False if the note queue was full."},
+    {"play_tones", py_play_tones, METH_VARARGS,
+     "play_tones(rows, sample_time=0): queue a batch of tones from a buffer of (pitch f8, duration f8,\n"
+     "velocity i4, harmonics i4) rows, e.g. a NumPy array of agents.TONE_DTYPE. Returns the number queued."},
+    {"register_harmonics", py_register_harmonics, METH_VARARGS,
+     "register_harmonics(weights): id of a harmonic set for play_tones rows (0 is [1.0])."},
+    {"sample_time", py_sample_time, METH_NOARGS, "Frames rendered by the output backend so far."},
+    {"render", py_render, METH_VARARGS,
+     "render(events, filename=None): render (time, pitch, duration, velocity[, harmonics]) events offline.\n"
+     "Returns mono 16-bit PCM bytes, or writes a WAV file and returns the frame count."},
+    {"start_recording", (PyCFunction)(void(*)(void))py_start_recording, METH_VARARGS | METH_KEYWORDS,
+     "start_recording(filename, format='int16', rotate_seconds=0): record the output to a WAV file\n"
+     "from a writer thread. format is 'int16', 'int24' or 'float32'; with rotate_seconds a new\n"
+     "numbered file (name_001.wav, ...) is started at that interval."},
     {"stop_recording", py_stop_recording, METH_VARARGS, "Stop recording."},
+    {"set_oscillator", py_set_oscillator, METH_VARARGS,
+     "set_oscillator('wavetable' | 'sine'): how new notes are synthesized (default wavetable)."},
+    {"set_polyphony", py_set_polyphony, METH_VARARGS,
+     "set_polyphony(voices): size of the voice pool (default 16)."},
+    {"set_voice_stealing", py_set_voice_stealing, METH_VARARGS,
+     "set_voice_stealing('oldest' | 'quietest' | 'retrigger' | 'none'): what a note-on does when\n"
+     "every voice is busy (default oldest; none drops the new note)."},
+    {"set_mixer", py_set_mixer, METH_VARARGS,
+     "set_mixer('float' | 'legacy'): float bus with one master clip (default), or the old\n"
+     "per-voice int16 clipping, for benchmarks."},
+    {"backend", py_backend, METH_NOARGS, "Name of the output backend chosen at import."},
+    {"pull", py_pull, METH_VARARGS, "pull(frames): read mono 16-bit PCM from the ring backend."},
+    {"stats", py_stats, METH_NOARGS, "Render timing, underrun and buffering counters."},
     {NULL, NULL, 0, NULL}
 };
 
@@ -275,12 +1595,35 @@ static struct PyModuleDef audiomodule = {
 };
 
 PyMODINIT_FUNC PyInit_audio(void) {
-    pthread_mutex_init(&synth.voice_mutex, NULL);
-    memset(synth.voices, 0, sizeof(synth.voices));
-    synth.recording = 0;
-    synth.wav_file = NULL;
-    pthread_t thread;
-    pthread_create(&thread, NULL, synth_thread, NULL);
-    pthread_detach(thread);
-    return PyModule_Create(&audiomodule);
+    memset(&synth.pool, 0, sizeof(synth.pool));
+    pool_resize(&synth.pool, MAX_POLYPHONY);
+    atomic_init(&synth.requested_voices, MAX_POLYPHONY);
+    atomic_init(&synth.steal_policy, STEAL_OLDEST);
+    atomic_init(&synth.mixer, MIXER_FLOAT);
+    memset(&synth.stats, 0, sizeof(synth.stats));
+    atomic_init(&synth.note_queue.head, 0);
+    atomic_init(&synth.note_queue.tail, 0);
+    pthread_mutex_init(&synth.note_queue.producer_mutex, NULL);
+    synth.harmonic_sets[0].num_harmonics = 1;
+    synth.harmonic_sets[0].weights[0] = 1.0;
+    atomic_init(&synth.num_harmonic_sets, 1);
+    atomic_init(&synth.sample_clock, 0);
+    synth.num_scheduled = 0;
+    pthread_mutex_init(&synth.wavetable_mutex, NULL);
+    for (int i = 0; i < WAVETABLE_SIZE; i++)
+        sine_table[i] = sin(2.0 * PI * i / WAVETABLE_SIZE);
+    synth.oscillator = OSC_WAVETABLE;
+    atomic_init(&synth.recording.head, 0);
+    atomic_init(&synth.recording.tail, 0);
+    atomic_init(&synth.recording.active, 0);
+    synth.recording.chunk = NULL;
+    synth.backend = select_backend();
+    if (synth.backend->start(&synth) != 0) {
+        printf("Audio backend %s failed to start, sound is disabled\n", synth.backend->name);
+        synth.backend = NULL;
+    }
+
+    PyObject* module = PyModule_Create(&audiomodule);
+    if (module) PyModule_AddIntConstant(module, "SAMPLE_RATE", SAMPLE_RATE);
+    return module;
 }
@@ -0,0 +1,186 @@
+"""Append-only log of note triggers, stored as compressed column chunks.
+
+Every note a robot triggers is one row of EVENT_DTYPE:
+
+    tick, frame, bpm, grid, row, col, pitch, duration, velocity
+
+``frame`` is the sample frame (at the metadata's ``sample_rate``) at which
+the note sounded, counted from the start of logging; it sets the note's
+time, so tempo changes mid-recording keep notes in place. ``tick`` counts
+the ticks stepped at that BPM. Rows collect in per-column buffers and are
+written in chunks of CHUNK_ROWS:
+
+    header: magic (8 bytes) | version (u32) | metadata length (u32) | metadata JSON
+    chunk:  row count (u32) | payload length (u32) | zlib(columns, one after another)
+
+Ticks and frames are delta coded before compression. Chunks stand alone, so a log cut
+short by a crash still reads up to its last complete chunk.
+
+    python event_log.py rec.cbe --events notes.csv --wav out.wav
+"""
+import argparse
+import csv
+import json
+import struct
+import sys
+import zlib
+
+import numpy as np
+
+import headless
+
+EVENT_LOG_EXT = '.cbe'
+MAGIC = b'CBEVLOG\x01'
+VERSION = 1
+HEADER = struct.Struct('<8sII')
+CHUNK = struct.Struct('<II')
+CHUNK_ROWS = 4096
+
+EVENT_DTYPE = np.dtype([
+    ('tick', '<i4'), ('frame', '<i8'), ('bpm', '<f4'), ('grid', '<u2'), ('row', '<u2'), ('col', '<u2'),
+    ('pitch', '<f8'), ('duration', '<f8'), ('velocity', '<i2'),
+])
+DELTA_COLUMNS = ('tick', 'frame')
+SAMPLE_RATE = 44100
+
+
+class EventLog:
+    """Writer for one log file; ``append`` a tick's notes, ``close`` when done."""
+
+    def __init__(self, filename, grids=(), chunk_rows=CHUNK_ROWS, sample_rate=SAMPLE_RATE):
+        self.filename = filename
+        self.sample_rate = sample_rate
+        self.chunk_rows = chunk_rows
+        self.columns = {name: np.empty(chunk_rows, dtype=EVENT_DTYPE[name]) for name in EVENT_DTYPE.names}
+        self.pending = 0
+        self.count = 0
+        meta = json.dumps({
+            'grids': [{'emoji_label': grid.emoji_label, 'bpm': grid.bpm} for grid in grids],
+            'steps_per_beat': headless.STEPS_PER_BEAT,
+            'sample_rate': sample_rate,
+        }).encode('utf-8')
+        self.file = open(filename, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, len(meta)))
+        self.file.write(meta)
+
+    def append(self, tick, bpm, cells, tones, frame=None):
+        """Log the notes of one tick: (grid, row, col) ``cells`` and their (pitch, duration, velocity).
+
+        ``frame`` is when the tick sounded, in samples since logging started;
+        without it the tick is taken to have run at ``bpm`` from the start.
+        """
+        if frame is None:
+            frame = round(tick * headless.tick_seconds(bpm) * self.sample_rate)
+        cells = np.asarray(cells).reshape(-1, 3)
+        tones = np.asarray(tones, dtype=float).reshape(-1, 3)
+        done = 0
+        while done < len(cells):
+            n = min(len(cells) - done, self.chunk_rows - self.pending)
+            at = slice(self.pending, self.pending + n)
+            self.columns['tick'][at] = tick
+            self.columns['frame'][at] = frame
+            self.columns['bpm'][at] = bpm
+            for i, name in enumerate(('grid', 'row', 'col')):
+                self.columns[name][at] = cells[done:done + n, i]
+            for i, name in enumerate(('pitch', 'duration', 'velocity')):
+                self.columns[name][at] = tones[done:done + n, i]
+            self.pending += n
+            self.count += n
+            done += n
+            if self.pending == self.chunk_rows:
+                self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        n = self.pending
+        columns = {name: column[:n] for name, column in self.columns.items()}
+        for name in DELTA_COLUMNS:
+            columns[name] = np.diff(columns[name], prepend=0).astype(EVENT_DTYPE[name])
+        payload = zlib.compress(b''.join(columns[name].tobytes() for name in EVENT_DTYPE.names), 9)
+        self.file.write(CHUNK.pack(n, len(payload)))
+        self.file.write(payload)
+        self.file.flush()
+        self.pending = 0
+
+    def close(self):
+        if self.file is None:
+            return
+        self.flush()
+        self.file.close()
+        self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_event_log(filename):
+    """Return the log's metadata and all of its rows as one EVENT_DTYPE array."""
+    with open(filename, 'rb') as f:
+        magic, version, meta_len = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{filename} is not a Cellbeat event log")
+        if version > VERSION:
+            raise ValueError(f"{filename} has event log version {version}, newer than {VERSION}")
+        meta = json.loads(f.read(meta_len))
+        chunks = []
+        while True:
+            head = f.read(CHUNK.size)
+            if len(head) < CHUNK.size:
+                break
+            n, size = CHUNK.unpack(head)
+            payload = f.read(size)
+            if len(payload) < size:
+                break  # truncated by a crash mid-write
+            data = zlib.decompress(payload)
+            chunk = np.empty(n, dtype=EVENT_DTYPE)
+            offset = 0
+            for name in EVENT_DTYPE.names:
+                column = np.frombuffer(data, dtype=EVENT_DTYPE[name], count=n, offset=offset)
+                chunk[name] = np.cumsum(column) if name in DELTA_COLUMNS else column
+                offset += column.nbytes
+            chunks.append(chunk)
+    events = np.concatenate(chunks) if chunks else np.empty(0, dtype=EVENT_DTYPE)
+    return meta, events
+
+
+def iter_notes(events, sample_rate=SAMPLE_RATE):
+    """Yield headless.NoteEvents for logged rows, in time order."""
+    times = events['frame'] / float(sample_rate)
+    order = np.argsort(times, kind='stable')
+    for t, event in zip(times[order].tolist(), events[order].tolist()):
+        tick, _, _, grid, row, col, pitch, duration, velocity = event
+        yield headless.NoteEvent(t, tick, grid, row, col, pitch, duration, velocity)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or re-render a Cellbeat event log.")
+    parser.add_argument('log', help="event log written while recording (.cbe)")
+    parser.add_argument('--events', help="write the notes as CSV ('-' for stdout)")
+    parser.add_argument('--wav', help="render the notes offline to this WAV file")
+    args = parser.parse_args(argv)
+
+    meta, events = read_event_log(args.log)
+    notes = list(iter_notes(events, meta['sample_rate']))
+    if args.events:
+        out = sys.stdout if args.events == '-' else open(args.events, 'w', newline='')
+        try:
+            writer = csv.writer(out)
+            writer.writerow(headless.NoteEvent._fields)
+            writer.writerows(notes)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+    if args.wav:
+        import synth
+        synth.write_wav(args.wav, synth.render_events([(n.time, n.pitch, n.duration, n.velocity) for n in notes]))
+
+    length = notes[-1].time if notes else 0.0
+    print(f"{len(meta['grids'])} grids, {len(events)} notes over {length:.1f}s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
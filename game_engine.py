@@ -1,6 +1,9 @@
 import os
+import glob
 import json
 import random
+from collections import OrderedDict
+from functools import partial
 
 import numpy as np
 from uuid import uuid4
@@ -11,6 +14,8 @@ from kivy.core.window import Window
 from kivy.app import App
 from kivy.clock import Clock
 from kivy.graphics import Color, Ellipse, Rectangle
+from kivy.graphics.texture import Texture
+from kivy.core.image import Image as CoreImage
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.gridlayout import GridLayout
 from kivy.uix.button import Button
@@ -27,9 +32,15 @@ from kivy.uix.togglebutton import ToggleButton
 from kivy.uix.widget import Widget
 
 import agents
+import session_format
 from recorder import Recorder
+from world import GridModel, GridWorld
 
 SAVED_TOOLS_PATH = 'saved_tools.json'
+TEXTURE_BOARD_MIN_CELLS = 32 * 32
+MAX_GRID_VIEWS = 8  # views of recently shown grids kept alive for fast switching
+TICK_LEAD = 1  # ticks of audio scheduled ahead of the simulation step that made them
+HOVER_TINT = (0.8, 0.9, 1, 0.5)  # Light blueish tint
 ALL_STATIC_AGENTS = agents.STATIC_AGENTS.union(agents.STATIC_AGENTS)
 
 
@@ -266,16 +277,13 @@ class Cell(ButtonBehavior, BoxLayout):
         self.image = Image(source="assets/empty.png", allow_stretch=True, keep_ratio=False, size_hint=(1, 1))
         self.add_widget(self.image)
 
-        Clock.schedule_interval(self.update_hover, 0.1)
-
     def update_rect(self, *args):
         self.bg_rect.pos = self.pos
         self.bg_rect.size = self.size
 
-    def update_hover(self, dt):
-        mouse_x, mouse_y = Window.mouse_pos
-        if self.collide_point(mouse_x, mouse_y):
-            self.bg_color.rgba = (0.8, 0.9, 1, 0.5)  # Light blueish tint
+    def set_hover(self, hovered):
+        if hovered:
+            self.bg_color.rgba = HOVER_TINT
             self.image.opacity = 0.8
         else:
             self.bg_color.rgba = (1, 1, 1, 0)  # Transparent
@@ -289,26 +297,7 @@ class Cell(ButtonBehavior, BoxLayout):
         )
 
     def on_press(self):
-        selected_type = self.grid.selected_type
-
-        if selected_type == 10:  # Bell agent
-            self.prompt_pitch_duration(selected_type)
-        elif selected_type == agents.ROBOT:
-            self.prompt_robot_speed()
-        else:
-            if isinstance(selected_type, str):
-                tool_data = next((t for t in self.grid.app.saved_tools if t['id'] == selected_type), None)
-                if tool_data:
-                    self.grid.set_agent_at(
-                        self.row, self.col,
-                        agent_type=10,
-                        pitch=tool_data['pitch'],
-                        duration=tool_data['duration']
-                    )
-                    self.update_image(10)  # Update immediately after placement
-            else:
-                self.grid.set_agent_at(self.row, self.col, selected_type)
-                self.update_image(selected_type)  # Immediate visual update
+        self.grid.press_cell(self.row, self.col)
 
     def update_dot(self, pitch, duration):
         if pitch and duration:
@@ -321,7 +310,268 @@ class Cell(ButtonBehavior, BoxLayout):
                 Color(1, 0, 0)
                 Ellipse(pos=(x, y), size=(10, 10))
 
-    def prompt_robot_speed(self):
+
+class BoardGeometry:
+    """Maps window positions to (row, col) for a board that fills its widget."""
+
+    def cell_at(self, x, y):
+        """Return the (row, col) under a window position, or None when outside the board."""
+        if not self.collide_point(x, y) or not self.width or not self.height:
+            return None
+        col = int((x - self.x) * self.grid.cols / self.width)
+        row = int((self.top - y) * self.grid.rows / self.height)
+        return min(row, self.grid.rows - 1), min(col, self.grid.cols - 1)
+
+
+class HoverTracker:
+    """Highlights the cell under the mouse on the visible board.
+
+    One ``Window.mouse_pos`` binding replaces a polling timer per cell: the
+    hovered cell is found arithmetically and only the cell being left and
+    the cell being entered are touched. Hidden boards are never looked at.
+    """
+
+    def __init__(self):
+        self.board = None
+        self.cell = None
+        Window.bind(mouse_pos=self.on_mouse_pos)
+
+    def track(self, board):
+        if self.board is not None and self.cell is not None:
+            self.board.set_hover(self.cell, False)
+        self.board = board
+        self.cell = None
+        self.on_mouse_pos(Window, Window.mouse_pos)
+
+    def on_mouse_pos(self, window, pos):
+        cell = self.board.cell_at(*pos) if self.board is not None else None
+        if cell == self.cell:
+            return
+        if self.cell is not None:
+            self.board.set_hover(self.cell, False)
+        if cell is not None:
+            self.board.set_hover(cell, True)
+        self.cell = cell
+
+
+class CellBoard(BoardGeometry, GridLayout):
+    """Board view with one ``Cell`` widget per grid cell."""
+
+    def __init__(self, grid, **kwargs):
+        super().__init__(rows=grid.rows, cols=grid.cols, **kwargs)
+        self.grid = grid
+        self.cell_widgets = []
+        for r in range(grid.rows):
+            row_cells = []
+            for c in range(grid.cols):
+                cell = Cell(grid, r, c)
+                self.add_widget(cell)
+                row_cells.append(cell)
+            self.cell_widgets.append(row_cells)
+
+    def refresh(self, cells):
+        grid, model = self.grid, self.grid.model
+        for r, c in cells:
+            val = model.dynamic_grid[r, c] or model.static_grid[r, c]
+            cell = self.cell_widgets[r][c]
+            cell.image.source = grid.image_sources.get(val, grid.image_sources[agents.EMPTY])
+            attr = model.cell_attributes[(r, c)]
+            if val:
+                cell.update_dot(attr['pitch'], attr['duration'])
+
+    def set_hover(self, cell, hovered):
+        r, c = cell
+        self.cell_widgets[r][c].set_hover(hovered)
+
+
+class TextureBoard(BoardGeometry, Widget):
+    """Board view that draws the whole grid as one texture.
+
+    Tiles come from an atlas of the agent images and the bell icons; a tick
+    only re-blits the tiles of the cells that changed, and touches map to
+    (row, col) arithmetically instead of hitting one widget per cell.
+    """
+
+    atlases = {}  # (tile size, image sources) -> atlas shared by every board
+
+    def __init__(self, grid, **kwargs):
+        super().__init__(**kwargs)
+        self.grid = grid
+        self.tile = max(4, min(64, 2048 // max(grid.rows, grid.cols)))
+        self.atlas, self.agent_tiles, self.bell_tiles = self.build_atlas(grid.image_sources, self.tile)
+        self.pixels = np.zeros((grid.rows * self.tile, grid.cols * self.tile, 4), dtype=np.uint8)
+
+        self.texture = Texture.create(size=(grid.cols * self.tile, grid.rows * self.tile), colorfmt='rgba')
+        self.texture.flip_vertical()  # pixel rows are stored top-down, like grid rows
+        self.hovered = None
+        with self.canvas:
+            Color(1, 1, 1, 1)
+            self.rect = Rectangle(texture=self.texture, pos=self.pos, size=self.size)
+            self.hover_color = Color(1, 1, 1, 0)
+            self.hover_rect = Rectangle(pos=self.pos, size=(0, 0))
+        self.bind(pos=self.update_rect, size=self.update_rect)
+        self.refresh((r, c) for r in range(grid.rows) for c in range(grid.cols))
+
+    def update_rect(self, *args):
+        self.rect.pos = self.pos
+        self.rect.size = self.size
+        if self.hovered is not None:
+            self.set_hover(self.hovered, True)
+
+    def set_hover(self, cell, hovered):
+        if not hovered:
+            self.hovered = None
+            self.hover_color.rgba = (1, 1, 1, 0)
+            return
+        r, c = cell
+        w, h = self.width / self.grid.cols, self.height / self.grid.rows
+        self.hovered = cell
+        self.hover_rect.pos = (self.x + c * w, self.top - (r + 1) * h)
+        self.hover_rect.size = (w, h)
+        self.hover_color.rgba = HOVER_TINT
+
+    @staticmethod
+    def load_tile(source, tile):
+        texture = CoreImage(source).texture
+        w, h = texture.size
+        pixels = np.frombuffer(texture.pixels, dtype=np.uint8).reshape(h, w, 4)[::-1]
+        # Nearest-neighbour resample to tile x tile
+        ys = np.arange(tile) * h // tile
+        xs = np.arange(tile) * w // tile
+        return pixels[ys[:, None], xs[None, :]]
+
+    @classmethod
+    def build_atlas(cls, image_sources, tile):
+        key = (tile, tuple(sorted(image_sources.items())))
+        if key not in cls.atlases:
+            cls.atlases[key] = cls.load_atlas(image_sources, tile)
+        return cls.atlases[key]
+
+    @classmethod
+    def load_atlas(cls, image_sources, tile):
+        types = sorted(image_sources)
+        bells = sorted(glob.glob('assets/images/bell_*.png'), key=lambda p: int(p.rsplit('_', 1)[1][:-4]))
+        atlas = np.stack([cls.load_tile(image_sources[t], tile) for t in types]
+                         + [cls.load_tile(p, tile) for p in bells])
+        agent_tiles = np.full(max(types + [agents.UPSTAIRS]) + 1, types.index(agents.EMPTY))
+        agent_tiles[types] = np.arange(len(types))
+        bell_tiles = len(types) + np.arange(len(bells))
+        return atlas, agent_tiles, bell_tiles
+
+    def tile_for(self, val, attr):
+        if val == agents.BELL_0 and len(self.bell_tiles):
+            normalized_pitch = (attr['pitch'] - 100) / (2000 - 100)
+            idx = int(np.clip(normalized_pitch * len(self.bell_tiles), 0, len(self.bell_tiles) - 1))
+            return self.bell_tiles[idx]
+        if 0 <= val < len(self.agent_tiles):
+            return self.agent_tiles[val]
+        return self.agent_tiles[agents.EMPTY]
+
+    def draw_tile(self, r, c):
+        model, t = self.grid.model, self.tile
+        val = int(model.dynamic_grid[r, c] or model.static_grid[r, c])
+        attr = model.cell_attributes[(r, c)]
+        block = self.pixels[r * t:(r + 1) * t, c * t:(c + 1) * t]
+        block[...] = self.atlas[self.tile_for(val, attr)]
+        if val and attr['pitch'] and attr['duration']:
+            # Same pitch/duration dot as Cell.update_dot, painted into the tile
+            normalized_pitch = (attr['pitch'] - 100) / (2000 - 100)
+            normalized_duration = (attr['duration'] - 0.1) / (2.0 - 0.1)
+            dot = max(2, t // 6)
+            x = int(np.clip(normalized_duration * t, 0, t - dot))
+            y = int(np.clip((1 - normalized_pitch) * t - dot, 0, t - dot))
+            block[y:y + dot, x:x + dot] = (255, 0, 0, 255)
+        return block
+
+    def refresh(self, cells):
+        cells = list(cells)
+        t = self.tile
+        if len(cells) * 4 >= self.grid.rows * self.grid.cols:
+            for r, c in cells:
+                self.draw_tile(r, c)
+            self.texture.blit_buffer(self.pixels.tobytes(), colorfmt='rgba', bufferfmt='ubyte')
+        else:
+            for r, c in cells:
+                block = self.draw_tile(r, c)
+                self.texture.blit_buffer(
+                    np.ascontiguousarray(block).tobytes(), colorfmt='rgba', bufferfmt='ubyte',
+                    pos=(c * t, r * t), size=(t, t)
+                )
+        self.canvas.ask_update()
+
+    def on_touch_down(self, touch):
+        cell = self.cell_at(*touch.pos)
+        if cell is None:
+            return super().on_touch_down(touch)
+        self.grid.press_cell(*cell)
+        return True
+
+
+class SimulationGrid(BoxLayout):
+    """View of a world.GridModel: a board widget plus the editing prompts.
+
+    Views are created on demand by CellularAutomataApp.view_for() and may be
+    dropped again; the model keeps simulating without them.
+    """
+
+    def __init__(self, model, app=None, renderer=None, **kwargs):
+        super().__init__(**kwargs)
+        self.model = model
+        self.app = app
+        self.rows = model.rows
+        self.cols = model.cols
+
+        self.image_sources = {10: f"assets/images/tone_0.png"}
+        self.image_sources.update({
+            agents.ROBOT: "assets/robot.png",
+            agents.EMPTY: "assets/empty.png",
+            agents.VERTICAL_REFLECT: "assets/horizontal_reflector.png",
+            agents.HORIZONTAL_REFLECT: "assets/vertical_reflector.png",
+            agents.CLOCKWISE_ROTATOR: "assets/rotator.png",
+            agents.COUNTERCLOCKWISE_ROTATOR: "assets/counter_rotator.png",
+        })
+
+        # Large boards default to the single-texture view
+        if renderer is None:
+            renderer = 'texture' if self.rows * self.cols > TEXTURE_BOARD_MIN_CELLS else 'cells'
+        self.board = TextureBoard(self) if renderer == 'texture' else CellBoard(self)
+        self.add_widget(self.board)
+
+    def refresh_cells(self, cells=None):
+        """Redraw the given (row, col) cells, or every cell when ``cells`` is None.
+
+        Ticks and edits pass only the cells that changed; a full refresh is
+        for loading a session and switching grids.
+        """
+        if cells is None:
+            cells = ((r, c) for r in range(self.rows) for c in range(self.cols))
+        self.board.refresh(cells)
+
+    def set_agent_at(self, r, c, agent_type, pitch=440.0, duration=0.5, speed=1, direction=None):
+        self.model.set_agent_at(r, c, agent_type, pitch, duration, speed=speed, direction=direction)
+        self.refresh_cells([(r, c)])
+
+    def press_cell(self, r, c):
+        selected_type = self.model.selected_type
+
+        if selected_type == 10:  # Bell agent
+            self.prompt_pitch_duration(r, c, selected_type)
+        elif selected_type == agents.ROBOT:
+            self.prompt_robot_speed(r, c)
+        else:
+            if isinstance(selected_type, str):
+                tool_data = next((t for t in self.app.saved_tools if t['id'] == selected_type), None)
+                if tool_data:
+                    self.set_agent_at(
+                        r, c,
+                        agent_type=10,
+                        pitch=tool_data['pitch'],
+                        duration=tool_data['duration']
+                    )
+            else:
+                self.set_agent_at(r, c, selected_type)
+
+    def prompt_robot_speed(self, r, c):
         content = BoxLayout(orientation='vertical', spacing=10, padding=10)
 
         speed_label = Label(text='Robot Speed: Quarter Note', size_hint_y=None, height=30)
@@ -357,8 +607,7 @@ class Cell(ButtonBehavior, BoxLayout):
         def place_robot(_):
             speed = int(speed_slider.value)
             direction = direction_spinner.text
-            self.grid.set_agent_at(self.row, self.col, agents.ROBOT, speed=speed)
-            self.grid.robot_agent.directions[(self.row, self.col)] = agents.DIRECTIONS[direction]
+            self.set_agent_at(r, c, agents.ROBOT, speed=speed, direction=agents.DIRECTIONS[direction])
             popup.dismiss()
 
         place_button.bind(on_press=place_robot)
@@ -372,7 +621,7 @@ class Cell(ButtonBehavior, BoxLayout):
         popup = Popup(title="Configure Robot", content=content, size_hint=(0.5, 0.5))
         popup.open()
 
-    def prompt_pitch_duration(self, agent_type):
+    def prompt_pitch_duration(self, r, c, agent_type):
         class TwoDAxisSelector(FloatLayout):
             def __init__(self, **kwargs):
                 super().__init__(**kwargs)
@@ -435,7 +684,7 @@ class Cell(ButtonBehavior, BoxLayout):
         def place_bell(_):
             pitch = selector.selected_pitch
             duration = selector.selected_duration
-            self.grid.set_agent_at(self.row, self.col, agent_type, pitch, duration)
+            self.set_agent_at(r, c, agent_type, pitch, duration)
             popup.dismiss()
 
         def play_sample(_):
@@ -457,105 +706,6 @@ class Cell(ButtonBehavior, BoxLayout):
         popup.open()
 
 
-class SimulationGrid(GridLayout):
-    def __init__(self, rows=20, cols=20, emoji_label=None, bpm=120, **kwargs):
-        self.emoji_label = emoji_label or 'å'  # set before super().__init__
-        self.bpm = bpm  # ✅ Set BPM here
-        super().__init__(rows=rows, cols=cols, **kwargs)
-        self.rows = rows
-        self.cols = cols
-        self.cell_attributes = {
-            (r, c): {
-                'agent_type': agents.EMPTY,
-                'pitch': 440.0,
-                'duration': 0.5
-            }
-            for r in range(rows) for c in range(cols)
-        }
-        self.static_grid = np.zeros((rows, cols), dtype=int)
-        self.dynamic_grid = np.zeros((rows, cols), dtype=int)
-        self.robot_agent = agents.RobotAgent()
-        self.running = False
-        self.selected_type = agents.EMPTY
-
-        self.image_sources = {10: f"assets/images/tone_0.png"}
-        self.image_sources.update({
-            agents.ROBOT: "assets/robot.png",
-            agents.EMPTY: "assets/empty.png",
-            agents.VERTICAL_REFLECT: "assets/horizontal_reflector.png",
-            agents.HORIZONTAL_REFLECT: "assets/vertical_reflector.png",
-            agents.CLOCKWISE_ROTATOR: "assets/rotator.png",
-            agents.COUNTERCLOCKWISE_ROTATOR: "assets/counter_rotator.png",
-        })
-
-        self.cell_widgets = []
-        for r in range(rows):
-            row_cells = []
-            for c in range(cols):
-                cell = Cell(self, r, c)
-                self.add_widget(cell)
-                row_cells.append(cell)
-            self.cell_widgets.append(row_cells)
-
-    def refresh_cells(self):
-        for r in range(self.rows):
-            for c in range(self.cols):
-                val = self.dynamic_grid[r, c] or self.static_grid[r, c]
-                cell = self.cell_widgets[r][c]
-                cell.image.source = self.image_sources.get(val, self.image_sources[agents.EMPTY])
-                attr = self.cell_attributes[(r, c)]
-                if val:
-                    cell.update_dot(attr['pitch'], attr['duration'])
-
-    def update_grid(self, dt=None):
-        if not self.running:
-            return
-        self.dynamic_grid = self.robot_agent.apply_rules(self.static_grid, self.dynamic_grid, self.cell_attributes)
-        self.refresh_cells()
-
-    def set_agent_at(self, r, c, agent_type, pitch=440.0, duration=0.5, speed=1):
-        attr = self.cell_attributes[(r, c)]
-        attr['agent_type'] = agent_type
-        attr['pitch'] = pitch
-        attr['duration'] = duration
-
-        if agent_type == agents.EMPTY:
-            attr['pitch'] = 0
-            attr['duration'] = 0
-
-        if agent_type == agents.ROBOT:
-            self.dynamic_grid[r, c] = agents.ROBOT
-            self.static_grid[r, c] = agents.EMPTY
-            self.robot_agent.speeds[(r, c)] = speed
-            self.robot_agent.counters[(r, c)] = 0
-        else:
-            self.static_grid[r, c] = agent_type
-            self.dynamic_grid[r, c] = agents.EMPTY
-            self.robot_agent.speeds.pop((r, c), None)
-            self.robot_agent.counters.pop((r, c), None)
-
-        self.refresh_cells()
-
-    def get_state(self):
-        return {
-            'emoji': self.emoji_label,
-            'static_grid': self.static_grid.tolist(),
-            'dynamic_grid': self.dynamic_grid.tolist(),
-            'cell_attributes': {
-                f"{r},{c}": attr
-                for (r, c), attr in self.cell_attributes.items()
-            }
-        }
-
-    def update(self, dt=None):
-        if not self.running:
-            return
-        self.dynamic_grid = self.robot_agent.apply_rules(
-            self.static_grid, self.dynamic_grid, self.cell_attributes
-        )
-        self.refresh_cells()
-
-
 class CellularAutomataApp(App):
     def __init__(self, **kwargs):
         self.grids = []
@@ -600,14 +750,14 @@ class CellularAutomataApp(App):
 
     def prompt_filename(self):
         layout = BoxLayout(orientation='vertical', spacing=10, padding=10)
-        filename_input = TextInput(text='session.json', multiline=False)
+        filename_input = TextInput(text='session' + session_format.SESSION_EXT, multiline=False)
         save_button = Button(text='Save')
 
         def do_save(_):
             name = filename_input.text.strip()
-            if not name.endswith('.json'):
-                name += '.json'
-            self.recorder.save_json(name)
+            if not name.endswith(('.json', session_format.SESSION_EXT)):
+                name += session_format.SESSION_EXT
+            self.recorder.save(name)
             popup.dismiss()
 
         layout.add_widget(Label(text='Enter filename:'))
@@ -655,12 +805,42 @@ class CellularAutomataApp(App):
     def update_bpm(self, instance, value):
         bpm = int(value)
         self.bpm_label.text = f'Tempo: {bpm} BPM'
-        interval = 60.0 / 4.0 / bpm  # assuming 16th-note step
-        Clock.unschedule(self.update_all_grids)
-        Clock.schedule_interval(self.update_all_grids, interval)
+        self.grids[self.current_index].bpm = bpm
+        self.schedule_ticks()
+
+    def schedule_ticks(self):
+        """Keep one Clock interval per distinct BPM; grids sharing a BPM share a tick."""
+        bpms = set(self.world.bpms())
+        for bpm in list(self.tick_events):
+            if bpm not in bpms:
+                self.tick_events.pop(bpm).cancel()
+                self.tick_clocks.pop(bpm, None)
+        for bpm in bpms - set(self.tick_events):
+            interval = 60.0 / 4.0 / bpm  # assuming 16th-note step
+            self.tick_events[bpm] = Clock.schedule_interval(partial(self.update_grids, bpm), interval)
+            self.tick_clocks[bpm] = (audio.sample_time(), 0)
+
+    def tick_sample_time(self, bpm):
+        """Sample time at which the tick just stepped at ``bpm`` should sound.
+
+        Ticks are laid on an exact grid of samples from the BPM's origin,
+        TICK_LEAD ticks after the Clock callback that computed them, so Clock
+        jitter no longer reaches the rhythm. If the callback falls behind or
+        drifts ahead of the audio clock the grid is re-anchored to now.
+        """
+        step = audio.SAMPLE_RATE * 60.0 / 4.0 / bpm
+        origin, tick = self.tick_clocks[bpm]
+        tick += 1
+        now = audio.sample_time()
+        when = origin + (tick + TICK_LEAD) * step
+        if when < now or when > now + (TICK_LEAD + 2) * step:
+            origin = now - tick * step
+            when = now + TICK_LEAD * step
+        self.tick_clocks[bpm] = (origin, tick)
+        return int(when)
 
     def load_playback(self, instance=None):
-        chooser = FileChooserIconView(path=os.getcwd(), filters=['*.json'])
+        chooser = FileChooserIconView(path=os.getcwd(), filters=['*' + session_format.SESSION_EXT, '*.json'])
         chooser.bind(on_submit=self.load_selection)
         popup = Popup(title="Load Grid File", content=chooser, size_hint=(0.9, 0.9))
         self.load_popup = popup  # Save reference to popup
@@ -668,8 +848,7 @@ class CellularAutomataApp(App):
 
     def load_selection(self, filechooser_instance, selection, touch):
         try:
-            with open(selection[0], 'r') as f:
-                data = json.load(f)
+            data = session_format.read_session(selection[0])
             if 'grids' in data:
                 self.load_all_grids(data['grids'])
         except Exception as e:
@@ -686,51 +865,12 @@ class CellularAutomataApp(App):
         self.toggle_container.clear_widgets()
         self.grids.clear()
         self.grid_toggles.clear()
+        self.views.clear()
 
         for grid_data in grids_data:
-            emoji_label = grid_data.get('emoji_label', '∫')
-            bpm = grid_data.get('bpm', 120)
-
-            new_grid = SimulationGrid(emoji_label=emoji_label, bpm=bpm)
-            new_grid.app = self
-            new_grid.bpm = bpm
+            new_grid = GridModel.from_state(grid_data)
             self.grids.append(new_grid)
 
-            new_grid.static_grid = np.array(grid_data['static_grid'])
-            new_grid.dynamic_grid = np.array(grid_data['dynamic_grid'])
-
-            # Load robot state
-            new_grid.robot_agent.directions = {
-                tuple(map(int, k.split('_'))): tuple(v)
-                for k, v in grid_data.get("directions", {}).items()
-            }
-            new_grid.robot_agent.speeds = {
-                tuple(map(int, k.split('_'))): v
-                for k, v in grid_data.get("speeds", {}).items()
-            }
-            new_grid.robot_agent.counters = {
-                tuple(map(int, k.split('_'))): v
-                for k, v in grid_data.get("counters", {}).items()
-            }
-
-            # Load cell attributes
-            loaded_attrs = {
-                tuple(map(int, k.split('_'))): v
-                for k, v in grid_data.get('cell_attributes', {}).items()
-            }
-
-            for r in range(new_grid.static_grid.shape[0]):
-                for c in range(new_grid.static_grid.shape[1]):
-                    new_grid.cell_attributes[(r, c)] = {
-                        'agent_type': int(new_grid.static_grid[r, c]),
-                        'pitch': 440.0,
-                        'duration': 0.5,
-                        'velocity': 100,
-                    }
-
-            for (r, c), attrs in loaded_attrs.items():
-                new_grid.cell_attributes[(r, c)].update(attrs)
-
             # UI toggle
             idx = len(self.grids) - 1
             toggle = ToggleButton(
@@ -746,12 +886,13 @@ class CellularAutomataApp(App):
 
         def finish_grid_initialization(dt):
             self.switch_to_grid(0)
-            self.grids[0].refresh_cells()
+            self.view_for(self.grids[0]).refresh_cells()
             self.grid_toggles[0].state = 'down'
 
         Clock.schedule_once(lambda dt: self.switch_to_grid(0), 0)
-        Clock.schedule_once(lambda dt: self.grids[0].refresh_cells(), 0.1)
+        Clock.schedule_once(lambda dt: self.view_for(self.grids[0]).refresh_cells(), 0.1)
         Clock.schedule_once(finish_grid_initialization, 0)
+        self.schedule_ticks()
 
     def build_grid_toolbar(self):
         layout = BoxLayout(size_hint_y=None, height=40)
@@ -833,13 +974,17 @@ class CellularAutomataApp(App):
 
         # 🟩 5. Initial grid setup
         first_emoji = random.choice(GRID_ICONS)
-        first_grid = SimulationGrid(emoji_label=first_emoji)
-        first_grid.app = self
+        first_grid = GridModel(emoji_label=first_emoji)
         self.grids = [first_grid]
+        self.world = GridWorld(self.grids)
+        self.views = OrderedDict()
         self.grid_toggles = []
         self.current_index = 0
         self.add_grid_toggle(first_grid, index=0)
-        self.content_area.add_widget(first_grid)
+        first_view = self.view_for(first_grid)
+        self.content_area.add_widget(first_view)
+        self.hover = HoverTracker()
+        self.hover.track(first_view.board)
 
         # 🟦 6. Saved Tool selector at the bottom (South of grid)
         self.saved_tools = self.load_saved_tools()
@@ -853,36 +998,51 @@ class CellularAutomataApp(App):
         root.add_widget(bottom_bar)
 
         # 🟨 6. Start simulation loop
-        Clock.schedule_interval(self.update_all_grids, 0.1)
+        self.tick_events = {}
+        self.tick_clocks = {}
+        self.schedule_ticks()
 
         return root
 
     def grid_reset(self, _=None):
         grid = self.grids[self.current_index]
-        grid.static_grid.fill(agents.EMPTY)
-        grid.dynamic_grid.fill(agents.EMPTY)
-        for attr in grid.cell_attributes.values():
-            attr['agent_type'] = agents.EMPTY
-            attr['pitch'] = 440.0
-            attr['duration'] = 0.5
-        grid.refresh_cells()
+        grid.reset()
+        self.view_for(grid).refresh_cells()
+
+    def view_for(self, grid):
+        """Return the view of ``grid``, building it on first use.
+
+        Only the MAX_GRID_VIEWS most recently shown views are kept; older
+        ones are released and rebuilt if their grid is shown again.
+        """
+        view = self.views.pop(grid, None)
+        if view is None:
+            view = SimulationGrid(grid, app=self)
+        self.views[grid] = view
+        while len(self.views) > MAX_GRID_VIEWS:
+            _, stale = self.views.popitem(last=False)
+            if stale.parent:
+                stale.parent.remove_widget(stale)
+        return view
 
     def switch_to_grid(self, index):
-        if index == self.current_index and self.grids[index].parent:
+        grid = self.grids[index]
+        view = self.view_for(grid)
+        if index == self.current_index and view.parent:
             return
 
-        if self.grids[self.current_index].parent:
-            self.content_area.remove_widget(self.grids[self.current_index])
-
-        grid = self.grids[index]
-        self.content_area.add_widget(grid)
+        self.content_area.clear_widgets()
+        self.content_area.add_widget(view)
         self.current_index = index
+        self.hover.track(view.board)
 
         for i, toggle in enumerate(self.grid_toggles):
             toggle.state = 'down' if i == index else 'normal'
 
+        self.bpm_slider.value = grid.bpm
+
         # Schedule refresh after layout pass
-        Clock.schedule_once(lambda dt: grid.refresh_cells(), 0)
+        Clock.schedule_once(lambda dt: view.refresh_cells(), 0)
 
     def add_grid(self):
         """Add a new simulation grid (up to 108 total) and switch to it."""
@@ -892,9 +1052,8 @@ class CellularAutomataApp(App):
         next_idx = len(self.grids)
         # Example: use emoticon Unicode sequence starting from 0x1F600
         new_emoji = random.choice(GRID_ICONS)
-        # Create the new SimulationGrid
-        new_grid = SimulationGrid(emoji_label=new_emoji)
-        new_grid.app = self
+        # Create the new grid; its view is built when it is first shown
+        new_grid = GridModel(emoji_label=new_emoji)
         self.grids.append(new_grid)
         # Create a toggle button for the new grid
         new_toggle = ToggleButton(text=new_emoji, group="grids",
@@ -909,6 +1068,7 @@ class CellularAutomataApp(App):
         # Here we assume btn_remove is stored or accessible; for clarity, not shown storing it
         # Example if we stored it: self.btn_remove.disabled = False
         # [In this code snippet, one could store btn_remove as self.btn_remove above for toggling disabled state.]
+        self.schedule_ticks()
         # Immediately switch to the new grid
         self.switch_to_grid(next_idx)
         # Set the new toggle as down (the switch_to_grid call will handle the visuals)
@@ -924,8 +1084,9 @@ class CellularAutomataApp(App):
         idx_to_remove = self.current_index
         # Remove the grid widget from the content area (if it's active)
         grid_to_remove = self.grids[idx_to_remove]
-        if grid_to_remove.parent:
-            self.content_area.remove_widget(grid_to_remove)
+        view_to_remove = self.views.pop(grid_to_remove, None)
+        if view_to_remove is not None and view_to_remove.parent:
+            self.content_area.remove_widget(view_to_remove)
         # Unschedule its updates if needed (not needed in global loop scenario)
         # Clock.unschedule(grid_to_remove.update)  # only if individual scheduling was used
         # Remove from the list of grids
@@ -942,21 +1103,32 @@ class CellularAutomataApp(App):
             self.current_index = idx_to_remove
         # Switch display to the new current grid
         new_index = self.current_index
-        new_grid_widget = self.grids[new_index]
+        new_grid_widget = self.view_for(self.grids[new_index])
         new_grid_widget.size_hint = (1, 1)
         if not new_grid_widget.parent:
             self.content_area.add_widget(new_grid_widget)
+            new_grid_widget.refresh_cells()
+        self.hover.track(new_grid_widget.board)
         # Update toggle states: mark the new current index as down
         for i, toggle in enumerate(self.grid_toggles):
             toggle.state = 'down' if i == new_index else 'normal'
+        self.bpm_slider.value = self.grids[new_index].bpm
+        self.schedule_ticks()
         # If only one grid remains now, disable the remove button
         # if len(self.grids) == 1:
         #     self.btn_remove.disabled = True
 
-    def update_all_grids(self, dt):
-        """Update all simulation grids (called on each clock tick)."""
-        for grid in self.grids:
-            grid.update()
+    def update_grids(self, bpm, dt):
+        """Advance every grid at ``bpm`` in one batched step (called on each clock tick)."""
+        hits, changed = self.world.step(bpm)
+        tones = [agents.tone_attributes(r, c, grid.cell_attributes) for grid, r, c in hits]
+        when = self.tick_sample_time(bpm)
+        agents.play_tones(tones, when)
+        if self.recorder.recording:
+            self.recorder.log_tick(bpm, hits, tones, when)
+        current = self.grids[self.current_index]
+        if current in changed and current in self.views:
+            self.views[current].refresh_cells(changed[current].tolist())
 
 
 if __name__ == '__main__':
@@ -0,0 +1,115 @@
+"""Run a saved session without Kivy or an audio device.
+
+    python headless.py session.json --ticks 256 --events notes.csv --wav out.wav
+    python headless.py session.cbs --ticks 28800 --events /dev/null --log hour.cbe
+
+Every grid advances the given number of ticks at its own BPM (one tick per
+16th note, as in the app). Note events are written as CSV; with --wav the
+session is also rendered offline, with synth.py or (--synth c) with the
+sample-accurate ``audio.render`` of the compiled extension.
+"""
+import argparse
+import csv
+import heapq
+import sys
+import time
+from collections import namedtuple
+
+import agents
+import session_format
+from world import GridModel, GridWorld
+
+STEPS_PER_BEAT = 4  # 16th-note ticks, as in CellularAutomataApp.schedule_ticks
+
+NoteEvent = namedtuple('NoteEvent', 'time tick grid row col pitch duration velocity')
+
+
+def tick_seconds(bpm):
+    return 60.0 / STEPS_PER_BEAT / bpm
+
+
+def load_session(source, checkpoints=True):
+    """Load the grids of a saved session (JSON or .cbs) as running GridModels.
+
+    Runs that never seek back can pass ``checkpoints=False`` to skip the
+    snapshots GridModel.seek would restore from.
+    """
+    if isinstance(source, str):
+        source = session_format.read_session(source)
+    grids = [GridModel.from_state(grid_data) for grid_data in source.get('grids', [])]
+    for grid in grids:
+        grid.running = True
+        if not checkpoints:
+            grid.checkpoint_interval = 0
+    return grids
+
+
+def iter_events(grids, ticks, start=0):
+    """Advance every grid ``ticks`` times at its BPM and yield NoteEvents in time order.
+
+    With ``start`` the grids first seek silently to that tick, and events
+    are timed from the start of the session.
+    """
+    world = GridWorld(grids)
+    index = {id(grid): i for i, grid in enumerate(grids)}
+    if start:
+        world.seek(start)
+    # (time of next tick, bpm, tick number) for each distinct BPM
+    pending = [(start * tick_seconds(bpm), bpm, start) for bpm in world.bpms()]
+    heapq.heapify(pending)
+    while pending:
+        now, bpm, tick = heapq.heappop(pending)
+        hits, _ = world.step(bpm)
+        for grid, r, c in hits:
+            pitch, duration, velocity = agents.tone_attributes(r, c, grid.cell_attributes)
+            yield NoteEvent(now, tick, index[id(grid)], r, c, pitch, duration, velocity)
+        if tick + 1 < start + ticks:
+            heapq.heappush(pending, ((tick + 1) * tick_seconds(bpm), bpm, tick + 1))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a Cellbeat session headless.")
+    parser.add_argument('session', help="session file written by Recorder.save (.json or .cbs)")
+    parser.add_argument('--ticks', type=int, default=64, help="ticks to run each grid for")
+    parser.add_argument('--start', type=int, default=0, help="seek to this tick first, without output")
+    parser.add_argument('--events', default='-', help="CSV file for note events ('-' for stdout)")
+    parser.add_argument('--log', help="also write the notes as a compressed event log (.cbe)")
+    parser.add_argument('--wav', help="also render the notes offline to this WAV file")
+    parser.add_argument('--synth', choices=('numpy', 'c'), default='numpy',
+                        help="offline renderer for --wav (default: numpy)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    grids = load_session(args.session, checkpoints=False)
+    events = list(iter_events(grids, args.ticks, args.start))
+
+    out = sys.stdout if args.events == '-' else open(args.events, 'w', newline='')
+    try:
+        writer = csv.writer(out)
+        writer.writerow(NoteEvent._fields)
+        writer.writerows(events)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    if args.log:
+        import event_log
+        with event_log.EventLog(args.log, grids) as log:
+            for e in events:
+                log.append(e.tick, grids[e.grid].bpm, (e.grid, e.row, e.col), (e.pitch, e.duration, e.velocity))
+
+    if args.wav:
+        notes = [(e.time, e.pitch, e.duration, e.velocity) for e in events]
+        if args.synth == 'c':
+            import audio
+            audio.render(notes, args.wav)
+        else:
+            import synth
+            synth.write_wav(args.wav, synth.render_events(notes))
+
+    print(f"{len(grids)} grids, {args.ticks} ticks, {len(events)} notes "
+          f"in {time.perf_counter() - started:.3f}s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
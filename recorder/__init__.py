@@ -1,7 +1,11 @@
 import json
+import os
 import numpy as np
 import agents
 import audio  # C extension for audio playback/recording
+import event_log
+import session_format
+from world import CellAttributes
 
 class Recorder:
     def __init__(self, grids, sample_rate=44100):
@@ -10,19 +14,52 @@ class Recorder:
         self.audio_events = []
         self.sample_rate = sample_rate
         self.filename = "simulation_recording.json"
+        self.event_log = None
+        self.ticks = {}
+        self.start_frame = 0
 
     def start_recording(self, filename="simulation_recording.json"):
         self.audio_events.clear()
         self.recording = True
         self.filename = filename
-        audio.start_recording(self.filename.replace('.json', '.wav'))
+        stem = os.path.splitext(self.filename)[0]
+        audio.start_recording(stem + '.wav')
+        self.start_frame = audio.sample_time()
+        self.event_log = event_log.EventLog(stem + event_log.EVENT_LOG_EXT, self.grids, sample_rate=self.sample_rate)
+        self.ticks = {}
         print(f"Recording started: {self.filename}")
 
     def stop_recording(self):
         self.recording = False
         audio.stop_recording()
-        self.save_json(self.filename)
-        print(f"Recording stopped and saved: {self.filename}")
+        self.event_log.close()
+        self.save(self.filename)
+        print(f"Recording stopped and saved: {self.filename} ({self.event_log.count} notes logged)")
+
+    def log_tick(self, bpm, hits, tones, sample_time=None):
+        """Log the (grid, row, col) hits of one tick at ``bpm`` and the tones they played.
+
+        ``sample_time`` is the ``audio.sample_time()`` position the tones were
+        scheduled at (now if not given); notes are timed by it rather than by
+        tick counts, which restart whenever the tempo changes.
+        """
+        tick = self.ticks.get(bpm, 0)
+        self.ticks[bpm] = tick + 1
+        if hits:
+            frame = (audio.sample_time() if sample_time is None else sample_time) - self.start_frame
+            index = {id(grid): i for i, grid in enumerate(self.grids)}
+            self.event_log.append(tick, bpm, [(index[id(grid)], r, c) for grid, r, c in hits], tones, frame)
+
+    def save(self, filename):
+        """Save as a binary session for a .cbs name, otherwise as JSON."""
+        if filename.endswith(session_format.SESSION_EXT):
+            session_format.save_session(filename, self.grids, self.audio_events)
+        else:
+            self.save_json(filename)
+
+    def load(self, filename):
+        """Load a session file of either format into the current grids."""
+        self.load_json(session_format.read_session(filename))
 
     def save_json(self, filename):
         all_grids_state = []
@@ -44,17 +81,7 @@ class Recorder:
                     f"{k[0]}_{k[1]}": v
                     for k, v in grid.robot_agent.counters.items()
                 },
-                "cell_attributes": {
-                    f"{r}_{c}": {
-                        "agent_type": grid.cell_attributes.get((r, c), {}).get("agent_type",
-                                                                               int(grid.static_grid[r, c])),
-                        "pitch": grid.cell_attributes.get((r, c), {}).get("pitch", 440.0),
-                        "duration": grid.cell_attributes.get((r, c), {}).get("duration", 0.5),
-                        "velocity": grid.cell_attributes.get((r, c), {}).get("velocity", 100)
-                    }
-                    for r in range(grid.static_grid.shape[0])
-                    for c in range(grid.static_grid.shape[1])
-                }
+                "cell_attributes": grid.cell_attributes.to_dict()
             }
             all_grids_state.append(grid_state)
 
@@ -68,8 +95,7 @@ class Recorder:
 
     def load_json(self, source):
         if isinstance(source, str):
-            with open(source, 'r') as f:
-                data = json.load(f)
+            data = session_format.read_session(source)
         elif isinstance(source, dict):
             data = source
         else:
@@ -80,27 +106,24 @@ class Recorder:
             raise ValueError("Mismatch between saved grids and current grids")
 
         for grid, grid_data in zip(self.grids, grids_data):
-            grid.static_grid = np.array(grid_data["static_grid"])
-            grid.dynamic_grid = np.array(grid_data["dynamic_grid"])
-
-            grid.robot_agent.directions = {
-                tuple(map(int, k.split('_'))): agents.DIRECTIONS[v] if isinstance(v, str) else v
-                for k, v in grid_data["directions"].items()
-            }
+            grid.static_grid = np.asarray(grid_data["static_grid"])
+            grid.dynamic_grid = np.asarray(grid_data["dynamic_grid"])
 
-            grid.robot_agent.speeds = {tuple(map(int, k.split('_'))): v for k, v in grid_data["speeds"].items()}
-            grid.robot_agent.counters = {tuple(map(int, k.split('_'))): v for k, v in grid_data["counters"].items()}
+            grid.robot_agent.set_state(
+                {
+                    tuple(map(int, k.split('_'))): agents.DIRECTIONS[v] if isinstance(v, str) else tuple(v)
+                    for k, v in grid_data.get("directions", {}).items()
+                },
+                {tuple(map(int, k.split('_'))): v for k, v in grid_data.get("speeds", {}).items()},
+                {tuple(map(int, k.split('_'))): v for k, v in grid_data.get("counters", {}).items()},
+            )
 
-            grid.cell_attributes = {}
-            for k_str, v in grid_data["cell_attributes"].items():
-                r, c = map(int, k_str.split('_'))
-                grid.cell_attributes[(r, c)] = {
-                    "agent_type": v.get("agent_type", agents.EMPTY),
-                    "pitch": float(v.get("pitch", 440.0)),
-                    "duration": float(v.get("duration", 0.5)),
-                    "velocity": int(v.get("velocity", 100))
-                }
+            # Binary sessions store only non-empty cells; the rest keep defaults.
+            grid.cell_attributes = CellAttributes(*grid.static_grid.shape)
+            grid.cell_attributes.load(grid_data.get("cell_attributes", {}))
 
-            grid.refresh_cells()
+            # The loaded state starts a new timeline; older snapshots would seek back into the previous one.
+            grid.tick = 0
+            grid.drop_checkpoints()
 
         self.audio_events = data.get("audio_events", [])
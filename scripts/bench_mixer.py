@@ -0,0 +1,53 @@
+"""Compare per-buffer CPU time of the float and legacy mixers in audio.c.
+
+    CELLBEAT_AUDIO_BACKEND=null python scripts/bench_mixer.py
+
+Renders the same dense passage offline with each mixer (and oscillator) and
+reports the average cost of one 1024-frame buffer.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import audio
+
+BUFFER_SIZE = 1024
+VOICES = 16
+SECONDS = 10
+
+
+def dense_events(harmonics):
+    # A new note every 1/32 s, each 1 s long, so the pool stays full.
+    step = 1.0 / 32
+    return [
+        (i * step, 110.0 * (1 + i % 7), 1.0, 100, harmonics)
+        for i in range(int(SECONDS / step))
+    ]
+
+
+def bench(mixer, oscillator, events):
+    audio.set_mixer(mixer)
+    audio.set_oscillator(oscillator)
+    started = time.perf_counter()
+    pcm = audio.render(events)
+    elapsed = time.perf_counter() - started
+    buffers = len(pcm) / 2 / BUFFER_SIZE
+    return elapsed / buffers * 1e6
+
+
+def main():
+    audio.set_polyphony(VOICES)
+    for label, harmonics in (("1 harmonic", [1.0]), ("16 harmonics", [1.0 / (h + 1) for h in range(16)])):
+        events = dense_events(harmonics)
+        for oscillator in ("wavetable", "sine"):
+            legacy = bench("legacy", oscillator, events)
+            mixed = bench("float", oscillator, events)
+            print(f"{label:>13} {oscillator:>9}: legacy {legacy:8.1f} us/buffer, "
+                  f"float {mixed:8.1f} us/buffer ({legacy / mixed:.2f}x)")
+    audio.set_mixer("float")
+    audio.set_oscillator("wavetable")
+
+
+if __name__ == "__main__":
+    main()
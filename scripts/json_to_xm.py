@@ -1,23 +1,34 @@
 import json
-import struct
+import os
+import sys
 
-# XM note lookup table
-NOTE_NAMES = ["C-", "C#", "D-", "D#", "E-", "F-", "F#", "G-", "G#", "A-", "A#", "B-"]
+import numpy as np
+
+from xm_patterns import PATTERN_DTYPE, note_from_string
+from xm_reader import XMReader
+from xm_writer import tuning, write_xm
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import synth
+
+BELL_PITCH = 261.63  # C-4, the note at which an XM sample plays untransposed
+BELL_SECONDS = 1.0
+BELL_RATE = 22050  # 8-bit at half rate keeps the bell at ~22 KB; trackers resample anyway
+
+
+def bell_sample():
+    """The synth's bell as an 8-bit XM sample, tuned so C-4 plays at BELL_PITCH."""
+    bell = synth.render_voice(BELL_PITCH, BELL_SECONDS, 127, sample_rate=BELL_RATE)
+    pcm = np.round(synth.soft_clip(bell) * 127).astype(np.int8)
+    relative_note, finetune = tuning(BELL_RATE)
+    return {"name": "bell", "pcm": pcm, "relative_note": relative_note, "finetune": finetune}
 
-def note_from_string(note):
-    """Convert readable note format (C-4, D#5, etc.) to XM note number (1-96)."""
-    if note == "---":
-        return 0  # No note
-    note_name = note[:2]
-    octave = int(note[2])
-    if note_name in NOTE_NAMES:
-        return (octave * 12) + NOTE_NAMES.index(note_name) + 1
-    return 0
 
 class JSONToXM:
-    def __init__(self, json_file, output_file):
+    def __init__(self, json_file, output_file, samples_from=None):
         self.json_file = json_file
         self.output_file = output_file
+        self.samples_from = samples_from
         self.data = None
 
     def read_json(self):
@@ -25,99 +36,48 @@ class JSONToXM:
         with open(self.json_file, "r", encoding="utf-8") as f:
             self.data = json.load(f)
 
+    def patterns(self):
+        """The JSON patterns as (rows, channels) xm_patterns.PATTERN_DTYPE arrays."""
+        channels = self.data["header"]["num_channels"]
+        return [
+            np.array([
+                (note_from_string(cell["note"]), cell["instrument"], cell["volume"], cell["effect"],
+                 cell["effect_param"])
+                for row in pattern for cell in row
+            ], dtype=PATTERN_DTYPE).reshape(len(pattern), channels)
+            for pattern in self.data["patterns"]
+        ]
+
+    def instruments(self, patterns):
+        """Instruments with real sample data.
+
+        With ``samples_from`` (the module the JSON was exported from) its
+        samples are copied over. Otherwise a single instrument holding the
+        synth's bell is shared: every note in ``patterns`` is remapped to it,
+        so the sample is stored once.
+        """
+        if self.samples_from:
+            with XMReader(self.samples_from) as reader:
+                instruments = [{"name": instrument["name"], "samples": []} for instrument in reader.instruments]
+                for i, _, header, pcm in reader.iter_samples():
+                    instruments[i]["samples"].append(dict(header, pcm=pcm))
+                return instruments
+
+        for pattern in patterns:
+            pattern["instr"][pattern["instr"] > 0] = 1
+        return [{"name": "bell", "samples": [bell_sample()]}]
+
     def write_xm_file(self):
         """Writes the XM file based on parsed JSON data."""
         if self.data is None:
             raise ValueError("JSON data not loaded. Call read_json() first.")
 
-        with open(self.output_file, "wb") as f:
-            # Write Header
-            f.write(self.data["header"]["id_text"].ljust(17, "\x00").encode("ascii"))
-            f.write(self.data["header"]["module_name"].ljust(20, "\x00").encode("ascii"))
-            f.write(bytes([0x1A]))  # XM identifier byte
-            f.write(self.data["header"]["tracker_name"].ljust(20, "\x00").encode("ascii"))
-            f.write(struct.pack("<H", int(self.data["header"]["version"] * 256)))
-            f.write(struct.pack("<I", self.data["header"]["header_size"]))
-            f.write(struct.pack("<H", self.data["header"]["song_length"]))  # Number of patterns in order list
-            f.write(struct.pack("<H", self.data["header"]["restart_position"]))
-            f.write(struct.pack("<H", self.data["header"]["num_channels"]))
-            f.write(struct.pack("<H", self.data["header"]["num_patterns"]))  # Actual number of patterns
-            f.write(struct.pack("<H", self.data["header"]["num_instruments"]))
-            f.write(struct.pack("<H", self.data["header"]["flags"]))
-            f.write(struct.pack("<H", self.data["header"]["tempo"]))
-            f.write(struct.pack("<H", self.data["header"]["bpm"]))
-
-            # Pattern Order Table
-            order_table_size = 256  # XM requires 256 bytes for the pattern order table
-            order_table = [i for i in range(self.data["header"]["song_length"])]  # Sequential order
-            order_table += [0] * (order_table_size - len(order_table))  # Fill remaining space
-            f.write(bytes(order_table))
-
-            # Write Patterns
-            for pattern in self.data["patterns"]:
-                num_rows = len(pattern)  # Number of rows per pattern
-                packed_data = b""
-
-                for row in pattern:
-                    for note_data in row:
-                        note = note_from_string(note_data["note"])
-                        instr = note_data["instrument"]
-                        vol = note_data["volume"]
-                        effect = note_data["effect"]
-                        effect_param = note_data["effect_param"]
-
-                        # Pack pattern data properly
-                        packed_data += struct.pack("BBBBB", note, instr, vol, effect, effect_param)
-
-                # Write pattern header
-                pattern_header_size = 9  # Fixed size for each pattern header
-                packed_size = len(packed_data)
-
-                f.write(struct.pack("<I", pattern_header_size))  # Header size
-                f.write(struct.pack("<B", 0))  # Packing type (always 0)
-                f.write(struct.pack("<H", num_rows))  # Number of rows in pattern
-                f.write(struct.pack("<H", packed_size))  # Packed data size
-
-                # Write pattern data
-                f.write(packed_data)
-
-            # Write Instruments (XM requires proper instrument headers)
-            for i in range(self.data["header"]["num_instruments"]):
-                instrument_name = f"Instrument {i+1}"
-                f.write(instrument_name.ljust(22, "\x00").encode("ascii"))  # Instrument name (22 bytes)
-                f.write(struct.pack("<B", 0))  # Instrument type (always 0)
-                f.write(struct.pack("<H", 33))  # Instrument size (fixed for now)
-
-                # Sample Mapping: Map sample 1-to-1 for now
-                f.write(struct.pack("<B", 1))  # Number of samples
-                f.write(bytes([0] * 96))  # Sample map (no actual mapping)
-                f.write(bytes([0] * 48))  # Volume & panning envelopes
-                f.write(struct.pack("<B", 0))  # Volume envelope points
-                f.write(struct.pack("<B", 0))  # Panning envelope points
-                f.write(bytes([0] * 11))  # Unused fields
-
-                # Sample Header
-                sample_length = 500  # Placeholder length
-                loop_start = 0
-                loop_length = 0
-                volume = 64  # Full volume
-                finetune = 0
-                sample_type = 0  # No looping
-                panning = 128  # Centered
-                relative_note = 0  # No transposition
-
-                f.write(struct.pack("<I", sample_length))  # Sample length
-                f.write(struct.pack("<I", loop_start))  # Loop start
-                f.write(struct.pack("<I", loop_length))  # Loop length
-                f.write(struct.pack("<B", volume))  # Volume
-                f.write(struct.pack("<b", finetune))  # Finetune
-                f.write(struct.pack("<B", sample_type))  # Sample type
-                f.write(struct.pack("<B", panning))  # Panning
-                f.write(struct.pack("<b", relative_note))  # Relative note
-                f.write(struct.pack("<B", 0))  # Reserved
-
-                # Placeholder sample data (silence)
-                f.write(bytes(sample_length))
+        header = self.data["header"]
+        patterns = self.patterns()
+        instruments = self.instruments(patterns)
+        order = self.data.get("order", list(range(header["song_length"])))
+        write_xm(self.output_file, patterns, instruments, order=order, module_name=header["module_name"],
+                 channels=header["num_channels"], tempo=header["tempo"], bpm=header["bpm"])
 
         print(f"🎵 XM file successfully created: {self.output_file}")
 
@@ -130,5 +90,6 @@ class JSONToXM:
 if __name__ == "__main__":
     json_filename = input("Enter the JSON file path: ")
     xm_filename = input("Enter the output .xm file path: ")
-    converter = JSONToXM(json_filename, xm_filename)
+    samples_filename = input("Take samples from .xm file (blank for bells): ").strip() or None
+    converter = JSONToXM(json_filename, xm_filename, samples_filename)
     converter.convert()
@@ -0,0 +1,97 @@
+"""Stream a format-0 Standard MIDI File to disk.
+
+Notes are added in time order with ``note``; their note-offs wait in a heap
+and are written as soon as a later note (or ``close``) passes them, so only
+the currently sounding notes are held in memory. Retriggering a sounding key
+ends the earlier note first. The track length is patched into the MTrk
+header when the file is closed.
+
+    with MidiWriter("song.mid", bpm=120) as midi:
+        midi.note(0.0, channel=0, key=60, velocity=100, duration=0.5)
+"""
+import heapq
+import math
+import struct
+
+HEADER = struct.Struct(">4sIHHH")  # MThd, length 6, format, tracks, division
+TRACK_HEADER = struct.Struct(">4sI")
+DIVISION = 480  # ticks per quarter note
+NOTE_ON = 0x90
+NOTE_OFF = 0x80
+PROGRAM_CHANGE = 0xC0
+DRUM_CHANNEL = 9
+
+
+def variable_length(value):
+    """Encode ``value`` as a MIDI variable-length quantity."""
+    out = bytearray([value & 0x7F])
+    value >>= 7
+    while value:
+        out.insert(0, 0x80 | (value & 0x7F))
+        value >>= 7
+    return bytes(out)
+
+
+def key_for_pitch(pitch):
+    """Nearest MIDI key to ``pitch`` Hz (A4 = 440 Hz = key 69)."""
+    return min(127, max(0, round(69 + 12 * math.log2(pitch / 440.0))))
+
+
+class MidiWriter:
+    def __init__(self, filename, bpm=120):
+        self.ticks_per_second = DIVISION * bpm / 60.0
+        self.last_tick = 0
+        self.offs = []  # heap of (note-off tick, channel, key)
+        self.sounding = {}  # (channel, key) -> note-off tick
+        self.count = 0
+        self.file = open(filename, "wb")
+        self.file.write(HEADER.pack(b"MThd", 6, 0, 1, DIVISION))
+        self.track_start = self.file.tell()
+        self.file.write(TRACK_HEADER.pack(b"MTrk", 0))
+        self.event(0, b"\xff\x51\x03" + round(60e6 / bpm).to_bytes(3, "big"))  # tempo, microseconds per beat
+
+    def event(self, tick, data):
+        self.file.write(variable_length(tick - self.last_tick) + data)
+        self.last_tick = tick
+
+    def program(self, channel, program):
+        """Select ``program`` (0-based General MIDI number) on ``channel`` from now on."""
+        self.event(self.last_tick, bytes((PROGRAM_CHANGE | channel, program)))
+
+    def flush_offs(self, tick):
+        """Write the note-offs due at or before ``tick``."""
+        while self.offs and self.offs[0][0] <= tick:
+            off, channel, key = heapq.heappop(self.offs)
+            if self.sounding.get((channel, key)) == off:  # not already cut short by a retrigger
+                del self.sounding[channel, key]
+                self.event(off, bytes((NOTE_OFF | channel, key, 0)))
+
+    def note(self, time, channel, key, velocity, duration):
+        """Add a note at ``time`` seconds; notes must come in time order."""
+        tick = max(round(time * self.ticks_per_second), self.last_tick)
+        self.flush_offs(tick)
+        if self.sounding.pop((channel, key), None) is not None:
+            self.event(tick, bytes((NOTE_OFF | channel, key, 0)))
+        self.event(tick, bytes((NOTE_ON | channel, key, min(127, max(1, velocity)))))
+        off = tick + max(1, round(duration * self.ticks_per_second))
+        heapq.heappush(self.offs, (off, channel, key))
+        self.sounding[channel, key] = off
+        self.count += 1
+
+    def close(self, end=0.0):
+        """Release every note, end the track (no earlier than ``end`` seconds) and patch its length."""
+        if self.file is None:
+            return
+        self.flush_offs(math.inf)
+        self.event(max(self.last_tick, round(end * self.ticks_per_second)), b"\xff\x2f\x00")
+        length = self.file.tell() - self.track_start - TRACK_HEADER.size
+        self.file.seek(self.track_start)
+        self.file.write(TRACK_HEADER.pack(b"MTrk", length))
+        self.file.close()
+        self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,161 @@
+"""Export a saved session as an XM module or a Standard MIDI File.
+
+    python scripts/session_export.py session.cbs --ticks 28800 --xm song.xm
+    python scripts/session_export.py session.json --ticks 1024 --midi song.mid
+
+The session runs headless (headless.iter_events, with seek checkpoints off)
+and every bell trigger is written as soon as the simulator yields it, so
+memory stays fixed however many ticks are rendered.
+
+XM: a row is one 16th note of the fastest grid (speed 6 with the module BPM
+set to that grid's BPM plays rows at exactly the app's tick rate); notes of
+slower grids land on the nearest row. Each grid gets ``voices`` channels
+(one by default) and a note ends with a key-off after its duration. Patterns
+stream to xm_writer.XMWriter, which stores repeated patterns once.
+
+MIDI: format 0, one MIDI channel per grid (skipping the drum channel), with
+note times kept exact to the tick of a 480 PPQ grid.
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+from json_to_xm import BELL_PITCH, bell_sample
+from midi_writer import DRUM_CHANNEL, MidiWriter, key_for_pitch
+from xm_patterns import PATTERN_DTYPE
+from xm_writer import MAX_ORDERS, XMWriter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import headless
+
+XM_C4 = 49  # note number at which a sample plays at its own pitch
+KEY_OFF = 97
+MAX_CHANNELS = 32
+MAX_ROWS = 256
+MIN_BPM, MAX_BPM = 32, 255
+MIDI_CHANNELS = [channel for channel in range(16) if channel != DRUM_CHANNEL]
+TUBULAR_BELLS = 14  # General MIDI program, 0-based
+
+
+def xm_note(pitch):
+    return min(96, max(1, round(XM_C4 + 12 * math.log2(pitch / BELL_PITCH))))
+
+
+def xm_volume(velocity):
+    """Volume column entry (0x10-0x50 sets volume 0-64) for a 0-127 velocity."""
+    return 0x10 + min(64, max(0, round(velocity * 64 / 127)))
+
+
+def song_seconds(grids, ticks):
+    """Length of ``ticks`` ticks of the slowest grid."""
+    return ticks * headless.tick_seconds(min(grid.bpm for grid in grids))
+
+
+def export_xm(grids, ticks, filename, voices=1, pattern_rows=None, module_name="Cellbeat"):
+    """Run ``grids`` for ``ticks`` ticks into an XM module; return (notes written, notes dropped).
+
+    A note is dropped only when all of its grid's voices already start a
+    note on that row.
+    """
+    channels = len(grids) * voices
+    if channels > MAX_CHANNELS:
+        raise ValueError(f"{len(grids)} grids x {voices} voices need {channels} channels; XM has {MAX_CHANNELS}")
+    bpm = min(MAX_BPM, max(MIN_BPM, round(max(grid.bpm for grid in grids))))
+    row_seconds = headless.tick_seconds(bpm)
+    total_rows = max(1, math.ceil(song_seconds(grids, ticks) / row_seconds))
+    pattern_rows = pattern_rows or max(64, math.ceil(total_rows / MAX_ORDERS))
+    if pattern_rows > MAX_ROWS or math.ceil(total_rows / pattern_rows) > MAX_ORDERS:
+        raise ValueError(f"{total_rows} rows do not fit {MAX_ORDERS} patterns of at most {MAX_ROWS} rows; "
+                         f"export fewer ticks or MIDI")
+
+    pattern = np.zeros((pattern_rows, channels), dtype=PATTERN_DTYPE)
+    notes = pattern["note"]
+    first = 0  # song row of the pattern's first row
+    off_rows = [-1] * channels  # row of each channel's pending key-off
+    written = dropped = 0
+    xm = XMWriter(filename, channels, module_name, tempo=6, bpm=bpm)
+
+    def next_pattern():
+        nonlocal first
+        xm.append(pattern)
+        pattern.fill(0)
+        first += pattern_rows
+        for channel, off in enumerate(off_rows):
+            if first <= off < first + pattern_rows:
+                notes[off - first, channel] = KEY_OFF
+
+    def free(row, channel):
+        return notes[row - first, channel] in (0, KEY_OFF)
+
+    try:
+        for event in headless.iter_events(grids, ticks):
+            row = min(round(event.time / row_seconds), total_rows - 1)
+            while row >= first + pattern_rows:
+                next_pattern()
+            voice_channels = range(event.grid * voices, (event.grid + 1) * voices)
+            # Prefer a silent voice; otherwise cut one short.
+            channel = next((c for c in voice_channels if free(row, c) and off_rows[c] <= row),
+                           next((c for c in voice_channels if free(row, c)), None))
+            if channel is None:
+                dropped += 1
+                continue
+
+            off = off_rows[channel]
+            if row < off < first + pattern_rows and notes[off - first, channel] == KEY_OFF:
+                notes[off - first, channel] = 0
+            pattern[row - first, channel] = (xm_note(event.pitch), 1, xm_volume(event.velocity), 0, 0)
+            off = off_rows[channel] = row + max(1, round(event.duration / row_seconds))
+            if off < first + pattern_rows and notes[off - first, channel] == 0:
+                notes[off - first, channel] = KEY_OFF
+            written += 1
+        while first < total_rows:
+            next_pattern()
+    finally:
+        xm.close([{"name": "bell", "samples": [bell_sample()]}])
+    return written, dropped
+
+
+def export_midi(grids, ticks, filename):
+    """Run ``grids`` for ``ticks`` ticks into a Standard MIDI File; return the notes written."""
+    channels = [MIDI_CHANNELS[i % len(MIDI_CHANNELS)] for i in range(len(grids))]
+    with MidiWriter(filename, bpm=max(grid.bpm for grid in grids)) as midi:
+        for channel in sorted(set(channels)):
+            midi.program(channel, TUBULAR_BELLS)
+        for event in headless.iter_events(grids, ticks):
+            midi.note(event.time, channels[event.grid], key_for_pitch(event.pitch), round(event.velocity),
+                      event.duration)
+        midi.close(song_seconds(grids, ticks))
+    return midi.count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a Cellbeat session as XM or MIDI.")
+    parser.add_argument('session', help="session file written by Recorder.save (.json or .cbs)")
+    parser.add_argument('--ticks', type=int, default=256, help="ticks to run each grid for")
+    parser.add_argument('--xm', help="write an XM module, one channel per grid")
+    parser.add_argument('--midi', help="write a Standard MIDI File, one MIDI channel per grid")
+    parser.add_argument('--voices', type=int, default=1, help="XM channels per grid (default: 1)")
+    parser.add_argument('--rows', type=int, help="XM pattern length (default: 64, more for long songs)")
+    args = parser.parse_args(argv)
+    if not (args.xm or args.midi):
+        parser.error("nothing to do: give --xm and/or --midi")
+
+    if args.xm:
+        started = time.perf_counter()
+        grids = headless.load_session(args.session, checkpoints=False)
+        written, dropped = export_xm(grids, args.ticks, args.xm, args.voices, args.rows)
+        print(f"{args.xm}: {written} notes ({dropped} dropped) in {time.perf_counter() - started:.3f}s",
+              file=sys.stderr)
+    if args.midi:
+        started = time.perf_counter()
+        grids = headless.load_session(args.session, checkpoints=False)
+        written = export_midi(grids, args.ticks, args.midi)
+        print(f"{args.midi}: {written} notes in {time.perf_counter() - started:.3f}s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""Lazy, memory-mapped reader for XM modules.
+
+Opening a module maps the file and walks only the pattern headers,
+recording where each pattern's packed data starts; the instrument and
+sample headers are indexed the same way on first use. Patterns are decoded
+(with xm_patterns) only when asked for, so large modules open instantly and
+can be streamed pattern by pattern.
+
+    with XMReader("assets/audio/dn-heavens.xm") as xm:
+        for index, pattern in xm.iter_patterns():
+            ...
+        pcm = xm.sample(instrument, sample)
+
+Sample data is exposed as NumPy views of the mapped file and delta decoded
+with one cumsum; it is only copied when decoded.
+"""
+import mmap
+import struct
+
+import numpy as np
+
+from xm_patterns import decode_patterns
+
+HEADER_FIELDS = struct.Struct("<IHHHHHHHH")  # header_size .. bpm, at offset 60
+PATTERN_HEADER = struct.Struct("<IBHH")  # header length, packing type, rows, packed size
+INSTRUMENT_HEADER = struct.Struct("<I22sBH")  # size, name, type, number of samples
+SAMPLE_HEADER = struct.Struct("<IIIBbBBbB22s")  # 40 bytes: length .. reserved, name
+SAMPLE_HEADER_SIZE = 40
+SAMPLE_16BIT = 0x10  # bit of the sample type byte
+SAMPLE_8BIT_DTYPE = np.dtype("i1")
+SAMPLE_16BIT_DTYPE = np.dtype("<i2")
+
+
+def _text(raw):
+    return raw.decode("ascii", errors="replace").strip("\x00")
+
+
+class XMReader:
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.header = {}
+        self.order = []
+        self.pattern_index = []  # (data offset, rows, packed size) per pattern
+        self._instruments = None  # header fields, as in the xm_to_json export
+        self._sample_index = None  # data offset of each sample, per instrument
+        self._instruments_offset = 0
+        try:
+            self.parse_header()
+            self.index_patterns()
+        except struct.error as e:
+            self.data.close()
+            raise ValueError(f"{self.filename} is truncated or malformed: {e}") from None
+
+    @property
+    def instruments(self):
+        if self._instruments is None:
+            self.index_instruments()
+        return self._instruments
+
+    @property
+    def sample_index(self):
+        if self._sample_index is None:
+            self.index_instruments()
+        return self._sample_index
+
+    def parse_header(self):
+        data = self.data
+        if data[:17] != b"Extended Module: ":
+            self.data.close()
+            raise ValueError(f"{self.filename} is not an XM module")
+        (header_size, song_length, restart, channels, patterns,
+         instruments, flags, tempo, bpm) = HEADER_FIELDS.unpack_from(data, 60)
+        self.header = {
+            "id_text": _text(data[:17]),
+            "module_name": _text(data[17:37]),
+            "tracker_name": _text(data[38:58]),
+            "version": struct.unpack_from("<H", data, 58)[0] / 0x100,
+            "header_size": header_size,
+            "song_length": song_length,
+            "restart_position": restart,
+            "num_channels": channels,
+            "num_patterns": patterns,
+            "num_instruments": instruments,
+            "flags": flags,
+            "tempo": tempo,
+            "bpm": bpm,
+        }
+        self.order = list(data[80:80 + song_length])
+
+    def index_patterns(self):
+        """Walk the pattern headers once, recording where each pattern's data is."""
+        data = self.data
+        offset = 60 + self.header["header_size"]
+        for _ in range(self.header["num_patterns"]):
+            length, _, rows, packed_size = PATTERN_HEADER.unpack_from(data, offset)
+            self.pattern_index.append((offset + length, rows, packed_size))
+            offset += length + packed_size
+        self._instruments_offset = offset
+
+    def index_instruments(self):
+        """Walk the instrument and sample headers once (on first use), recording offsets."""
+        try:
+            self._index_instruments()
+        except struct.error as e:
+            raise ValueError(f"{self.filename} has truncated or malformed instruments: {e}") from None
+
+    def _index_instruments(self):
+        data = self.data
+        offset = self._instruments_offset
+        instruments, sample_index = [], []
+        for _ in range(self.header["num_instruments"]):
+            size, name, _, num_samples = INSTRUMENT_HEADER.unpack_from(data, offset)
+            sample_header_size = SAMPLE_HEADER_SIZE
+            if num_samples:
+                sample_header_size = struct.unpack_from("<I", data, offset + 29)[0] or SAMPLE_HEADER_SIZE
+            offset += size
+
+            # All sample headers come first, then all of the sample data.
+            samples = []
+            for i in range(num_samples):
+                (length, loop_start, loop_length, volume, finetune, sample_type,
+                 panning, relative_note, _, sample_name) = SAMPLE_HEADER.unpack_from(
+                    data, offset + i * sample_header_size)
+                samples.append({
+                    "name": _text(sample_name),
+                    "length": length,
+                    "loop_start": loop_start,
+                    "loop_length": loop_length,
+                    "volume": volume,
+                    "finetune": finetune,
+                    "type": sample_type,
+                    "panning": panning,
+                    "relative_note": relative_note,
+                })
+            offset += num_samples * sample_header_size
+
+            sample_offsets = []
+            for sample in samples:
+                sample_offsets.append(offset)
+                offset += sample["length"]
+            instruments.append({"name": _text(name), "num_samples": num_samples, "samples": samples})
+            sample_index.append(sample_offsets)
+
+        if offset > len(data):
+            raise struct.error(f"sample data runs to byte {offset} of {len(data)}")
+        self._instruments, self._sample_index = instruments, sample_index
+
+    def pattern(self, index):
+        """Decode one pattern into a (rows, channels) xm_patterns.PATTERN_DTYPE array."""
+        return self._decode([index])[0]
+
+    def all_patterns(self):
+        """Decode every pattern at once (faster than one at a time for whole-module tools)."""
+        return self._decode(range(len(self.pattern_index)))
+
+    def _decode(self, indices):
+        entries = [self.pattern_index[index] for index in indices]
+        view = memoryview(self.data)
+        chunks = [view[offset:offset + size] for offset, _, size in entries]
+        try:
+            return decode_patterns(chunks, [rows for _, rows, _ in entries], self.header["num_channels"])
+        except ValueError as e:
+            error = str(e)  # not the exception: its traceback would keep views of the map alive
+        finally:
+            del view, chunks  # release the views so the map can be closed
+        raise ValueError(f"{self.filename} has malformed patterns: {error}")
+
+    def iter_patterns(self, song_order=False):
+        """Yield (pattern index, pattern) for every pattern, or in play order with ``song_order``."""
+        for index in (self.order if song_order else range(len(self.pattern_index))):
+            yield index, self.pattern(index)
+
+    def sample_deltas(self, instrument, sample):
+        """One sample's stored deltas as an int8 or int16 array viewing the mapped file."""
+        header = self.instruments[instrument]["samples"][sample]
+        dtype = SAMPLE_16BIT_DTYPE if header["type"] & SAMPLE_16BIT else SAMPLE_8BIT_DTYPE
+        count = header["length"] // dtype.itemsize
+        return np.frombuffer(self.data, dtype=dtype, count=count, offset=self.sample_index[instrument][sample])
+
+    def sample(self, instrument, sample):
+        """Decode one sample to int8 or int16 PCM.
+
+        XM stores each sample point as the difference from the previous one;
+        an integer cumsum in the sample's own width wraps around exactly as
+        the tracker's running sum does.
+        """
+        deltas = self.sample_deltas(instrument, sample)
+        return np.cumsum(deltas, dtype=deltas.dtype)
+
+    def iter_samples(self):
+        """Yield (instrument, sample, header, int8/int16 PCM) for every sample in the module."""
+        for i, instrument in enumerate(self.instruments):
+            for j, header in enumerate(instrument["samples"]):
+                yield i, j, header, self.sample(i, j)
+
+    def close(self):
+        """Unmap the file; views from sample_deltas must be released first."""
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
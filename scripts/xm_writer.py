@@ -0,0 +1,217 @@
+"""Write XM modules from NumPy pattern arrays and PCM samples.
+
+Patterns are xm_patterns.PATTERN_DTYPE arrays shaped (rows, channels). Each
+cell is packed with XM's bitmask scheme: a mask byte followed by its
+non-zero fields, or the five raw bytes when every field is set (one byte
+shorter). Cell sizes come from a vectorized emptiness mask, so the whole
+module is sized up front and written into one preallocated bytearray.
+
+Samples are int8 or int16 PCM arrays and are stored delta coded.
+
+write_xm writes a module held in memory; XMWriter streams one pattern at a
+time and reuses repeated patterns.
+"""
+import math
+import struct
+
+import numpy as np
+
+from xm_patterns import PATTERN_DTYPE
+
+ID_TEXT = b"Extended Module: "
+TRACKER_NAME = "Cellbeat"
+XM_VERSION = 0x0104
+HEADER_SIZE = 276  # header fields from offset 60, including the 256-entry order table
+MAX_ORDERS = 256
+PATTERN_HEADER = struct.Struct("<IBHH")
+INSTRUMENT_HEADER_SIZE = 263  # with samples; an empty instrument stops after its sample count
+EMPTY_INSTRUMENT_SIZE = 29
+SAMPLE_HEADER = struct.Struct("<IIIBbBBbB22s")
+SAMPLE_16BIT = 0x10
+BASE_RATE = 8363  # Hz at which a sample plays for C-4 with no relative note or finetune
+
+
+def cell_layout(pattern):
+    """Cells as (n, 5) bytes, which fields each stores, and its packed length."""
+    cells = np.ascontiguousarray(pattern, dtype=PATTERN_DTYPE).reshape(-1).view(np.uint8).reshape(-1, 5)
+    present = cells != 0
+    full = present.all(axis=1)
+    lengths = np.where(full, 5, 1 + present.sum(axis=1))
+    return cells, present, full, lengths
+
+
+def packed_size(pattern):
+    return int(cell_layout(pattern)[3].sum())
+
+
+def pack_pattern(pattern, out, offset):
+    """Pack ``pattern`` into ``out`` (a bytearray) at ``offset``; return the bytes written."""
+    cells, present, full, lengths = cell_layout(pattern)
+    size = int(lengths.sum())
+    buf = np.frombuffer(out, dtype=np.uint8, count=size, offset=offset)
+    starts = np.cumsum(lengths) - lengths
+    packed = ~full
+    buf[starts[packed]] = 0x80 | (present[packed] << np.arange(5)).sum(axis=1)
+    # A packed field follows the mask byte and the fields stored before it; a
+    # full cell is written raw, field k at byte k.
+    at = np.where(full[:, None], np.arange(5), np.cumsum(present, axis=1))
+    keep = present | full[:, None]
+    buf[(starts[:, None] + at)[keep]] = cells[keep]
+    return size
+
+
+def delta_encode(pcm):
+    """XM stores each sample point as the (wrapping) difference from the previous one."""
+    deltas = pcm.copy()
+    deltas[1:] -= pcm[:-1]
+    return deltas
+
+
+def tuning(sample_rate):
+    """(relative_note, finetune) that make a sample recorded at ``sample_rate`` play in tune."""
+    relative_note, finetune = divmod(round(12 * 128 * math.log2(sample_rate / BASE_RATE)), 128)
+    return relative_note, finetune
+
+
+def _text(text, size):
+    return text.encode("ascii", errors="replace")[:size].ljust(size, b"\x00")
+
+
+def pack_header(out, order, num_patterns, num_instruments, module_name="", channels=1, tempo=6, bpm=125):
+    """Write the module header and order table into the first 60 + HEADER_SIZE bytes of ``out``."""
+    if len(order) > MAX_ORDERS:
+        raise ValueError(f"XM modules hold at most {MAX_ORDERS} orders, got {len(order)}")
+    out[0:17] = ID_TEXT
+    out[17:37] = _text(module_name, 20)
+    out[37] = 0x1A
+    out[38:58] = _text(TRACKER_NAME, 20)
+    struct.pack_into("<HIHHHHHHHH", out, 58, XM_VERSION, HEADER_SIZE, len(order), 0, channels,
+                     num_patterns, num_instruments, 1, tempo, bpm)  # flags: linear frequency table
+    out[80:80 + MAX_ORDERS] = bytes(order).ljust(MAX_ORDERS, b"\x00")
+
+
+def _samples(instruments):
+    return [[dict(sample, pcm=np.asarray(sample["pcm"])) for sample in instrument.get("samples", [])]
+            for instrument in instruments]
+
+
+def instruments_size(samples):
+    return sum((INSTRUMENT_HEADER_SIZE if instrument_samples else EMPTY_INSTRUMENT_SIZE)
+               + sum(SAMPLE_HEADER.size + sample["pcm"].nbytes for sample in instrument_samples)
+               for instrument_samples in samples)
+
+
+def pack_instruments(out, offset, instruments, samples):
+    """Write instrument and sample headers, then each instrument's delta-coded sample data."""
+    for instrument, instrument_samples in zip(instruments, samples):
+        size = INSTRUMENT_HEADER_SIZE if instrument_samples else EMPTY_INSTRUMENT_SIZE
+        struct.pack_into("<I22sBH", out, offset, size, _text(instrument.get("name", ""), 22), 0,
+                         len(instrument_samples))
+        if instrument_samples:
+            struct.pack_into("<I", out, offset + 29, SAMPLE_HEADER.size)
+            # keymap (every note -> sample 0), envelopes and vibrato stay zero
+        offset += size
+
+        for sample in instrument_samples:
+            pcm = sample["pcm"]
+            sample_type = (sample.get("type", 0) & ~SAMPLE_16BIT) | (SAMPLE_16BIT if pcm.dtype.itemsize == 2 else 0)
+            SAMPLE_HEADER.pack_into(
+                out, offset, pcm.nbytes, sample.get("loop_start", 0), sample.get("loop_length", 0),
+                sample.get("volume", 64), sample.get("finetune", 0), sample_type, sample.get("panning", 128),
+                sample.get("relative_note", 0), 0, _text(sample.get("name", ""), 22),
+            )
+            offset += SAMPLE_HEADER.size
+        for sample in instrument_samples:
+            pcm = sample["pcm"]
+            deltas = delta_encode(pcm.astype(pcm.dtype.newbyteorder("<")))
+            out[offset:offset + pcm.nbytes] = deltas.tobytes()
+            offset += pcm.nbytes
+    return offset
+
+
+def write_xm(filename, patterns, instruments=(), order=None, module_name="", channels=None, tempo=6, bpm=125):
+    """Write a module.
+
+    ``instruments`` is a list of {"name", "samples"} dicts; each sample is a
+    dict with "pcm" (int8 or int16) and optional "name", "loop_start",
+    "loop_length", "volume", "finetune", "type", "panning" and
+    "relative_note" (as in the xm_to_json export, so loop points are in
+    bytes). ``order`` defaults to every pattern once.
+    """
+    patterns = [np.asarray(pattern, dtype=PATTERN_DTYPE) for pattern in patterns]
+    channels = channels or (patterns[0].shape[1] if patterns else 1)
+    order = list(range(len(patterns))) if order is None else list(order)
+
+    sizes = [packed_size(pattern) for pattern in patterns]
+    samples = _samples(instruments)
+    total = 60 + HEADER_SIZE + sum(PATTERN_HEADER.size + size for size in sizes) + instruments_size(samples)
+    out = bytearray(total)
+    pack_header(out, order, len(patterns), len(samples), module_name, channels, tempo, bpm)
+    offset = 60 + HEADER_SIZE
+
+    for pattern, size in zip(patterns, sizes):
+        PATTERN_HEADER.pack_into(out, offset, PATTERN_HEADER.size, 0, len(pattern), size)
+        offset += PATTERN_HEADER.size
+        offset += pack_pattern(pattern, out, offset)
+    pack_instruments(out, offset, instruments, samples)
+
+    with open(filename, "wb") as f:
+        f.write(out)
+    return total
+
+
+class XMWriter:
+    """Stream a module to disk one pattern at a time.
+
+    Each ``append``ed pattern becomes the next order entry; a pattern equal
+    to one already written is only referenced again, so long, repetitive
+    songs fit the 256 orders with far fewer patterns. The header is written
+    last, by ``close``, once the counts are known.
+    """
+
+    def __init__(self, filename, channels, module_name="", tempo=6, bpm=125):
+        self.channels = channels
+        self.module_name = module_name
+        self.tempo = tempo
+        self.bpm = bpm
+        self.order = []
+        self.patterns = {}  # packed bytes -> pattern index
+        self.file = open(filename, "wb")
+        self.file.write(bytes(60 + HEADER_SIZE))
+
+    def append(self, pattern):
+        """Add ``pattern`` ((rows, channels) PATTERN_DTYPE) to the song; return its pattern index."""
+        if len(self.order) == MAX_ORDERS:
+            raise ValueError(f"XM modules hold at most {MAX_ORDERS} orders")
+        packed = bytearray(packed_size(pattern))
+        pack_pattern(pattern, packed, 0)
+        key = (len(pattern), bytes(packed))
+        index = self.patterns.get(key)
+        if index is None:
+            index = self.patterns[key] = len(self.patterns)
+            self.file.write(PATTERN_HEADER.pack(PATTERN_HEADER.size, 0, len(pattern), len(packed)))
+            self.file.write(packed)
+        self.order.append(index)
+        return index
+
+    def close(self, instruments=()):
+        """Write ``instruments`` (as for write_xm) after the patterns, then the header."""
+        if self.file is None:
+            return
+        samples = _samples(instruments)
+        out = bytearray(instruments_size(samples))
+        pack_instruments(out, 0, instruments, samples)
+        self.file.write(out)
+        header = bytearray(60 + HEADER_SIZE)
+        pack_header(header, self.order, len(self.patterns), len(samples), self.module_name, self.channels,
+                    self.tempo, self.bpm)
+        self.file.seek(0)
+        self.file.write(header)
+        self.file.close()
+        self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,163 @@
+"""Compact binary sessions (.cbs) next to the JSON interchange format.
+
+Layout, all little-endian:
+
+    magic (8 bytes) | version (u32) | metadata length (u32) | metadata JSON
+    padding to DATA_ALIGN | sections, each starting on a DATA_ALIGN boundary
+
+The metadata holds labels, BPMs, shapes, audio events and, for every grid, the
+(offset, count) of its sections relative to the start of the data:
+
+    static, dynamic  raw int64 (rows, cols) arrays
+    robots           ROBOT_DTYPE rows, one per robot
+    cells            world.CELL_DTYPE rows, only for cells with an agent or static tile
+
+The file is mapped copy-on-write, so grids load as array views without
+parsing and edits never reach the disk.
+
+    python session_format.py session.json session.cbs   # convert either way
+"""
+import json
+import mmap
+import struct
+import sys
+
+import numpy as np
+
+from world import CELL_DTYPE, GridModel
+
+SESSION_EXT = '.cbs'
+MAGIC = b'CBSESS\x00\x01'
+VERSION = 1
+HEADER = struct.Struct('<8sII')
+DATA_ALIGN = 64
+
+GRID_DTYPE = np.dtype('<i8')
+ROBOT_DTYPE = np.dtype([
+    ('row', '<i4'), ('col', '<i4'), ('dr', '<i4'), ('dc', '<i4'), ('speed', '<i4'), ('counter', '<i4')
+])
+
+
+def _align(n):
+    return -(-n // DATA_ALIGN) * DATA_ALIGN
+
+
+def robot_table(grid):
+    state = grid.robot_agent.state
+    table = np.zeros(len(state), dtype=ROBOT_DTYPE)
+    if len(state):
+        table['row'], table['col'] = state.positions.T
+        table['dr'], table['dc'] = state.directions.T
+        table['speed'] = state.speeds
+        table['counter'] = state.counters
+    return table
+
+
+def cell_table(grid):
+    """Attributes of the cells that hold an agent or tile; empty cells are left out."""
+    return grid.cell_attributes.sparse(grid.static_grid).astype(CELL_DTYPE)
+
+
+def save_session(filename, grids, audio_events=()):
+    """Write ``grids`` (GridModels) and the recorder's audio events as a .cbs file."""
+    sections, meta_grids, offset = [], [], 0
+    for grid in grids:
+        entry = {
+            'emoji_label': grid.emoji_label,
+            'bpm': grid.bpm,
+            'shape': list(grid.static_grid.shape),
+        }
+        for name, data in (
+            ('static', np.ascontiguousarray(grid.static_grid, dtype=GRID_DTYPE)),
+            ('dynamic', np.ascontiguousarray(grid.dynamic_grid, dtype=GRID_DTYPE)),
+            ('robots', robot_table(grid)),
+            ('cells', cell_table(grid)),
+        ):
+            entry[name] = [offset, data.size]
+            sections.append((offset, data))
+            offset = _align(offset + data.nbytes)
+        meta_grids.append(entry)
+
+    meta = json.dumps({'grids': meta_grids, 'audio_events': list(audio_events)}).encode('utf-8')
+    data_start = _align(HEADER.size + len(meta))
+    with open(filename, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(meta)))
+        f.write(meta)
+        for section_offset, data in sections:
+            f.write(b'\x00' * (data_start + section_offset - f.tell()))
+            f.write(data.tobytes())
+
+
+def is_binary(filename):
+    with open(filename, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def read_binary(filename):
+    """Map a .cbs file and return it in the shape of a JSON session.
+
+    ``static_grid``/``dynamic_grid`` are int64 views of the mapping and the
+    robot and attribute dicts hold only the cells stored in the file, which
+    GridModel.from_state and Recorder.load_json fill out with defaults.
+    """
+    with open(filename, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    magic, version, meta_len = HEADER.unpack_from(buf)
+    if magic != MAGIC:
+        raise ValueError(f"{filename} is not a Cellbeat session")
+    if version > VERSION:
+        raise ValueError(f"{filename} has session version {version}, newer than {VERSION}")
+    meta = json.loads(bytes(buf[HEADER.size:HEADER.size + meta_len]))
+    data_start = _align(HEADER.size + meta_len)
+
+    def section(entry, name, dtype):
+        offset, count = entry[name]
+        return np.frombuffer(buf, dtype=dtype, count=count, offset=data_start + offset)
+
+    grids = []
+    for entry in meta['grids']:
+        shape = tuple(entry['shape'])
+        robots = section(entry, 'robots', ROBOT_DTYPE)
+        cells = section(entry, 'cells', CELL_DTYPE)
+        robot_keys = [f"{r}_{c}" for r, c in zip(robots['row'].tolist(), robots['col'].tolist())]
+        grids.append({
+            'emoji_label': entry['emoji_label'],
+            'bpm': entry['bpm'],
+            'static_grid': section(entry, 'static', GRID_DTYPE).reshape(shape),
+            'dynamic_grid': section(entry, 'dynamic', GRID_DTYPE).reshape(shape),
+            'directions': dict(zip(robot_keys, zip(robots['dr'].tolist(), robots['dc'].tolist()))),
+            'speeds': dict(zip(robot_keys, robots['speed'].tolist())),
+            'counters': dict(zip(robot_keys, robots['counter'].tolist())),
+            'cell_attributes': {
+                f"{r}_{c}": {'agent_type': t, 'pitch': p, 'duration': d, 'velocity': v}
+                for r, c, t, v, p, d in cells.tolist()
+            },
+        })
+    return {'grids': grids, 'audio_events': meta.get('audio_events', [])}
+
+
+def read_session(filename):
+    """Load a session file of either format as a dict with a ``grids`` list."""
+    if is_binary(filename):
+        return read_binary(filename)
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    source, target = (argv or sys.argv[1:])[:2]
+    data = read_session(source)
+    if target.endswith(SESSION_EXT):
+        grids = [GridModel.from_state(grid_data) for grid_data in data.get('grids', [])]
+        save_session(target, grids, data.get('audio_events', []))
+    else:
+        for grid_data in data.get('grids', []):
+            grid_data['static_grid'] = np.asarray(grid_data['static_grid']).tolist()
+            grid_data['dynamic_grid'] = np.asarray(grid_data['dynamic_grid']).tolist()
+            grid_data['directions'] = {k: list(v) for k, v in grid_data['directions'].items()}
+        with open(target, 'w') as f:
+            json.dump(data, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
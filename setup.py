@@ -1,8 +1,16 @@
+import sys
+
 from setuptools import setup, Extension
 
+if sys.platform == 'darwin':
+    link_args = ['-framework', 'AudioToolbox', '-lpthread']
+else:
+    # No sound card backend here; CELLBEAT_AUDIO_BACKEND picks null, file or ring.
+    link_args = ['-lpthread', '-lm']
+
 module = Extension('audio',
                    sources=['audio.c'],
-                   extra_link_args=['-framework', 'AudioToolbox', '-lpthread'],
+                   extra_link_args=link_args,
                    )
 
 setup(name='audio',
@@ -0,0 +1,103 @@
+"""Offline NumPy renderer for the bell synth in audio.c.
+
+Uses the same ADSR envelope, harmonic summing and soft clip as the live
+synth, but places every note at its exact sample and needs no audio device.
+"""
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 44100
+MAX_VOLUME = 32767
+MAX_POLYPHONY = 16
+
+ATTACK_TIME = 0.001
+DECAY_TIME = 0.04
+SUSTAIN_LEVEL = 0.2
+RELEASE_TIME = 0.2
+CLIP_THRESHOLD = 0.95
+
+
+def adsr_envelope(t, duration):
+    """Envelope level at times ``t`` (seconds) for a note lasting ``duration``."""
+    return np.select(
+        [
+            t < ATTACK_TIME,
+            t < ATTACK_TIME + DECAY_TIME,
+            t < duration - RELEASE_TIME,
+            t < duration,
+        ],
+        [
+            t / ATTACK_TIME,
+            1.0 - (1.0 - SUSTAIN_LEVEL) * ((t - ATTACK_TIME) / DECAY_TIME),
+            SUSTAIN_LEVEL,
+            SUSTAIN_LEVEL * (1.0 - (t - (duration - RELEASE_TIME)) / RELEASE_TIME),
+        ],
+        0.0,
+    )
+
+
+def soft_clip(x):
+    over = (x - CLIP_THRESHOLD) / (1.0 - CLIP_THRESHOLD)
+    under = (x + CLIP_THRESHOLD) / (1.0 - CLIP_THRESHOLD)
+    return np.where(
+        x > CLIP_THRESHOLD, CLIP_THRESHOLD + (x - CLIP_THRESHOLD) / (1.0 + over ** 2),
+        np.where(x < -CLIP_THRESHOLD, -CLIP_THRESHOLD + (x + CLIP_THRESHOLD) / (1.0 + under ** 2), x)
+    )
+
+
+def render_voice(pitch, duration, velocity, harmonics=(1.0,), sample_rate=SAMPLE_RATE):
+    """Render one note as float samples in [-1, 1] before mixing."""
+    n = int(np.ceil(duration * sample_rate))
+    t = np.arange(n) / sample_rate
+    phase = 2.0 * np.pi * pitch * t
+    velocity_scale = min(max(velocity / 127.0, 0.0), 1.0)
+    val = np.zeros(n)
+    for h, weight in enumerate(harmonics):
+        val += weight * velocity_scale * np.sin((h + 1) * phase)
+    return val * adsr_envelope(t, duration)
+
+
+def render_events(events, sample_rate=SAMPLE_RATE, tail=RELEASE_TIME, steal=True):
+    """Mix (time, pitch, duration, velocity[, harmonics]) events into int16 PCM.
+
+    Like the live synth, at most MAX_POLYPHONY notes sound at once. A note
+    that finds every voice busy cuts off the oldest one, or with
+    ``steal=False`` is dropped.
+    """
+    events = sorted(events, key=lambda e: e[0])
+    if not events:
+        return np.zeros(0, dtype=np.int16)
+
+    end = max(e[0] + e[2] for e in events) + tail
+    mix = np.zeros(int(np.ceil(end * sample_rate)) + 1)
+    voice_free_at = np.zeros(MAX_POLYPHONY, dtype=np.int64)
+    playing = [None] * MAX_POLYPHONY  # (start sample, rendered samples) per voice
+
+    for event in events:
+        time, pitch, duration, velocity = event[:4]
+        harmonics = event[4] if len(event) > 4 else (1.0,)
+        start = int(round(time * sample_rate))
+        free = np.flatnonzero(voice_free_at <= start)
+        if len(free):
+            slot = free[0]
+        elif steal:
+            slot = min(range(MAX_POLYPHONY), key=lambda v: playing[v][0])
+            old_start, old = playing[slot]
+            mix[start:old_start + len(old)] -= old[start - old_start:len(mix) - old_start]
+        else:
+            continue
+        voice = render_voice(pitch, duration, velocity, harmonics, sample_rate)
+        voice_free_at[slot] = start + len(voice)
+        playing[slot] = (start, voice)
+        mix[start:start + len(voice)] += voice[:len(mix) - start]
+
+    return (soft_clip(mix / MAX_POLYPHONY) * MAX_VOLUME).astype(np.int16)
+
+
+def write_wav(filename, samples, sample_rate=SAMPLE_RATE):
+    with wave.open(filename, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(np.asarray(samples, dtype='<i2').tobytes())
@@ -0,0 +1,7 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "scripts")]
+# Never open a sound device from the tests.
+os.environ.setdefault("CELLBEAT_AUDIO_BACKEND", "null")
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+import agents
+from agents import DIRECTIONS, ROBOT, RobotAgent, RobotState, step_robots
+
+STATIC_TYPES = [agents.EMPTY] * 6 + [
+    agents.VERTICAL_REFLECT, agents.HORIZONTAL_REFLECT, agents.CLOCKWISE_ROTATOR,
+    agents.COUNTERCLOCKWISE_ROTATOR, agents.BELL_0,
+]
+
+
+def step_loop(static_grid, dynamic_grid, directions, speeds, counters):
+    """The per-robot dict loop that step_robots replaced, kept as the reference."""
+    rows, cols = dynamic_grid.shape
+    new_dynamic = np.zeros_like(dynamic_grid)
+    new_dirs, new_speeds, new_counters, tones = {}, {}, {}, []
+    for r, c in np.argwhere(dynamic_grid == ROBOT).tolist():
+        speed = speeds.get((r, c), 1)
+        counter = counters.get((r, c), 0)
+        if counter < speed - 1:
+            new_dynamic[r, c] = ROBOT
+            new_dirs[(r, c)] = directions.get((r, c), DIRECTIONS["RIGHT"])
+            new_speeds[(r, c)] = speed
+            new_counters[(r, c)] = counter + 1
+            continue
+
+        new_counters[(r, c)] = 0
+        dr, dc = directions.get((r, c), DIRECTIONS["RIGHT"])
+        cell = static_grid[(r + dr) % rows, (c + dc) % cols]
+        if cell == agents.VERTICAL_REFLECT:
+            dr, dc = dr, -dc
+        elif cell == agents.HORIZONTAL_REFLECT:
+            dr, dc = -dr, dc
+        elif cell == agents.CLOCKWISE_ROTATOR:
+            dr, dc = -dc, dr
+        elif cell == agents.COUNTERCLOCKWISE_ROTATOR:
+            dr, dc = dc, -dr
+        final = ((r + dr) % rows, (c + dc) % cols)
+        new_dynamic[final] = ROBOT
+        new_dirs[final] = (dr, dc)
+        new_speeds[final] = speed
+        new_counters[final] = 0
+        if static_grid[final]:
+            tones.append(final)
+    return new_dynamic, new_dirs, new_speeds, new_counters, tones
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_step_robots_matches_the_per_robot_loop(seed):
+    rng = np.random.default_rng(seed)
+    rows, cols = rng.integers(2, 12, size=2)
+    static = rng.choice(STATIC_TYPES, size=(rows, cols))
+    # Dense enough that robots regularly collide.
+    dynamic = np.where(rng.random((rows, cols)) < 0.35, ROBOT, 0)
+    cells = [tuple(p) for p in np.argwhere(dynamic == ROBOT).tolist()]
+    headings = list(DIRECTIONS.values())
+    directions = {p: headings[rng.integers(4)] for p in cells}
+    speeds = {p: int(rng.integers(1, 4)) for p in cells}
+    counters = {p: int(rng.integers(0, 3)) for p in cells}
+    state = RobotState.from_dicts(directions, speeds, counters)
+
+    for _ in range(30):
+        expected = step_loop(static, dynamic, directions, speeds, counters)
+        new_dynamic, state, landed, _ = step_robots(static, dynamic, state)
+        dynamic, directions, speeds, counters, tones = expected
+
+        assert np.array_equal(new_dynamic, dynamic)
+        robots = [tuple(p) for p in np.argwhere(dynamic == ROBOT).tolist()]
+        assert [tuple(p) for p in state.positions.tolist()] == robots
+        got_dirs, got_speeds, got_counters = state.to_dicts()
+        assert got_dirs == {p: directions[p] for p in robots}
+        assert got_speeds == {p: speeds[p] for p in robots}
+        assert got_counters == {p: counters[p] for p in robots}
+        assert [tuple(p) for p in landed.tolist()] == tones
+
+
+def test_setters_replace_rather_than_merge():
+    robot = RobotAgent()
+    robot.set_state({(0, 0): (0, 1), (1, 1): (1, 0)}, {(0, 0): 2, (1, 1): 1}, {(0, 0): 1, (1, 1): 0})
+    robot.directions = {(2, 3): (-1, 0)}
+    assert list(robot.directions) == [(2, 3)]
+    assert robot.speeds == {(2, 3): 1}
+
+    robot.set_state({(4, 4): (0, -1)}, {(4, 4): 3}, {(4, 4): 2})
+    assert robot.state.positions.tolist() == [[4, 4]]
+    assert robot.speeds == {(4, 4): 3} and robot.counters == {(4, 4): 2}
+
+
+def test_changed_cells_are_enough_to_redraw_the_board():
+    rng = np.random.default_rng(3)
+    static = rng.choice(STATIC_TYPES, size=(3, 10, 10))  # a GridGroup stack of three boards
+    dynamic = np.where(rng.random(static.shape) < 0.2, ROBOT, 0)
+    state = RobotState.empty(ndim=3)  # every robot heads right at speed 1
+    drawn = dynamic.copy()
+    for _ in range(30):
+        robots = np.count_nonzero(dynamic == ROBOT)
+        dynamic, state, _, changed = step_robots(static, dynamic, state)
+        assert len(changed) <= 2 * robots  # a moving robot leaves one cell and enters another
+        drawn[tuple(changed.T)] = dynamic[tuple(changed.T)]
+        assert np.array_equal(drawn, dynamic)
@@ -0,0 +1,268 @@
+import os
+import subprocess
+import sys
+import textwrap
+import time
+import wave
+
+import numpy as np
+import pytest
+
+import agents
+
+audio = pytest.importorskip("audio")
+
+RING_FRAMES = 8 * 1024
+
+CHORD = [(0.0, 220.0, 0.4, 100, [1.0, 0.5, 0.25]), (0.05, 330.0, 0.3, 90, [1.0, 0.3]), (0.1, 523.25, 0.2, 80)]
+
+
+def render(oscillator, mixer="float"):
+    audio.set_oscillator(oscillator)
+    audio.set_mixer(mixer)
+    try:
+        return np.frombuffer(audio.render(CHORD), dtype=np.int16).astype(float)
+    finally:
+        audio.set_oscillator("wavetable")
+        audio.set_mixer("float")
+
+
+@pytest.mark.parametrize("mixer", ["float", "legacy"])
+def test_wavetable_oscillator_matches_sin(mixer):
+    table, exact = render("wavetable", mixer), render("sine", mixer)
+    assert len(table) == len(exact) and np.abs(exact).max() > 1000
+    assert np.abs(table - exact).max() <= 4  # a few LSB of interpolation error
+
+
+def run_with_backend(backend, script, **env):
+    """Run ``script`` in a fresh interpreter whose audio extension starts ``backend``."""
+    env = dict(os.environ, CELLBEAT_AUDIO_BACKEND=backend, PYTHONPATH=os.pathsep.join(sys.path), **env)
+    subprocess.run([sys.executable, "-c", textwrap.dedent(script)], env=env, check=True, timeout=60)
+
+
+def pcm(events):
+    return np.frombuffer(audio.render(events), dtype=np.int16).astype(int)
+
+
+def test_render_starts_each_note_on_its_sample(tmp_path):
+    note = (0.0, 440.0, 0.2, 100)
+    alone = pcm([note])
+    assert len(alone) == round(0.2 * 44100) and np.abs(alone).max() > 1000
+    assert np.array_equal(pcm([note]), alone)  # offline phases start at 0, so renders repeat
+
+    for frame in (1, 100, 12345):
+        late = pcm([(frame / 44100, 440.0, 0.2, 100)])
+        assert len(late) == frame + len(alone)
+        assert not late[:frame + 1].any()  # silent up to the note's first (zero-envelope) sample
+        assert np.abs(late[frame:] - alone).max() <= 1
+
+    assert audio.render([note], str(tmp_path / "note.wav")) == len(alone)
+    with wave.open(str(tmp_path / "note.wav")) as wav:
+        assert (wav.getframerate(), wav.getsampwidth(), wav.getnchannels()) == (44100, 2, 1)
+        assert np.array_equal(np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16), alone)
+
+
+def test_null_backend_keeps_the_clock_running():
+    assert audio.backend() == "null"
+    before = audio.sample_time()
+    time.sleep(0.1)
+    assert audio.sample_time() > before
+
+
+def test_file_backend_writes_a_readable_wav(tmp_path):
+    out = tmp_path / "out.wav"
+    run_with_backend("file", "import time, audio; time.sleep(0.3)", CELLBEAT_AUDIO_FILE=str(out))
+    with wave.open(str(out)) as wav:
+        frames = wav.getnframes()
+        assert (wav.getframerate(), wav.getsampwidth(), wav.getnchannels()) == (44100, 2, 1)
+        assert frames >= 0.2 * 44100  # the header is patched at exit
+    assert os.path.getsize(out) == 44 + 2 * frames
+
+
+def test_ring_backend_renders_ahead_and_is_pulled(tmp_path):
+    run_with_backend("ring", f"""
+        import time, audio
+        assert audio.backend() == "ring"
+        while audio.stats()["buffered_frames"] < {RING_FRAMES}:
+            time.sleep(0.001)
+        assert audio.sample_time() == {RING_FRAMES}  # then it waits for room
+        assert audio.pull(1024) == bytes(2048)
+        while audio.sample_time() < {RING_FRAMES} + 1024:
+            time.sleep(0.001)
+        assert audio.stats()["underruns"] == 0
+    """)
+
+
+def test_note_queue_takes_concurrent_producers_and_drops_when_full():
+    run_with_backend("ring", f"""
+        import threading, time, audio
+        while audio.stats()["buffered_frames"] < {RING_FRAMES}:
+            time.sleep(0.001)
+        # The ring is full, so the audio thread is parked and nothing drains the queue.
+        later = audio.sample_time() + 10 * 44100
+        queued = []
+
+        def produce(base):
+            queued.extend(audio.schedule_tone(later, base + i, 0.1, 100, [1.0]) for i in range(64))
+
+        threads = [threading.Thread(target=produce, args=(100.0 * t,)) for t in range(1, 5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert queued == [True] * 256
+        assert audio.schedule_tone(later, 440.0, 0.1, 100, [1.0]) is False
+        assert audio.stats()["dropped_notes"] == 1
+
+        audio.pull(1024)  # room for one block, which moves every queued note into the schedule
+        deadline = time.monotonic() + 5
+        while audio.stats()["scheduled_notes"] < 256 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        assert audio.stats()["scheduled_notes"] == 256
+    """)
+
+
+def test_scheduled_note_starts_on_its_sample(tmp_path):
+    out = tmp_path / "stream.raw"
+    run_with_backend("ring", f"""
+        import time, audio
+
+        def pull_blocks(frames):
+            pulled = b""
+            while len(pulled) < 2 * frames:
+                if audio.stats()["buffered_frames"] >= 1024:
+                    pulled += audio.pull(1024)
+                else:
+                    time.sleep(0.001)
+            return pulled
+
+        while audio.stats()["buffered_frames"] < {RING_FRAMES}:
+            time.sleep(0.001)
+        start = audio.sample_time() + 1500  # mid-block, in the second block still to render
+        assert audio.schedule_tone(start, 440.0, 0.1, 100, [1.0])
+        stream = pull_blocks(start + 2048)  # the stream starts at frame 0
+        open({str(out)!r}, "wb").write(stream)
+
+        assert audio.stats()["late_notes"] == 0
+        assert audio.schedule_tone(10, 440.0, 0.1, 100, [1.0])  # long past: starts at once
+        pull_blocks(2048)
+        deadline = time.monotonic() + 5
+        while audio.stats()["late_notes"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        assert audio.stats()["late_notes"] == 1
+    """)
+    samples = np.fromfile(out, dtype=np.int16)
+    start = RING_FRAMES + 1500
+    assert not samples[:start + 1].any()  # silent through the note's zero-envelope first sample
+    assert samples[start + 1:start + 64].any()
+
+
+def test_play_tones_queues_a_batch_of_rows():
+    chord = audio.register_harmonics([1.0, 0.5, 0.25])
+    assert audio.register_harmonics([1.0, 0.5, 0.25]) == chord
+    assert audio.register_harmonics([1.0]) == 0
+
+    rows = np.zeros(3, dtype=agents.TONE_DTYPE)
+    rows["pitch"], rows["duration"], rows["velocity"] = [220.0, 330.0, 440.0], 0.05, 100
+    rows["harmonics"] = [0, chord, chord]
+    dropped = audio.stats()["dropped_notes"]
+    assert audio.play_tones(rows, audio.sample_time() + 4410) == 3
+    assert audio.play_tones(rows[:0]) == 0
+
+    rows["harmonics"][2] = 255  # never registered
+    with pytest.raises(ValueError):
+        audio.play_tones(rows)
+    with pytest.raises(ValueError):
+        audio.play_tones(np.zeros(3, dtype=[("pitch", "<f8")]))  # wrong row size
+    assert audio.stats()["dropped_notes"] == dropped
+
+
+@pytest.fixture
+def voices():
+    """Set the pool size and stealing policy for renders, restoring the defaults afterwards."""
+    def configure(count, policy):
+        audio.set_polyphony(count)
+        audio.set_voice_stealing(policy)
+
+    yield configure
+    configure(16, "oldest")
+
+
+def close(a, b):
+    return len(a) == len(b) and np.abs(a - b).max() <= 1
+
+
+def test_full_pool_drops_or_steals_by_policy(voices):
+    a, b, c = (0.0, 220.0, 0.2, 100), (0.01, 330.0, 0.2, 100), (0.02, 440.0, 0.2, 100)
+    ab = pcm([a, b])
+
+    voices(2, "none")  # the third note is dropped
+    out = pcm([a, b, c])
+    assert close(out[:len(ab)], ab) and not out[len(ab):].any()
+
+    voices(1, "oldest")  # each note cuts the one before
+    out = pcm([a, b])
+    cut = round(b[0] * 44100)
+    assert close(out[:cut], pcm([a])[:cut])
+    assert close(out[cut:], pcm([(0.0,) + b[1:]]))
+
+    voices(4, "retrigger")  # a note restarts the voice already playing its pitch
+    again = (0.05, 220.0, 0.2, 100)
+    cut = round(again[0] * 44100)
+    out = pcm([a, b, again])
+    assert close(out[cut:], pcm([b, again])[cut:])
+    assert audio.stats()["voices"] == 4
+
+
+def soft_clip(x):
+    """master_clip in audio.c: linear up to 0.95, then a soft knee towards 1."""
+    magnitude = np.abs(x)
+    over = np.maximum(magnitude - 0.95, 0.0)
+    return np.sign(x) * (np.minimum(magnitude, 0.95) + over / (1.0 + (over / 0.05) ** 2))
+
+
+def test_float_mixer_sums_voices_then_clips_once():
+    notes = [(0.0, 440.0 + k, 0.1, 127) for k in range(16)]  # nearly in phase, so the sum clips
+    total = sum(pcm([note]) for note in notes)
+    assert np.abs(total).max() > 0.95 * 32767
+    expected = np.trunc(soft_clip(total / 32767) * 32767)
+    assert np.abs(pcm(notes) - expected).max() <= len(notes)  # each voice alone was truncated once
+
+
+def test_recording_matches_the_stream_across_rotated_files(tmp_path):
+    out, path = tmp_path / "stream.raw", tmp_path / "take.wav"
+    run_with_backend("ring", f"""
+        import time, audio
+
+        def pull_blocks(frames):
+            pulled = b""
+            while len(pulled) < 2 * frames:
+                if audio.stats()["buffered_frames"] >= 1024:
+                    pulled += audio.pull(1024)
+                else:
+                    time.sleep(0.001)
+            return pulled
+
+        while audio.stats()["buffered_frames"] < {RING_FRAMES}:
+            time.sleep(0.001)
+        audio.start_recording({str(path)!r}, rotate_seconds=0.05)  # a new file every 2205 frames
+        first = audio.sample_time()  # parked, so recording starts with the next block
+        assert first == {RING_FRAMES}
+        assert audio.schedule_tone(first + 100, 440.0, 0.2, 100, [1.0])
+        stream = pull_blocks({RING_FRAMES} + 6000)
+        audio.stop_recording()
+        stream += pull_blocks({RING_FRAMES})  # whatever was rendered while recording
+        open({str(out)!r}, "wb").write(stream)
+    """)
+    stream = np.fromfile(out, dtype=np.int16)
+    files = sorted(tmp_path.glob("take*.wav"))
+    assert [f.name for f in files][:3] == ["take.wav", "take_001.wav", "take_002.wav"]
+    recorded = []
+    for f in files:
+        with wave.open(str(f)) as wav:
+            assert (wav.getframerate(), wav.getsampwidth(), wav.getnchannels()) == (44100, 2, 1)
+            recorded.append(np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16))
+    assert [len(r) for r in recorded[:-1]] == [2205] * (len(recorded) - 1)
+    recorded = np.concatenate(recorded)
+    assert len(recorded) >= 6000 and recorded.any()
+    assert np.array_equal(recorded, stream[RING_FRAMES:RING_FRAMES + len(recorded)])
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+import event_log
+import headless
+from conftest import ROOT
+
+
+def log_session(filename, ticks=256, chunk_rows=64):
+    grids = headless.load_session(os.path.join(ROOT, "rivals.json"), checkpoints=False)
+    events = list(headless.iter_events(grids, ticks))
+    with event_log.EventLog(filename, grids, chunk_rows=chunk_rows) as log:
+        for e in events:
+            log.append(e.tick, grids[e.grid].bpm, (e.grid, e.row, e.col), (e.pitch, e.duration, e.velocity))
+    return events
+
+
+def test_round_trip_matches_the_simulated_notes(tmp_path):
+    events = log_session(str(tmp_path / "run.cbe"))
+    meta, logged = event_log.read_event_log(str(tmp_path / "run.cbe"))
+    assert len(logged) == len(events) > 64  # spans several chunks
+    notes = list(event_log.iter_notes(logged, meta["sample_rate"]))
+    assert [n[1:] for n in notes] == [e[1:] for e in events]
+    assert [n.time for n in notes] == pytest.approx([e.time for e in events], abs=1e-4)
+
+
+def test_truncated_log_reads_up_to_its_last_whole_chunk(tmp_path):
+    path = tmp_path / "run.cbe"
+    log_session(str(path))
+    data = path.read_bytes()
+    path.write_bytes(data[:-10])
+    _, logged = event_log.read_event_log(str(path))
+    assert len(logged) % 64 == 0 and len(logged) > 0
@@ -0,0 +1,73 @@
+import types
+
+import numpy as np
+import pytest
+
+import agents
+from world import GridModel
+
+pytest.importorskip("kivy")
+pytest.importorskip("audio")
+from game_engine import BoardGeometry, HoverTracker, TextureBoard  # noqa: E402  (needs Kivy and the audio extension)
+
+
+class Board(BoardGeometry):
+    """A board placed at (x, y) with the given size, without a window."""
+
+    def __init__(self, grid, x, y, width, height):
+        self.grid, self.x, self.y, self.width, self.height = grid, x, y, width, height
+        self.top = y + height
+
+    def collide_point(self, x, y):
+        return self.x <= x <= self.x + self.width and self.y <= y <= self.top
+
+    def set_hover(self, cell, hovered):
+        self.calls.append((cell, hovered))
+
+
+def test_cell_at_maps_window_positions_to_cells():
+    board = Board(GridModel(4, 8), x=100, y=50, width=400, height=200)  # 50-pixel squares
+    assert board.cell_at(100, 250) == (0, 0)  # top left
+    assert board.cell_at(175, 140) == (2, 1)
+    assert board.cell_at(500, 50) == (3, 7)  # the far edges stay on the board
+    assert board.cell_at(99, 100) is None
+    assert board.cell_at(300, 251) is None
+
+
+def test_hover_tracker_touches_only_the_cells_left_and_entered():
+    board = Board(GridModel(4, 8), x=0, y=0, width=400, height=200)
+    board.calls = []
+    tracker = HoverTracker.__new__(HoverTracker)  # without binding to the window
+    tracker.board, tracker.cell = board, None
+
+    # Enter (0, 0), move within it, cross to (0, 1) and stay, leave the board, come back at (3, 0).
+    for pos in [(10, 190), (20, 180), (60, 190), (60, 190), (500, 500), (10, 10)]:
+        tracker.on_mouse_pos(None, pos)
+    assert board.calls == [
+        ((0, 0), True),
+        ((0, 0), False), ((0, 1), True),
+        ((0, 1), False),
+        ((3, 0), True),
+    ]
+
+
+def test_texture_board_paints_the_atlas_tile_of_each_cell():
+    model = GridModel(3, 3)
+    model.set_agent_at(0, 1, agents.CLOCKWISE_ROTATOR, pitch=0, duration=0)
+    model.set_agent_at(2, 2, agents.BELL_0, pitch=1900.0, duration=0)
+    tile = 4
+    board = TextureBoard.__new__(TextureBoard)
+    board.grid = types.SimpleNamespace(model=model, rows=3, cols=3)
+    board.tile = tile
+    board.atlas = np.arange(9 * tile * tile * 4, dtype=np.uint8).reshape(9, tile, tile, 4)
+    board.agent_tiles = np.full(agents.UPSTAIRS + 1, 0)
+    board.agent_tiles[agents.CLOCKWISE_ROTATOR] = 3
+    board.bell_tiles = np.array([6, 7, 8])  # low, middle and high pitches
+    board.pixels = np.zeros((3 * tile, 3 * tile, 4), dtype=np.uint8)
+
+    for r in range(3):
+        for c in range(3):
+            board.draw_tile(r, c)
+    assert np.array_equal(board.pixels[0:tile, tile:2 * tile], board.atlas[3])
+    assert np.array_equal(board.pixels[2 * tile:, 2 * tile:], board.atlas[8])
+    assert np.array_equal(board.pixels[tile:2 * tile, 0:tile], board.atlas[0])
@@ -0,0 +1,32 @@
+import csv
+import os
+import subprocess
+import sys
+
+import headless
+from conftest import ROOT
+
+SESSION = os.path.join(ROOT, "friends.json")
+
+
+def test_cli_writes_the_events_without_kivy_or_audio(tmp_path):
+    out = tmp_path / "notes.csv"
+    script = (
+        "import sys, headless\n"
+        f"headless.main([{SESSION!r}, '--ticks', '300', '--events', {str(out)!r}])\n"
+        "assert not {'kivy', 'audio'} & set(sys.modules), sorted({'kivy', 'audio'} & set(sys.modules))\n"
+    )
+    subprocess.run([sys.executable, "-c", script], cwd=ROOT, check=True)
+
+    with open(out, newline="") as f:
+        rows = list(csv.reader(f))
+    expected = list(headless.iter_events(headless.load_session(SESSION), 300))
+    assert rows[0] == list(headless.NoteEvent._fields)
+    assert rows[1:] == [[str(value) for value in event] for event in expected]
+    assert expected and [e.time for e in expected] == sorted(e.time for e in expected)
+
+
+def test_start_skips_to_the_same_notes():
+    full = list(headless.iter_events(headless.load_session(SESSION), 200))
+    late = list(headless.iter_events(headless.load_session(SESSION), 80, start=120))
+    assert late == [event for event in full if event.tick >= 120]
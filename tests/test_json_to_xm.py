@@ -0,0 +1,29 @@
+import os
+
+import numpy as np
+
+from conftest import ROOT
+from json_to_xm import JSONToXM
+from xm_reader import XMReader
+from xm_to_json import XMParser
+
+MODULE = os.path.join(ROOT, "scripts", "dn-heavens.xm")
+
+
+def test_bell_export_stores_the_sample_once(tmp_path):
+    # dn-heavens' instruments are unreadable, so only its patterns are exported.
+    with XMParser(MODULE) as parser:
+        parser.read_xm_file()
+        parser.parse_header()
+        parser.parse_patterns()
+    parser.to_json(str(tmp_path / "song.json"))
+
+    JSONToXM(str(tmp_path / "song.json"), str(tmp_path / "song.xm")).convert()
+    size = os.path.getsize(tmp_path / "song.xm")
+    assert size < 100 * 1024, size  # 87 instruments once carried their own copy of the bell (~7.7 MB)
+
+    with XMReader(str(tmp_path / "song.xm")) as xm:
+        assert len(xm.instruments) == 1
+        for before, after in zip(parser.patterns, xm.all_patterns()):
+            assert np.array_equal(before["note"], after["note"])
+            assert np.array_equal(before["instr"] > 0, after["instr"] == 1)
@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+import pytest
+
+import event_log
+import headless
+from conftest import ROOT
+from world import GridWorld
+
+audio = pytest.importorskip("audio")
+from recorder import Recorder  # noqa: E402  (needs the audio extension)
+
+
+def test_tempo_change_mid_recording_keeps_note_times(tmp_path):
+    grids = headless.load_session(os.path.join(ROOT, "friends.json"))
+    recorder = Recorder(grids)
+    recorder.start_recording(str(tmp_path / "rec.json"))
+
+    expected, now = [], 0.0
+    for bpm in (120, 140, 120):
+        for _ in range(8):
+            now += headless.tick_seconds(bpm)
+            frame = round(now * recorder.sample_rate)
+            recorder.log_tick(bpm, [(grids[0], 1, 2)], [(440.0, 0.1, 100)], recorder.start_frame + frame)
+            expected.append(frame / recorder.sample_rate)
+    recorder.stop_recording()
+
+    meta, events = event_log.read_event_log(str(tmp_path / "rec.cbe"))
+    times = [note.time for note in event_log.iter_notes(events, meta["sample_rate"])]
+    assert times == pytest.approx(expected)
+
+
+def test_loading_a_session_starts_a_new_timeline():
+    grids = headless.load_session(os.path.join(ROOT, "friends.json"))
+    world = GridWorld(grids)
+    for _ in range(200):
+        world.step(grids[0].bpm)
+
+    recorder = Recorder(grids)
+    recorder.load(os.path.join(ROOT, "rivals.json"))
+    expected = headless.load_session(os.path.join(ROOT, "rivals.json"))
+    assert all(grid.tick == 0 and not grid.checkpoints for grid in grids)
+
+    world = GridWorld(grids)
+    world.step(grids[0].bpm)
+    world.seek(0)
+    for grid, other in zip(grids, expected):
+        assert np.array_equal(grid.dynamic_grid, other.dynamic_grid)
+
+
+def test_loading_a_session_replaces_the_robots():
+    grids = headless.load_session(os.path.join(ROOT, "friends.json"))
+    recorder = Recorder(grids)
+    recorder.load(os.path.join(ROOT, "rivals.json"))
+    for grid, other in zip(grids, headless.load_session(os.path.join(ROOT, "rivals.json"))):
+        assert grid.robot_agent.state.positions.tolist() == other.robot_agent.state.positions.tolist()
+        assert grid.robot_agent.directions == other.robot_agent.directions
@@ -0,0 +1,81 @@
+import os
+import tracemalloc
+
+import numpy as np
+
+import headless
+import session_export
+from conftest import ROOT
+from xm_reader import XMReader
+
+SESSION = os.path.join(ROOT, "friends.json")
+
+
+def peak_memory(export, ticks, filename):
+    grids = headless.load_session(SESSION, checkpoints=False)
+    tracemalloc.start()
+    try:
+        export(grids, ticks, filename)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_long_renders_run_in_fixed_memory(tmp_path):
+    for export, name in ((session_export.export_xm, "song.xm"), (session_export.export_midi, "song.mid")):
+        short = peak_memory(export, 512, tmp_path / name)
+        long = peak_memory(export, 4096, tmp_path / name)
+        assert long < short + 256 * 1024, (export.__name__, short, long)
+
+
+def midi_note_ons(path):
+    """(tick, channel, key, velocity) of every note-on in a format-0 file."""
+    data = open(path, "rb").read()
+    assert data[:4] == b"MThd" and data[14:18] == b"MTrk"
+    at, tick, notes = 22, 0, []
+    while at < len(data):
+        delta = 0
+        while True:
+            byte = data[at]
+            at += 1
+            delta = delta << 7 | byte & 0x7F
+            if not byte & 0x80:
+                break
+        tick += delta
+        status = data[at]
+        if status == 0xFF:
+            at += 3 + data[at + 2]
+        elif status & 0xF0 == 0xC0:
+            at += 2
+        else:
+            if status & 0xF0 == 0x90:
+                notes.append((tick, status & 0x0F, data[at + 1], data[at + 2]))
+            at += 3
+    return notes
+
+
+def test_midi_export_has_every_note_at_its_tick(tmp_path):
+    grids = headless.load_session(SESSION, checkpoints=False)
+    events = list(headless.iter_events(headless.load_session(SESSION), 256))
+    path = str(tmp_path / "song.mid")
+    assert session_export.export_midi(grids, 256, path) == len(events)
+
+    ticks_per_second = 480 * max(grid.bpm for grid in grids) / 60
+    expected = [(round(e.time * ticks_per_second), session_export.MIDI_CHANNELS[e.grid],
+                 session_export.key_for_pitch(e.pitch), round(e.velocity)) for e in events]
+    assert expected and midi_note_ons(path) == expected
+
+
+def test_xm_export_reads_back_with_a_note_per_event(tmp_path):
+    grids = headless.load_session(SESSION, checkpoints=False)
+    events = list(headless.iter_events(headless.load_session(SESSION), 256))
+    path = str(tmp_path / "song.xm")
+    written, dropped = session_export.export_xm(grids, 256, path)
+    assert written + dropped == len(events) and written
+
+    with XMReader(path) as xm:
+        assert xm.header["num_channels"] == len(grids)
+        patterns = [xm.pattern(index) for index in xm.order]
+        assert xm.instruments[0]["name"] == "bell"
+    notes = np.concatenate(patterns)["note"]
+    assert ((notes > 0) & (notes < session_export.KEY_OFF)).sum() == written
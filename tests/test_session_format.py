@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+import pytest
+
+import headless
+import session_format
+from conftest import ROOT
+from world import GridWorld
+
+SESSION = os.path.join(ROOT, "friends.json")
+
+
+def running_session(ticks):
+    grids = headless.load_session(SESSION)
+    world = GridWorld(grids)
+    for _ in range(ticks):
+        for bpm in world.bpms():
+            world.step(bpm)
+    return grids
+
+
+def test_binary_session_plays_on_like_the_saved_grids(tmp_path):
+    grids = running_session(50)
+    path = str(tmp_path / "session.cbs")
+    session_format.save_session(path, grids, [{"time": 0.5, "pitch": 440.0}])
+    assert session_format.is_binary(path) and not session_format.is_binary(SESSION)
+
+    data = session_format.read_session(path)
+    assert data["audio_events"] == [{"time": 0.5, "pitch": 440.0}]
+    loaded = headless.load_session(data)
+    for grid, other in zip(grids, loaded):
+        assert (other.emoji_label, other.bpm) == (grid.emoji_label, grid.bpm)
+        assert np.array_equal(other.static_grid, grid.static_grid)
+        assert np.array_equal(other.dynamic_grid, grid.dynamic_grid)
+        assert other.robot_agent.directions == grid.robot_agent.directions
+        # Empty cells are not stored and load with the defaults.
+        assert np.array_equal(other.cell_attributes.sparse(other.static_grid),
+                              grid.cell_attributes.sparse(grid.static_grid))
+    for grid in grids:
+        grid.running = True
+    assert list(headless.iter_events(loaded, 100)) == list(headless.iter_events(grids, 100))
+
+
+def test_edits_to_a_mapped_session_stay_in_memory(tmp_path):
+    path = str(tmp_path / "session.cbs")
+    session_format.save_session(path, headless.load_session(SESSION))
+    grid = headless.load_session(path)[0]
+    saved = grid.static_grid.copy()
+    grid.static_grid[...] = 0
+    assert np.array_equal(session_format.read_session(path)["grids"][0]["static_grid"], saved)
+
+
+def test_conversion_both_ways_keeps_the_session(tmp_path):
+    cbs, json_path = str(tmp_path / "session.cbs"), str(tmp_path / "session.json")
+    session_format.main([SESSION, cbs])
+    session_format.main([cbs, json_path])
+    expected = list(headless.iter_events(headless.load_session(SESSION), 100))
+    assert list(headless.iter_events(headless.load_session(cbs), 100)) == expected
+    assert list(headless.iter_events(headless.load_session(json_path), 100)) == expected
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / "other.cbs"
+    path.write_bytes(b"CBSESS\x00\x02" + bytes(64))
+    with pytest.raises(ValueError):
+        session_format.read_binary(str(path))
@@ -0,0 +1,152 @@
+import json
+import os
+
+import numpy as np
+
+import agents
+import headless
+from conftest import ROOT
+from world import CELL_DTYPE, CHECKPOINT_INTERVAL, DEFAULT_ATTRIBUTES, MAX_CHECKPOINTS, CellAttributes, GridModel, GridWorld
+
+SESSION = os.path.join(ROOT, "friends.json")
+STATIC_TYPES = [agents.EMPTY] * 6 + [
+    agents.VERTICAL_REFLECT, agents.HORIZONTAL_REFLECT, agents.CLOCKWISE_ROTATOR,
+    agents.COUNTERCLOCKWISE_ROTATOR, agents.BELL_0,
+]
+
+
+def run(grids, ticks):
+    world = GridWorld(grids)
+    for _ in range(ticks):
+        world.step(grids[0].bpm)
+    return world
+
+
+def random_grid(seed, bpm=120, shape=(12, 12)):
+    rng = np.random.default_rng(seed)
+    grid = GridModel(*shape, bpm=bpm)
+    grid.static_grid[...] = rng.choice(STATIC_TYPES, size=shape)
+    headings = list(agents.DIRECTIONS.values())
+    for r, c in np.argwhere(rng.random(shape) < 0.2).tolist():
+        grid.set_agent_at(r, c, agents.ROBOT, speed=int(rng.integers(1, 3)), direction=headings[rng.integers(4)])
+    grid.running = True
+    return grid
+
+
+def test_model_from_state_restores_a_saved_grid():
+    with open(SESSION) as f:
+        saved = json.load(f)["grids"]
+    for grid_data, grid in zip(saved, headless.load_session(SESSION)):
+        assert (grid.emoji_label, grid.bpm) == (grid_data["emoji_label"], grid_data["bpm"])
+        assert np.array_equal(grid.static_grid, grid_data["static_grid"])
+        assert np.array_equal(grid.dynamic_grid, grid_data["dynamic_grid"])
+        cell = lambda key: tuple(map(int, key.split("_")))  # noqa: E731
+        # Older saves kept counters of cells robots had left; those load with default headings.
+        directions, speeds, counters = grid.robot_agent.state.to_dicts()
+        assert all(directions[cell(k)] == tuple(v) for k, v in grid_data["directions"].items())
+        assert all(speeds[cell(k)] == v for k, v in grid_data["speeds"].items())
+        assert all(counters[cell(k)] == v for k, v in grid_data["counters"].items())
+        for key, attrs in grid_data["cell_attributes"].items():
+            assert grid.cell_attributes.tone(*cell(key)) == (attrs["pitch"], attrs["duration"], attrs["velocity"])
+
+
+def test_group_step_matches_stepping_each_grid_alone():
+    def make():
+        grids = [random_grid(0), random_grid(1), random_grid(2, shape=(8, 10)), random_grid(3), random_grid(4, bpm=90)]
+        grids[1].running = False
+        return grids
+
+    grids, alone = make(), make()
+    world = GridWorld(grids)
+    for _ in range(40):
+        hits, changed = world.step(120)
+        expected_hits = []
+        for i, (grid, other) in enumerate(zip(grids, alone)):
+            if other.running and other.bpm == 120:
+                previous = other.dynamic_grid
+                other.dynamic_grid, other.robot_agent.state, landed, _ = agents.step_robots(
+                    other.static_grid, other.dynamic_grid, other.robot_agent.state
+                )
+                expected_hits += [(i, r, c) for r, c in landed.tolist()]
+                assert sorted(map(tuple, changed[grid].tolist())) == sorted(
+                    map(tuple, np.argwhere(other.dynamic_grid != previous).tolist())
+                )
+            else:
+                assert grid not in changed
+            assert np.array_equal(grid.dynamic_grid, other.dynamic_grid)
+            assert grid.robot_agent.state.to_dicts() == other.robot_agent.state.to_dicts()
+        assert [(grids.index(grid), r, c) for grid, r, c in hits] == expected_hits
+
+
+def test_checkpoints_stay_bounded_and_seek_matches_a_straight_run():
+    grids = headless.load_session(SESSION)
+    world = run(grids, 80 * CHECKPOINT_INTERVAL)
+    assert all(len(grid.checkpoints) <= MAX_CHECKPOINTS for grid in grids)
+
+    for tick in (0, 17, 30 * CHECKPOINT_INTERVAL + 3, 79 * CHECKPOINT_INTERVAL):
+        world.seek(tick)
+        expected = headless.load_session(SESSION)
+        run(expected, tick)
+        for grid, other in zip(grids, expected):
+            assert grid.tick == other.tick == tick
+            assert np.array_equal(grid.dynamic_grid, other.dynamic_grid)
+
+
+def test_checkpoints_can_be_turned_off():
+    grids = headless.load_session(SESSION, checkpoints=False)
+    world = run(grids, 4 * CHECKPOINT_INTERVAL)
+    assert all(not grid.checkpoints for grid in grids)
+    world.seek(5 * CHECKPOINT_INTERVAL)  # forward seeks still step there
+    assert all(grid.tick == 5 * CHECKPOINT_INTERVAL for grid in grids)
+
+
+def test_seek_back_past_an_edit_restores_the_cell_attributes():
+    grids = headless.load_session(SESSION)
+    grid = grids[0]
+    world = run(grids, 2 * CHECKPOINT_INTERVAL)
+    r, c = np.argwhere(grid.static_grid == agents.EMPTY)[0]
+    before = grid.cell_attributes.tone(r, c)
+    grid.set_agent_at(r, c, agents.BELL_0, pitch=220.0, duration=0.25)
+    run(grids, CHECKPOINT_INTERVAL)
+
+    world.seek(CHECKPOINT_INTERVAL)
+    assert grid.static_grid[r, c] == agents.EMPTY
+    assert grid.cell_attributes.tone(r, c) == before
+
+
+def test_cell_attributes_table_keeps_the_dict_interface():
+    attrs = CellAttributes(3, 4)
+    assert attrs.table.tolist() == [[DEFAULT_ATTRIBUTES] * 4] * 3
+    attrs[(1, 2)]['pitch'] = 220.0  # record views write through
+    attrs[(1, 2)]['agent_type'] = agents.BELL_0
+    attrs.load({"2_3": {"pitch": 330.0, "duration": 0.25, "velocity": 90}, "0_0": {"velocity": 10}})
+    assert attrs.tone(1, 2) == (220.0, agents.DEFAULT_TONE['duration'], agents.DEFAULT_TONE['velocity'])
+    assert attrs.tones([(2, 3), (0, 0)]) == [(330.0, 0.25, 90), (agents.DEFAULT_TONE['pitch'],
+                                                                 agents.DEFAULT_TONE['duration'], 10)]
+
+    saved = attrs.to_dict()
+    assert len(saved) == 12 and saved["2_3"] == {"agent_type": agents.EMPTY, "pitch": 330.0,
+                                                 "duration": 0.25, "velocity": 90}
+    copy = CellAttributes(3, 4)
+    copy.load(json.loads(json.dumps(saved)))
+    assert np.array_equal(copy.table, attrs.table)
+
+
+def test_sparse_cells_cover_agents_and_tiles_and_write_back():
+    attrs = CellAttributes(3, 4)
+    attrs[(0, 1)]['agent_type'] = agents.BELL_0
+    attrs[(0, 1)]['pitch'] = 660.0
+    static_grid = np.zeros((3, 4), dtype=np.int64)
+    static_grid[2, 0] = agents.VERTICAL_REFLECT
+    assert attrs.sparse()[['row', 'col']].tolist() == [(0, 1)]
+    cells = attrs.sparse(static_grid)
+    assert cells.dtype == CELL_DTYPE and cells[['row', 'col']].tolist() == [(0, 1), (2, 0)]
+    assert cells['pitch'].tolist() == [660.0, agents.DEFAULT_TONE['pitch']]
+
+    other = CellAttributes(3, 4)
+    other.update_sparse(cells)
+    assert np.array_equal(other.table, attrs.table)
+    velocities = np.zeros(1, dtype=[('row', '<i4'), ('col', '<i4'), ('velocity', '<i4')])
+    velocities[0] = (2, 0, 7)
+    other.update_sparse(velocities)  # only the fields given change
+    assert other.tone(2, 0) == (agents.DEFAULT_TONE['pitch'], agents.DEFAULT_TONE['duration'], 7)
@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import pytest
+
+from conftest import ROOT
+from xm_patterns import PATTERN_DTYPE, decode_patterns
+from xm_reader import XMReader
+from xm_writer import HEADER_SIZE, write_xm
+
+MODULES = [os.path.join(ROOT, "scripts", "dn-heavens.xm"), os.path.join(ROOT, "assets", "audio", "test.xm")]
+
+
+def reference_decode(data, rows, channels):
+    """The byte-at-a-time loop the vectorized decoder replaced."""
+    cells, at = [], 0
+    for _ in range(rows * channels):
+        first = data[at]
+        at += 1
+        if first & 0x80:
+            fields = []
+            for bit in range(5):
+                if first & (1 << bit):
+                    fields.append(data[at])
+                    at += 1
+                else:
+                    fields.append(0)
+        else:
+            fields = [first, *data[at:at + 4]]
+            at += 4
+        cells.append(tuple(fields))
+    assert at == len(data)
+    return cells
+
+
+def random_pattern(rng, rows, channels, packed):
+    out = bytearray()
+    for _ in range(rows * channels):
+        if rng.random() < packed:
+            mask = int(rng.integers(0, 32))
+            out.append(0x80 | mask)
+            out.extend(int(rng.integers(0, 256)) for bit in range(5) if mask & (1 << bit))
+        else:
+            out.append(int(rng.integers(0, 98)))
+            out.extend(rng.integers(0, 256, 4).astype(np.uint8).tobytes())
+    return bytes(out)
+
+
+@pytest.mark.parametrize("packed", [0.0, 0.5, 1.0])
+def test_decode_patterns_matches_the_reference_loop(packed):
+    rng = np.random.default_rng(21)
+    channels = 4
+    rows = [int(rng.integers(1, 80)) for _ in range(12)] + [64]
+    chunks = [random_pattern(rng, n, channels, packed) for n in rows[:-1]] + [b""]
+    for chunk, n, pattern in zip(chunks, rows, decode_patterns(chunks, rows, channels)):
+        assert pattern.shape == (n, channels)
+        expected = reference_decode(chunk, n, channels) if chunk else [(0,) * 5] * (n * channels)
+        assert pattern.reshape(-1).tolist() == expected
+
+
+def test_packed_pattern_of_raw_size_is_not_taken_as_raw():
+    # A six-byte and a four-byte cell fill ten bytes, like two raw cells.
+    chunk = bytes([0x9F, 1, 2, 3, 4, 5, 0x87, 6, 7, 8])
+    assert decode_patterns([chunk], [1], 2)[0].reshape(-1).tolist() == [(1, 2, 3, 4, 5), (6, 7, 8, 0, 0)]
+
+
+def test_row_count_mismatch_is_rejected():
+    with pytest.raises(ValueError):
+        decode_patterns([bytes([0x80, 0x80, 0x80])], [1], 2)
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_bundled_modules_decode_like_the_reference_loop(module):
+    with XMReader(module) as xm:
+        channels = xm.header["num_channels"]
+        for (offset, rows, size), pattern in zip(xm.pattern_index, xm.all_patterns()):
+            chunk = bytes(xm.data[offset:offset + size])
+            assert pattern.reshape(-1).tolist() == reference_decode(chunk, rows, channels)
+
+
+def test_malformed_module_still_closes(tmp_path):
+    path = tmp_path / "bad.xm"
+    write_xm(str(path), [np.zeros((4, 2), dtype=PATTERN_DTYPE)])
+    data = bytearray(path.read_bytes())
+    data[60 + HEADER_SIZE + 5] = 3  # the pattern header claims 3 rows for 4 rows of data
+    path.write_bytes(bytes(data))
+    for decode in (XMReader.all_patterns, lambda xm: xm.pattern(0)):
+        with pytest.raises(ValueError):
+            with XMReader(str(path)) as xm:  # closing must not fail on views held by the error
+                decode(xm)
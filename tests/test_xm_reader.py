@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+import pytest
+
+from conftest import ROOT
+from xm_reader import XMReader
+from xm_writer import write_xm
+
+MODULE = os.path.join(ROOT, "assets", "audio", "test.xm")
+
+
+def reference_sample(deltas, bits):
+    """The tracker's running sum, one point at a time, wrapping at ``bits``."""
+    half, total, out = 1 << (bits - 1), 0, []
+    for delta in deltas:
+        total = (total + delta + half) % (1 << bits) - half
+        out.append(total)
+    return out
+
+
+def test_samples_decode_like_the_running_sum(tmp_path):
+    rng = np.random.default_rng(23)
+    pcm8 = rng.integers(-128, 128, 3000).astype(np.int8)  # full-scale noise, so the deltas wrap
+    pcm16 = rng.integers(-32768, 32768, 2000).astype(np.int16)
+    path = str(tmp_path / "samples.xm")
+    write_xm(path, [], [{"name": "noise", "samples": [{"pcm": pcm8}, {"pcm": pcm16, "loop_length": 400}]},
+                        {"name": "empty"}, {"name": "tail", "samples": [{"pcm": pcm8[:5]}]}])
+
+    with XMReader(path) as xm:
+        assert [instrument["num_samples"] for instrument in xm.instruments] == [2, 0, 1]
+        assert xm.instruments[0]["samples"][1]["length"] == pcm16.nbytes
+        deltas = xm.sample_deltas(0, 0)
+        assert not deltas.flags.writeable and not deltas.flags.owndata  # a view of the mapped file
+        assert reference_sample(deltas.tolist(), 8) == pcm8.tolist()
+        del deltas
+        assert np.array_equal(xm.sample(0, 0), pcm8)
+        assert xm.sample(0, 1).dtype == np.int16 and np.array_equal(xm.sample(0, 1), pcm16)
+        assert [(i, j) for i, j, _, _ in xm.iter_samples()] == [(0, 0), (0, 1), (2, 0)]
+        assert np.array_equal(xm.sample(2, 0), pcm8[:5])
+
+
+def test_bundled_module_samples_decode_like_the_running_sum():
+    with XMReader(MODULE) as xm:
+        for i, j, header, pcm in xm.iter_samples():
+            bits = 16 if pcm.dtype == np.int16 else 8
+            deltas = xm.sample_deltas(i, j).tolist()
+            assert len(pcm) * pcm.itemsize == header["length"]
+            assert pcm.tolist() == reference_sample(deltas, bits)
+
+
+def test_truncated_sample_data_is_rejected(tmp_path):
+    path = tmp_path / "short.xm"
+    write_xm(str(path), [], [{"samples": [{"pcm": np.arange(100, dtype=np.int16)}]}])
+    path.write_bytes(path.read_bytes()[:-10])
+    with XMReader(str(path)) as xm:
+        with pytest.raises(ValueError):
+            xm.instruments
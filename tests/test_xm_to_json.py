@@ -0,0 +1,42 @@
+import json
+import os
+
+import pytest
+
+import xm_to_json
+from conftest import ROOT
+from xm_reader import XMReader
+
+MODULE = os.path.join(ROOT, "assets", "audio", "test.xm")
+BROKEN_INSTRUMENTS = os.path.join(ROOT, "scripts", "dn-heavens.xm")
+
+
+@pytest.fixture
+def readers(monkeypatch, tmp_path):
+    """Every XMReader the parser opens; parse() writes output.json to the working directory."""
+    monkeypatch.chdir(tmp_path)
+    opened = []
+
+    def reader(filename):
+        opened.append(XMReader(filename))
+        return opened[-1]
+
+    monkeypatch.setattr(xm_to_json, "XMReader", reader)
+    return opened
+
+
+def test_parse_unmaps_the_module(readers, tmp_path):
+    parser = xm_to_json.XMParser(MODULE)
+    parser.parse()
+    assert [reader.data.closed for reader in readers] == [True]
+    with open(tmp_path / "output.json", encoding="utf-8") as f:
+        song = json.load(f)
+    with XMReader(MODULE) as xm:
+        assert song["order"] == xm.order
+        assert len(song["patterns"]) == len(xm.pattern_index)
+
+
+def test_parse_unmaps_the_module_when_it_fails(readers):
+    with pytest.raises(ValueError):
+        xm_to_json.XMParser(BROKEN_INSTRUMENTS).parse()
+    assert [reader.data.closed for reader in readers] == [True]
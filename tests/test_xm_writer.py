@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+
+from conftest import ROOT
+from xm_patterns import PATTERN_DTYPE
+from xm_reader import XMReader
+from xm_writer import XMWriter, pack_pattern, packed_size, write_xm
+
+MODULE = os.path.join(ROOT, "assets", "audio", "test.xm")
+
+
+def random_pattern(rng, rows, channels):
+    """Cells with a random subset of fields set, including fully empty and fully set ones."""
+    cells = rng.integers(1, 256, (rows * channels, 5)).astype(np.uint8)
+    cells[:, 0] %= 97  # notes are 1-96 or key-off, so a raw cell never starts with the mask bit
+    cells[:, 0] += 1
+    cells[rng.random(cells.shape) < 0.5] = 0
+    cells[::7] = 0
+    return cells.view(PATTERN_DTYPE).reshape(rows, channels)
+
+
+def test_packed_cells_take_the_shorter_form():
+    pattern = np.zeros((1, 3), dtype=PATTERN_DTYPE)
+    pattern[0, 1] = (49, 1, 0, 0, 0)
+    pattern[0, 2] = (49, 1, 0x50, 0x0F, 3)
+    out = bytearray(packed_size(pattern))
+    assert pack_pattern(pattern, out, 0) == len(out) == 1 + 3 + 5
+    assert bytes(out) == bytes([0x80, 0x83, 49, 1, 49, 1, 0x50, 0x0F, 3])
+
+
+def test_written_module_reads_back(tmp_path):
+    rng = np.random.default_rng(24)
+    patterns = [random_pattern(rng, rows, 6) for rows in (64, 1, 100)]
+    bell = {"name": "bell", "samples": [{"pcm": (np.sin(np.arange(500) / 8) * 30000).astype(np.int16)}]}
+    path = str(tmp_path / "song.xm")
+    write_xm(path, patterns, [bell], order=[2, 0, 0, 1], module_name="round trip", tempo=4, bpm=140)
+
+    with XMReader(path) as xm:
+        assert xm.header["module_name"] == "round trip"
+        assert (xm.header["num_channels"], xm.header["tempo"], xm.header["bpm"]) == (6, 4, 140)
+        assert xm.order == [2, 0, 0, 1]
+        for pattern, read in zip(patterns, xm.all_patterns()):
+            assert np.array_equal(read, pattern)
+        assert np.array_equal(xm.sample(0, 0), bell["samples"][0]["pcm"])
+
+
+def test_streamed_module_stores_repeated_patterns_once(tmp_path):
+    rng = np.random.default_rng(24)
+    verse, chorus = random_pattern(rng, 64, 4), random_pattern(rng, 64, 4)
+    path = str(tmp_path / "song.xm")
+    with XMWriter(path, 4, "stream") as xm:
+        assert [xm.append(p) for p in (verse, chorus, verse.copy(), chorus, verse[:32])] == [0, 1, 0, 1, 2]
+        xm.close([{"name": "bell", "samples": [{"pcm": np.arange(-50, 50, dtype=np.int8)}]}])
+
+    with XMReader(path) as xm:
+        assert xm.header["num_patterns"] == 3 and xm.order == [0, 1, 0, 1, 2]
+        read = xm.all_patterns()
+        for pattern, index in zip((verse, chorus, verse[:32]), range(3)):
+            assert np.array_equal(read[index], pattern)
+        assert np.array_equal(xm.sample(0, 0), np.arange(-50, 50))
+
+
+def test_bundled_module_patterns_survive_a_rewrite(tmp_path):
+    with XMReader(MODULE) as xm:
+        patterns, order = xm.all_patterns(), xm.order
+    path = str(tmp_path / "copy.xm")
+    write_xm(path, patterns, order=order)
+    with XMReader(path) as xm:
+        assert xm.order == order
+        for pattern, read in zip(patterns, xm.all_patterns()):
+            assert np.array_equal(read, pattern)
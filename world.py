@@ -0,0 +1,354 @@
+import numpy as np
+
+import agents
+
+ATTRIBUTE_DTYPE = np.dtype([
+    ('agent_type', '<i4'), ('velocity', '<i4'), ('pitch', '<f8'), ('duration', '<f8')
+])
+# Row of CellAttributes.sparse(): an occupied cell and its attributes.
+CELL_DTYPE = np.dtype([('row', '<i4'), ('col', '<i4')] + ATTRIBUTE_DTYPE.descr)
+CHECKPOINT_INTERVAL = 64  # ticks between the snapshots GridModel.seek restores from
+MAX_CHECKPOINTS = 32  # per grid; older snapshots are thinned out past this
+DEFAULT_ATTRIBUTES = (
+    agents.EMPTY, agents.DEFAULT_TONE['velocity'], agents.DEFAULT_TONE['pitch'], agents.DEFAULT_TONE['duration']
+)
+
+
+class CellAttributes:
+    """Per-cell agent_type, pitch, duration and velocity in one structured array.
+
+    ``attrs[(r, c)]`` is a record view, so ``attrs[(r, c)]['pitch'] = 220.0``
+    writes through to the table as the old per-cell dicts did.
+    """
+
+    def __init__(self, rows, cols):
+        self.table = np.empty((rows, cols), dtype=ATTRIBUTE_DTYPE)
+        self.clear()
+
+    @property
+    def shape(self):
+        return self.table.shape
+
+    def __getitem__(self, cell):
+        return self.table[cell]
+
+    def clear(self):
+        self.table[...] = DEFAULT_ATTRIBUTES
+
+    def tone(self, r, c):
+        """(pitch, duration, velocity) of one cell."""
+        attr = self.table[r, c]
+        return float(attr['pitch']), float(attr['duration']), int(attr['velocity'])
+
+    def tones(self, cells):
+        """(pitch, duration, velocity) of each (row, col) in ``cells``, as a list."""
+        cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+        picked = self.table[cells[:, 0], cells[:, 1]]
+        return list(zip(picked['pitch'].tolist(), picked['duration'].tolist(), picked['velocity'].tolist()))
+
+    def sparse(self, static_grid=None):
+        """CELL_DTYPE rows for the cells with an agent (or a tile in ``static_grid``)."""
+        occupied = self.table['agent_type'] != agents.EMPTY
+        if static_grid is not None:
+            occupied |= static_grid != agents.EMPTY
+        rows, cols = np.nonzero(occupied)
+        cells = np.empty(len(rows), dtype=CELL_DTYPE)
+        cells['row'], cells['col'] = rows, cols
+        for name in ATTRIBUTE_DTYPE.names:
+            cells[name] = self.table[name][rows, cols]
+        return cells
+
+    def update_sparse(self, cells):
+        """Write CELL_DTYPE rows (or any array with row/col and some attribute fields) back."""
+        for name in ATTRIBUTE_DTYPE.names:
+            if name in cells.dtype.names:
+                self.table[name][cells['row'], cells['col']] = cells[name]
+
+    def load(self, saved):
+        """Apply a saved session's ``cell_attributes`` dict ("r_c" keys)."""
+        for name in ATTRIBUTE_DTYPE.names:
+            entries = [(k, attrs[name]) for k, attrs in saved.items() if name in attrs]
+            if entries:
+                keys, values = zip(*entries)
+                rows, cols = np.array([k.split('_') for k in keys], dtype=np.int64).T
+                self.table[name][rows, cols] = values
+
+    def to_dict(self, sep='_'):
+        """All cells as {"r<sep>c": {attribute: value}}, for JSON."""
+        rows, cols = np.indices(self.shape)
+        return {
+            f"{r}{sep}{c}": {'agent_type': t, 'pitch': p, 'duration': d, 'velocity': v}
+            for r, c, (t, v, p, d) in zip(rows.ravel().tolist(), cols.ravel().tolist(), self.table.ravel().tolist())
+        }
+
+
+class GridModel:
+    """Headless state of one grid: arrays, cell attributes and robot state.
+
+    Holds no widgets, so background grids keep simulating and sounding
+    without a view; game_engine.SimulationGrid draws a model on demand.
+    """
+
+    def __init__(self, rows=20, cols=20, emoji_label=None, bpm=120):
+        self.emoji_label = emoji_label or 'å'
+        self.bpm = bpm
+        self.rows = rows
+        self.cols = cols
+        self.cell_attributes = CellAttributes(rows, cols)
+        self.static_grid = np.zeros((rows, cols), dtype=int)
+        self.dynamic_grid = np.zeros((rows, cols), dtype=int)
+        self.robot_agent = agents.RobotAgent()
+        self.running = False
+        self.selected_type = agents.EMPTY
+        # Ticks this grid has stepped, and snapshots of its state every
+        # checkpoint_interval ticks (0 turns them off), keyed by tick.
+        self.tick = 0
+        self.checkpoint_interval = CHECKPOINT_INTERVAL
+        self.checkpoints = {}
+
+    @classmethod
+    def from_state(cls, grid_data):
+        """Build a model from one entry of a saved session's ``grids`` list."""
+        # asarray keeps the copy-on-write views of a binary session as they are
+        static_grid = np.asarray(grid_data['static_grid'])
+        rows, cols = static_grid.shape
+        grid = cls(rows, cols, emoji_label=grid_data.get('emoji_label', '∫'), bpm=grid_data.get('bpm', 120))
+        grid.static_grid = static_grid
+        grid.dynamic_grid = np.asarray(grid_data['dynamic_grid'])
+
+        # Load robot state
+        grid.robot_agent.set_state(
+            {tuple(map(int, k.split('_'))): tuple(v) for k, v in grid_data.get("directions", {}).items()},
+            {tuple(map(int, k.split('_'))): v for k, v in grid_data.get("speeds", {}).items()},
+            {tuple(map(int, k.split('_'))): v for k, v in grid_data.get("counters", {}).items()},
+        )
+
+        # Load cell attributes
+        grid.cell_attributes.table['agent_type'] = static_grid
+        grid.cell_attributes.load(grid_data.get('cell_attributes', {}))
+
+        return grid
+
+    def set_agent_at(self, r, c, agent_type, pitch=440.0, duration=0.5, speed=1, direction=None):
+        self.drop_checkpoints()
+        attr = self.cell_attributes[(r, c)]
+        attr['agent_type'] = agent_type
+        attr['pitch'] = pitch
+        attr['duration'] = duration
+
+        if agent_type == agents.EMPTY:
+            attr['pitch'] = 0
+            attr['duration'] = 0
+
+        if agent_type == agents.ROBOT:
+            self.dynamic_grid[r, c] = agents.ROBOT
+            self.static_grid[r, c] = agents.EMPTY
+            self.robot_agent.place(r, c, speed=speed, direction=direction)
+        else:
+            self.static_grid[r, c] = agent_type
+            self.dynamic_grid[r, c] = agents.EMPTY
+            self.robot_agent.remove(r, c)
+
+    def reset(self):
+        self.drop_checkpoints()
+        self.static_grid.fill(agents.EMPTY)
+        self.dynamic_grid.fill(agents.EMPTY)
+        self.cell_attributes.clear()
+
+    def get_state(self):
+        return {
+            'emoji': self.emoji_label,
+            'static_grid': self.static_grid.tolist(),
+            'dynamic_grid': self.dynamic_grid.tolist(),
+            'cell_attributes': self.cell_attributes.to_dict(sep=',')
+        }
+
+    def update(self):
+        """Advance this grid alone by one tick; return the (row, col) cells that changed."""
+        if not self.running:
+            return []
+        self.save_checkpoint()
+        previous = self.dynamic_grid
+        self.dynamic_grid = self.robot_agent.apply_rules(
+            self.static_grid, self.dynamic_grid, self.cell_attributes
+        )
+        self.tick += 1
+        return np.argwhere(self.dynamic_grid != previous).tolist()
+
+    def save_checkpoint(self):
+        """Snapshot the state before stepping ``self.tick``, if it falls on the interval."""
+        interval = self.checkpoint_interval
+        if not interval or self.tick % interval or self.tick in self.checkpoints:
+            return
+        # RobotState is never modified in place, so it needs no copy.
+        self.checkpoints[self.tick] = (
+            self.static_grid.copy(), self.dynamic_grid.copy(), self.robot_agent.state,
+            self.cell_attributes.table.copy(),
+        )
+        if len(self.checkpoints) > MAX_CHECKPOINTS:
+            self.thin_checkpoints()
+
+    def thin_checkpoints(self):
+        """Drop every other snapshot of the older half (keeping the oldest).
+
+        Recent ticks stay densely covered while the spacing of older ones
+        doubles each time, so the store stays within MAX_CHECKPOINTS.
+        """
+        ticks = sorted(self.checkpoints)
+        for tick in ticks[:len(ticks) // 2][1::2]:
+            del self.checkpoints[tick]
+
+    def drop_checkpoints(self):
+        """Forget snapshots from the current tick on; an edit has changed that future."""
+        for tick in [t for t in self.checkpoints if t >= self.tick]:
+            del self.checkpoints[tick]
+
+    def seek(self, tick):
+        """Move this grid to ``tick`` without sound.
+
+        Restores the closest checkpoint at or before ``tick`` (grids, robots
+        and cell attributes), unless the grid is already between it and
+        ``tick``, and steps forward from there, saving checkpoints on the way.
+        """
+        base = max((t for t in self.checkpoints if t <= tick), default=None)
+        if self.tick > tick or (base is not None and self.tick < base):
+            if base is None:
+                raise ValueError(f"No checkpoint at or before tick {tick}")
+            static, dynamic, state, attributes = self.checkpoints[base]
+            # Copy in place so GridGroup stacks keep seeing this grid's arrays.
+            self.static_grid[...] = static
+            self.dynamic_grid[...] = dynamic
+            self.robot_agent.state = state
+            self.cell_attributes.table[...] = attributes
+            self.tick = base
+        while self.tick < tick:
+            self.save_checkpoint()
+            new_dynamic, self.robot_agent.state, _, _ = agents.step_robots(
+                self.static_grid, self.dynamic_grid, self.robot_agent.state
+            )
+            self.dynamic_grid[...] = new_dynamic
+            self.tick += 1
+
+
+class GridGroup:
+    """Grids that share a BPM and board size, stacked into 3-D arrays.
+
+    Each member's ``static_grid`` and ``dynamic_grid`` are replaced by views
+    into the stacks, so edits made through a grid land in the stack directly
+    and one ``step_robots`` call advances every member at once.
+    """
+
+    def __init__(self, bpm, grids):
+        self.bpm = bpm
+        self.grids = grids
+        self.static = np.stack([grid.static_grid for grid in grids])
+        self.dynamic = np.stack([grid.dynamic_grid for grid in grids])
+        for i, grid in enumerate(grids):
+            grid.static_grid = self.static[i]
+            grid.dynamic_grid = self.dynamic[i]
+
+    def detached(self):
+        """True if any member swapped its arrays or tempo since stacking."""
+        return any(
+            grid.static_grid.base is not self.static
+            or grid.dynamic_grid.base is not self.dynamic
+            or grid.bpm != self.bpm
+            for grid in self.grids
+        )
+
+    def step(self):
+        """Advance the running members one tick.
+
+        Returns the (grid, row, col) tone hits and a dict mapping each stepped
+        grid to the (row, col) cells whose dynamic value changed.
+        """
+        live = [i for i, grid in enumerate(self.grids) if grid.running]
+        if not live:
+            return [], {}
+        members = [self.grids[i] for i in live]
+        whole = len(live) == len(self.grids)
+        static = self.static if whole else self.static[live]
+        dynamic = self.dynamic if whole else self.dynamic[live]
+
+        for grid in members:
+            grid.save_checkpoint()
+        states = [grid.robot_agent.state for grid in members]
+        counts = [len(state) for state in states]
+        state = agents.RobotState(
+            np.column_stack((
+                np.repeat(np.arange(len(members)), counts),
+                np.concatenate([s.positions for s in states]).reshape(-1, 2),
+            )),
+            np.concatenate([s.directions for s in states]),
+            np.concatenate([s.speeds for s in states]),
+            np.concatenate([s.counters for s in states]),
+        )
+
+        new_dynamic, state, landed, changed = agents.step_robots(static, dynamic, state)
+        if whole:
+            self.dynamic[...] = new_dynamic
+        else:
+            self.dynamic[live] = new_dynamic
+
+        bounds = np.searchsorted(state.positions[:, 0], np.arange(len(members) + 1))
+        for grid, lo, hi in zip(members, bounds[:-1], bounds[1:]):
+            grid.robot_agent.state = agents.RobotState(
+                state.positions[lo:hi, 1:], state.directions[lo:hi],
+                state.speeds[lo:hi], state.counters[lo:hi]
+            )
+            grid.tick += 1
+
+        hits = [(members[g], r, c) for g, r, c in landed.tolist()]
+        edges = np.searchsorted(changed[:, 0], np.arange(len(members) + 1))
+        return hits, {grid: changed[lo:hi, 1:] for grid, lo, hi in zip(members, edges[:-1], edges[1:])}
+
+
+class GridWorld:
+    """Advances every grid of a session, one vectorized step per BPM group."""
+
+    def __init__(self, grids):
+        self.grids = grids
+        self.groups = {}
+        self._members = []
+
+    def rebuild(self):
+        by_key = {}
+        for grid in self.grids:
+            by_key.setdefault((grid.bpm, grid.static_grid.shape), []).append(grid)
+        self.groups = {key: GridGroup(key[0], members) for key, members in by_key.items()}
+        self._members = list(self.grids)
+
+    def stale(self):
+        return (
+            len(self._members) != len(self.grids)
+            or any(a is not b for a, b in zip(self._members, self.grids))
+            or any(group.detached() for group in self.groups.values())
+        )
+
+    def bpms(self):
+        return sorted({grid.bpm for grid in self.grids})
+
+    def seek(self, tick):
+        """Move every grid to its own ``tick`` with audio muted; see GridModel.seek."""
+        for grid in self.grids:
+            grid.seek(tick)
+
+    def step(self, bpm):
+        """Advance every running grid at ``bpm``.
+
+        Returns the (grid, row, col) tone hits in grid order and a dict mapping
+        each stepped grid to the cells that changed, for incremental redraws.
+        """
+        if self.stale():
+            self.rebuild()
+        hits, changed = [], {}
+        for (group_bpm, _), group in self.groups.items():
+            if group_bpm == bpm:
+                group_hits, group_changed = group.step()
+                hits.extend(group_hits)
+                changed.update(group_changed)
+        if len(self.groups) > 1:
+            # Keep grid order when several board sizes share a BPM.
+            order = {id(grid): i for i, grid in enumerate(self.grids)}
+            hits.sort(key=lambda hit: order[id(hit[0])])
+        return hits, changed